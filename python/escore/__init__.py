@@ -2,7 +2,10 @@
 from escore.core.definitions import StatusCode
 from escore.core.process_services import ConfigObject
 from escore.core.process_services import DataStore
+from escore.core.process_services import DeferredValue
 from escore.core.process_services import ForkStore
+from escore.core.process_services import BufferPool
+from escore.core.process_services import CacheService
 from escore.core.element import Chain, Link
 from escore.core.process_manager import process_manager
 from escore.core.execution import eskapade_run
@@ -190,7 +190,21 @@ CONFIG_VARS['chains'] = ['beginWithChain',
                          'endWithChain',
                          'storeResultsEachChain',
                          'storeResultsOneChain',
-                         'doNotStoreResults', ]
+                         'doNotStoreResults',
+                         'parallelChains',
+                         'nJobs', ]
+
+CONFIG_VARS['memory'] = ['dsMemoryBudget',
+                         'dsSpillDir',
+                         'dsReleaseDeadKeys',
+                         'dsFinalKeys',
+                         'dsMemoryAccounting',
+                         'dsSoftLimit',
+                         'dsHardLimit',
+                         'bufferPoolMaxBytes',
+                         'cacheMemoryBudget',
+                         'cacheDisk',
+                         'cacheTtl', ]
 
 CONFIG_VARS['file_io'] = ['esRoot',
                           'resultsDir',
@@ -210,6 +224,18 @@ CONFIG_TYPES = dict(version=int,
                     interactive=bool,
                     storeResultsEachChain=bool,
                     doNotStoreResults=bool,
+                    parallelChains=bool,
+                    nJobs=int,
+                    dsMemoryBudget=int,
+                    dsReleaseDeadKeys=bool,
+                    dsFinalKeys=list,
+                    dsMemoryAccounting=bool,
+                    dsSoftLimit=int,
+                    dsHardLimit=int,
+                    bufferPoolMaxBytes=int,
+                    cacheMemoryBudget=int,
+                    cacheDisk=bool,
+                    cacheTtl=float,
                     all_mongo_collections=list, )
 
 CONFIG_DEFAULTS = dict(analysisName='MyAnalysis',
@@ -221,6 +247,19 @@ CONFIG_DEFAULTS = dict(analysisName='MyAnalysis',
                        doCodeProfiling=None,
                        storeResultsEachChain=False,
                        doNotStoreResults=False,
+                       parallelChains=False,
+                       nJobs=None,
+                       dsMemoryBudget=None,
+                       dsSpillDir=None,
+                       dsReleaseDeadKeys=False,
+                       dsFinalKeys=[],
+                       dsMemoryAccounting=False,
+                       dsSoftLimit=None,
+                       dsHardLimit=None,
+                       bufferPoolMaxBytes=None,
+                       cacheMemoryBudget=None,
+                       cacheDisk=False,
+                       cacheTtl=None,
                        esRoot=os.getcwd() + '/',
                        resultsDir=os.getcwd() + '/results/',
                        dataDir=os.getcwd() + '/data/',
@@ -247,7 +286,21 @@ USER_OPTS['chains'] = ['begin_with',
                        'single_chain',
                        'store_all',
                        'store_one',
-                       'store_none', ]
+                       'store_none',
+                       'parallel_chains',
+                       'n_jobs', ]
+
+USER_OPTS['memory'] = ['ds_memory_budget',
+                       'ds_spill_dir',
+                       'ds_release_dead_keys',
+                       'ds_final_key',
+                       'ds_memory_accounting',
+                       'ds_soft_limit',
+                       'ds_hard_limit',
+                       'buffer_pool_max_bytes',
+                       'cache_memory_budget',
+                       'cache_disk',
+                       'cache_ttl', ]
 
 USER_OPTS['file_io'] = ['results_dir',
                         'data_dir',
@@ -265,7 +318,8 @@ USER_OPTS_SHORT = dict(analysis_name='n',
                        conf_var='c',
                        begin_with='b',
                        end_with='e',
-                       single_chain='s', )
+                       single_chain='s',
+                       n_jobs='j', )
 
 USER_OPTS_KWARGS = dict(analysis_name=dict(help='set name of analysis in run',
                                            metavar='NAME'),
@@ -302,6 +356,44 @@ USER_OPTS_KWARGS = dict(analysis_name=dict(help='set name of analysis in run',
                                        metavar='CHAIN_NAME'),
                         store_none=dict(help='do not store run-process services',
                                         action='store_true'),
+                        parallel_chains=dict(help='execute chains without data dependencies concurrently',
+                                             action='store_true'),
+                        n_jobs=dict(help='set maximum number of concurrently executed forks and chains',
+                                    type=int,
+                                    metavar='N_JOBS'),
+                        ds_memory_budget=dict(help='set memory budget of data store in bytes; spill objects to disk '
+                                                   'when exceeded',
+                                              type=int,
+                                              metavar='BYTES'),
+                        ds_spill_dir=dict(help='set directory path for objects spilled by the data store',
+                                          metavar='SPILL_DIR'),
+                        ds_release_dead_keys=dict(help='release data-store objects after the last chain that uses '
+                                                       'them',
+                                                  action='store_true'),
+                        ds_final_key=dict(help='keep data-store object KEY as final output when releasing objects',
+                                          action='append',
+                                          metavar='KEY'),
+                        ds_memory_accounting=dict(help='account for the memory used by data-store objects and write '
+                                                       'a memory report',
+                                                  action='store_true'),
+                        ds_soft_limit=dict(help='warn if data-store objects use more than BYTES of memory',
+                                           type=int,
+                                           metavar='BYTES'),
+                        ds_hard_limit=dict(help='fail if data-store objects use more than BYTES of memory',
+                                           type=int,
+                                           metavar='BYTES'),
+                        buffer_pool_max_bytes=dict(help='set maximum number of bytes of idle buffers kept in the '
+                                                        'buffer pool',
+                                                   type=int,
+                                                   metavar='BYTES'),
+                        cache_memory_budget=dict(help='set memory budget of the cache service in bytes',
+                                                 type=int,
+                                                 metavar='BYTES'),
+                        cache_disk=dict(help='cache results on disk too, across runs of the analysis version',
+                                        action='store_true'),
+                        cache_ttl=dict(help='let results cached on disk expire after SECONDS',
+                                       type=float,
+                                       metavar='SECONDS'),
                         results_dir=dict(help='set directory path for results output',
                                          metavar='RESULTS_DIR'),
                         data_dir=dict(help='set directory path for data',
@@ -327,6 +419,19 @@ USER_OPTS_CONF_KEYS = dict(analysis_name='analysisName',
                            store_all='storeResultsEachChain',
                            store_one='storeResultsOneChain',
                            store_none='doNotStoreResults',
+                           parallel_chains='parallelChains',
+                           n_jobs='nJobs',
+                           ds_memory_budget='dsMemoryBudget',
+                           ds_spill_dir='dsSpillDir',
+                           ds_release_dead_keys='dsReleaseDeadKeys',
+                           ds_final_key='dsFinalKeys',
+                           ds_memory_accounting='dsMemoryAccounting',
+                           ds_soft_limit='dsSoftLimit',
+                           ds_hard_limit='dsHardLimit',
+                           buffer_pool_max_bytes='bufferPoolMaxBytes',
+                           cache_memory_budget='cacheMemoryBudget',
+                           cache_disk='cacheDisk',
+                           cache_ttl='cacheTtl',
                            spark_cfg_file='sparkCfgFile',
                            seed='seeds', )
 
@@ -16,9 +16,15 @@ modification, are permitted according to the terms listed in the file
 LICENSE.
 """
 
+import collections
+import multiprocessing
+import threading
+
 from escore.core.definitions import StatusCode
+from escore.core.forking import fork_context
 from escore.core.meta import Processor, ProcessorSequence
 from escore.core.mixin import ArgumentsMixin, TimerMixin
+from escore.core.scheduling import build_dependencies, link_keys, run_concurrently
 
 
 class Link(Processor, ArgumentsMixin, TimerMixin):
@@ -35,6 +41,14 @@ class Link(Processor, ArgumentsMixin, TimerMixin):
     To take from the data store there is a simple function load()
     To write to the data store there is a simple function store()
 
+    Temporary objects that are only needed by the links of the same chain
+    can be kept in the scratch store of the chain instead of the data
+    store.  The scratch store is cleared when the chain has been finalized,
+    and is not persisted or merged from forked processes:
+
+    >>> self.scratch['mask'] = df['x'] > 0  # in one link
+    >>> df = df[self.scratch['mask']]  # in a later link of the chain
+
     Links are added to a chain as follows:
 
     >>> from escore import process_manager
@@ -73,6 +87,9 @@ class Link(Processor, ArgumentsMixin, TimerMixin):
         # store() return code.
         self.if_output_exists = StatusCode.Success
 
+        # scratch store of a link that is not in a chain
+        self._scratch = None
+
     def _process_kwargs(self, kwargs, **name_val):
         """Process the key word arguments.
 
@@ -219,6 +236,39 @@ class Link(Processor, ArgumentsMixin, TimerMixin):
 
         return StatusCode(max(stats))
 
+    @property
+    def scratch(self) -> dict:
+        """Scratch store of the chain of the link.
+
+        A link that is not in a chain, e.g. when run stand-alone, has a
+        scratch store of its own.
+        """
+        if self.parent is not None:
+            return self.parent.scratch
+        if self._scratch is None:
+            self._scratch = {}
+        return self._scratch
+
+    @property
+    def cancelled(self) -> bool:
+        """Flag to indicate if the execution of the fork indices has been cancelled.
+
+        The execution of a forked chain is cancelled if the execution of
+        another fork index fails or breaks off the chain.  A long-running
+        link can poll this flag and return early.
+        """
+        return fork_context.cancelled
+
+    def fork_indices(self):
+        """Get the fork indices assigned to the current execution of the chain.
+
+        In a forked chain, the link should process the data of each of these
+        indices.  Outside of a fork no indices are assigned.
+
+        :return: iterator over fork indices
+        """
+        return iter(fork_context.indices if fork_context.active else ())
+
     def initialize(self) -> StatusCode:
         """Initialize the Link.
 
@@ -294,6 +344,43 @@ class Chain(Processor, ProcessorSequence, TimerMixin):
     >>>
     >>> # Run everything.
     >>> process_manager.run()
+
+    Links without data dependencies, as follows from their read and store
+    keys, can be executed concurrently on a pool of threads:
+
+    >>> io_chain.parallel_links = True
+
+    The links up to the first link that does not succeed, in chain order,
+    are all executed, and the status of that link is returned, as in a
+    sequential execution.
+
+    A chain can be executed in forked processes.  In fork-merge mode, the
+    objects that the links store in the data store of a forked process are
+    merged into the data store of the parent process:
+
+    >>> sim_chain = Chain('Simulation')
+    >>> sim_chain.n_fork = 8
+    >>> sim_chain.fork_merge = True
+    >>> sim_chain.fork_reducers = dict(n_events='sum')
+
+    Only objects that are new or replaced are merged; objects that are
+    modified in place, or deleted, are not detected.  Objects without
+    reducer are joined; objects that cannot be joined, e.g. numbers, are
+    gathered in a list with the object of each fork index.
+
+    Alternatively, the fork indices can be executed on a pool of threads,
+    e.g. for links that release the GIL in NumPy or I/O.  Each thread has
+    its own fork index, view of the data store and fork-store namespace, so
+    the links behave as in a forked process.  Objects in the data store are
+    shared by the threads, though, and must not be modified in place:
+
+    >>> sim_chain.n_thread = 8
+
+    The links of a chain can share temporary objects in the scratch store
+    of the chain, see Link.scratch.  The scratch store is cleared when the
+    chain has been finalized or skipped.  When the fork indices are executed
+    on threads, each thread stores its objects in a scratch store of its
+    own, on top of the shared scratch store.
     """
 
     def __init__(self, name, process_manager=None):
@@ -303,6 +390,37 @@ class Chain(Processor, ProcessorSequence, TimerMixin):
         self.prev_chain_name = ''  # type: str
         self.enabled = True  # type: bool
         self.n_fork = 0
+        # execute the fork indices on a pool of threads instead of in forked processes
+        self.n_thread = 0
+        # execute fork indices on a pool of long-lived worker processes
+        self.fork_pool = False  # type: bool
+        # let pool workers pull chunks of fork indices of adaptive size
+        self.fork_dynamic = False  # type: bool
+        # copy-on-write friendly forking: freeze garbage collection of existing objects
+        # and protect the data-store keys in fork_read_only from modification
+        self.fork_warm = False  # type: bool
+        self.fork_read_only = []  # type: list
+        # estimated memory usage of a forked process in bytes, to limit the number of running forks
+        self.fork_memory = None
+        # data-store keys written by forked processes that are gathered in the parent process,
+        # with the reducer of each key, see escore.core.reducers
+        self.fork_gather = {}  # type: dict
+        # fork-merge mode: gather all data-store objects that forked processes store or replace,
+        # reduced with the reducer in fork_reducers or else with fork_merge_default
+        self.fork_merge = False  # type: bool
+        self.fork_reducers = {}  # type: dict
+        self.fork_merge_default = 'join'
+        # speculative re-execution of straggling fork indices, once the fraction fork_speculative_after
+        # of the fork indices has finished; only for one forked process per fork index
+        self.fork_speculative = False  # type: bool
+        self.fork_speculative_after = 0.75  # type: float
+        # time in seconds that forked processes get to finish after cancellation, before they are killed
+        self.fork_grace_period = 5.0  # type: float
+        # results of the last forked execution, see escore.core.forking.ForkResult
+        self.fork_results = []  # type: list
+        self.parallel_links = False  # type: bool
+        self._scratch = {}
+        self._thread_scratch = threading.local()
 
         # We register ourselves with the process manager.
         # If none is specified register with the default
@@ -349,6 +467,23 @@ class Chain(Processor, ProcessorSequence, TimerMixin):
 
         return status
 
+    def __exec_concurrently(self, phase_callback) -> StatusCode:
+        links = list(self)
+        deps = build_dependencies([link_keys(_) for _ in links])
+        n_workers = getattr(self.parent, 'num_cpu', None) or multiprocessing.cpu_count()
+
+        statuses = run_concurrently(links, deps, phase_callback, n_workers, ordered=True)
+
+        # the first link in chain order that did not succeed determines the status, as in a sequential
+        # execution, independent of the order in which links finished
+        for _ in links:
+            if statuses.get(_, StatusCode.Success) != StatusCode.Success:
+                self.logger.warning('Link "{link!s}" returned "{code!s}" in chain "{chain!s}".',
+                                    link=_, code=statuses[_], chain=self)
+                return statuses[_]
+
+        return StatusCode.Success
+
     def add(self, link: Link) -> None:
         """Add a link to the chain.
 
@@ -424,7 +559,10 @@ class Chain(Processor, ProcessorSequence, TimerMixin):
         """
         self.logger.debug('Executing chain "{chain!s}".', chain=self)
 
-        status = self.__exec(Processor._execute)
+        if self.parallel_links:
+            status = self.__exec_concurrently(Processor._execute)
+        else:
+            status = self.__exec(Processor._execute)
 
         if status == StatusCode.Success:
             self.logger.debug('Successfully executed chain "{chain!s}".', chain=self)
@@ -440,6 +578,7 @@ class Chain(Processor, ProcessorSequence, TimerMixin):
         self.logger.debug('Finalizing chain "{chain!s}".', chain=self)
 
         status = self.__exec(Processor._finalize)
+        self.clear_scratch()
 
         if status == StatusCode.Success:
             total_time = self.stop_timer()
@@ -452,8 +591,34 @@ class Chain(Processor, ProcessorSequence, TimerMixin):
     def clear(self):
         """Clear the chain."""
         self.parent = None
+        self.clear_scratch()
         super().clear()
 
+    @property
+    def scratch(self) -> dict:
+        """Scratch store of the links in the chain.
+
+        In a thread with its own scratch store, that store is returned.
+        """
+        view = getattr(self._thread_scratch, 'view', None)
+        return view if view is not None else self._scratch
+
+    def open_thread_scratch(self) -> None:
+        """Give the running thread a scratch store of its own.
+
+        Objects stored by the thread are only visible to the thread; objects
+        in the shared scratch store of the chain are visible to all threads.
+        """
+        self._thread_scratch.view = collections.ChainMap({}, self._scratch)
+
+    def close_thread_scratch(self) -> None:
+        """Drop the scratch store of the running thread."""
+        self._thread_scratch.view = None
+
+    def clear_scratch(self) -> None:
+        """Drop the objects in the scratch store."""
+        self._scratch.clear()
+
     @property
     def n_links(self) -> int:
         """Return the number of links in the chain.
@@ -20,3 +20,7 @@ class Error(Exception):
 
 class UnknownSetting(Error):
     """The user requested an unknown setting."""
+
+
+class ReadOnlyKey(Error):
+    """The user tried to modify an object that is marked as read-only."""
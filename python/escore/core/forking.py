@@ -0,0 +1,746 @@
+"""Project: Eskapade - A python-based package for data analysis.
+
+Created: 2026/10/18
+
+Description:
+    Machinery for executing forked chains:
+
+        - ForkContext: fork indices assigned to the running process.
+        - ForkResult: status and resource usage of an execution in a forked
+          process, sent back to the parent process.
+        - ForkWorkerPool: pool of long-lived forked worker processes that
+          are fed with tasks, e.g. fork indices, from a task queue.
+        - AdaptiveChunks: ranges of fork indices with a size adapted to the
+          measured execution time per index.
+        - ForkThrottle: limit on the number of running forked processes,
+          based on the available CPUs and memory, which take container
+          (cgroup) limits into account.
+
+Authors:
+    KPMG Advanced Analytics & Big Data team, Amstelveen, The Netherlands
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted according to the terms listed in the file
+LICENSE.
+"""
+
+import collections
+import itertools
+import math
+import os
+import resource
+import signal
+import threading
+import time
+import timeit
+import traceback
+
+import multiprocessing
+import multiprocessing.util
+
+from escore.core.definitions import StatusCode
+from escore.logger import Logger
+
+logger = Logger()
+
+
+def after_fork():
+    """Prepare a process created with os.fork for the use of multiprocessing objects.
+
+    Runs the hooks that multiprocessing runs in the processes that it starts
+    itself.  In particular, proxies of a manager, such as those of the fork
+    store, get a connection to the manager of their own, instead of sharing
+    the connection of the parent process, which would interleave messages.
+    """
+    multiprocessing.util._run_after_forkers()
+
+
+class ForkContext:
+    """Fork indices assigned to the running process.
+
+    The fork context is set by the process manager in a forked process,
+    before the chain is executed.  Links access it through
+    Link.fork_indices() instead of reading the fork index from the
+    configuration object.
+
+    The fork indices are assigned per thread, so that a chain can also be
+    executed for multiple indices on a pool of threads.
+
+    The context also holds the cancellation flag of the forked processes of
+    a chain.  The flag is in memory shared by the parent and forked
+    processes, so checking it is cheap.  Links check it through
+    Link.cancelled.
+    """
+
+    def __init__(self):
+        """Initialize context."""
+        self._thread = threading.local()
+        self._cancel_flag = None
+
+    @property
+    def indices(self):
+        """Fork indices assigned to the running thread."""
+        return getattr(self._thread, 'indices', None)
+
+    @property
+    def active(self) -> bool:
+        """Flag to indicate if fork indices are assigned."""
+        return self.indices is not None
+
+    def assign(self, indices):
+        """Assign fork indices to the running thread.
+
+        :param range indices: fork indices to be processed
+        """
+        self._thread.indices = indices
+
+    def release(self):
+        """Release the fork indices assigned to the running thread."""
+        self._thread.indices = None
+
+    @property
+    def cancelled(self) -> bool:
+        """Flag to indicate if the execution of fork indices has been cancelled."""
+        return self._cancel_flag is not None and bool(self._cancel_flag.value)
+
+    def arm(self):
+        """Create a cancellation flag, shared with the processes that are forked next."""
+        self._cancel_flag = multiprocessing.RawValue('b', 0)
+
+    def disarm(self):
+        """Remove the cancellation flag."""
+        self._cancel_flag = None
+
+    def cancel(self):
+        """Cancel the execution of fork indices in all processes that share the cancellation flag."""
+        if self._cancel_flag is not None:
+            self._cancel_flag.value = 1
+
+    def handle_sigterm(self):
+        """Cancel, instead of exit, on SIGTERM in a forked process.
+
+        The forked process can then finish cooperatively; the parent
+        process kills it if it does not finish in time.
+        """
+        signal.signal(signal.SIGTERM, lambda signum, frame: self.cancel())
+
+
+fork_context = ForkContext()
+
+
+def private_dirty():
+    """Get the private dirty memory of the running process.
+
+    For a forked process this is the memory that is no longer shared with
+    the parent process, i.e. the copied copy-on-write pages plus newly
+    allocated memory.  Read from /proc/self/smaps_rollup (Linux).
+
+    :return: private dirty memory in kilobytes, or None if not available
+    :rtype: int
+    """
+    try:
+        with open('/proc/self/smaps_rollup') as smaps:
+            for line in smaps:
+                if line.startswith('Private_Dirty:'):
+                    return int(line.split()[1])
+    except (OSError, ValueError):
+        pass
+    return None
+
+
+class ForkResult:
+    """Status and resource usage of the execution of fork indices in a forked process.
+
+    A fork result is created in the forked process, with measure(), and is
+    sent to the parent process.  Besides the status code it holds the
+    traceback of an exception raised during execution, the wall-clock and
+    CPU time of the execution, and the peak resident memory and private
+    (unshared) memory of the forked process.
+    """
+
+    def __init__(self, indices, status=StatusCode.Undefined, traceback=None, wall_time=0.0, cpu_time=0.0,
+                 max_rss=0, private_dirty=None, cancelled=False, speculative=False):
+        """Initialize result.
+
+        :param range indices: executed fork indices
+        :param StatusCode status: status code of execution
+        :param str traceback: formatted traceback of exception raised during execution
+        :param float wall_time: wall-clock time of execution in seconds
+        :param float cpu_time: CPU time of execution in seconds
+        :param int max_rss: peak resident set size of forked process in kilobytes
+        :param int private_dirty: private dirty memory of forked process after execution in kilobytes
+        :param bool cancelled: execution was cancelled
+        :param bool speculative: result of a speculative copy of the execution, started for a straggler
+        """
+        self.indices = indices
+        self.status = status
+        self.traceback = traceback
+        self.wall_time = wall_time
+        self.cpu_time = cpu_time
+        self.max_rss = max_rss
+        self.private_dirty = private_dirty
+        self.cancelled = cancelled
+        self.speculative = speculative
+
+    def __repr__(self):
+        return '<ForkResult indices={!r} status={!s}{}{} wall_time={:.3f}s cpu_time={:.3f}s max_rss={:d}kB>'.format(
+            self.indices, self.status, ' (cancelled)' if self.cancelled else '',
+            ' (speculative)' if self.speculative else '', self.wall_time, self.cpu_time, self.max_rss)
+
+    @property
+    def fork_index(self) -> int:
+        """First executed fork index."""
+        return self.indices[0]
+
+    @classmethod
+    def measure(cls, indices, func, threaded=False):
+        """Execute function and measure its status and resource usage.
+
+        An exception raised by the function results in status Failure and
+        its traceback is stored.
+
+        :param range indices: fork indices executed by the function
+        :param func: function without arguments that returns a status code
+        :param bool threaded: function is executed in a thread; the CPU time of the thread is measured
+                              and the memory usage, which is not specific to the thread, is not
+        :return: result of execution
+        :rtype: ForkResult
+        """
+        cpu_clock = getattr(time, 'thread_time', time.process_time) if threaded else time.process_time
+        result = cls(indices)
+        start_time = timeit.default_timer()
+        start_cpu = cpu_clock()
+        try:
+            result.status = func()
+        except Exception:
+            result.status = StatusCode.Failure
+            result.traceback = traceback.format_exc()
+        result.wall_time = timeit.default_timer() - start_time
+        result.cpu_time = cpu_clock() - start_cpu
+        if not threaded:
+            result.max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            result.private_dirty = private_dirty()
+        result.cancelled = fork_context.cancelled
+        return result
+
+    @classmethod
+    def lost(cls, indices, reason, cancelled=False):
+        """Create result for fork indices whose forked process did not send a result.
+
+        The status of the result is Failure, or Undefined if the execution
+        had been cancelled, such that it does not affect the status of the
+        forked chain.
+
+        :param range indices: fork indices of the forked process
+        :param str reason: description of what happened to the forked process
+        :param bool cancelled: execution had been cancelled
+        :return: result without status
+        :rtype: ForkResult
+        """
+        return cls(indices, status=StatusCode.Undefined if cancelled else StatusCode.Failure, traceback=reason,
+                   cancelled=cancelled)
+
+
+class AdaptiveChunks:
+    """Iterator over chunks of fork indices with an adaptive size.
+
+    The first chunks contain a single index, to measure the execution time
+    per index.  Subsequent chunks are sized such that their execution takes
+    approximately target_latency seconds.  The chunk size is capped to a
+    fraction of the remaining indices, so that all workers finish at about
+    the same time.  Measured chunk latencies are passed with update().
+
+    Chunks are tuples (start, stop) of the range of indices.
+    """
+
+    target_latency = 0.5
+    smoothing = 0.5
+
+    def __init__(self, n_indices, n_workers):
+        """Initialize iterator.
+
+        :param int n_indices: total number of indices
+        :param int n_workers: number of workers that process the chunks
+        """
+        self.n_indices = n_indices
+        self.n_workers = max(1, n_workers)
+        self.next_index = 0
+        self.time_per_index = None
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if self.next_index >= self.n_indices:
+            raise StopIteration
+        start = self.next_index
+        self.next_index = min(self.n_indices, start + self.chunk_size())
+        return start, self.next_index
+
+    def chunk_size(self) -> int:
+        """Get size of next chunk.
+
+        :rtype: int
+        """
+        if not self.time_per_index:
+            return 1
+        remaining = self.n_indices - self.next_index
+        size = int(self.target_latency / self.time_per_index)
+        return max(1, min(size, remaining // (2 * self.n_workers)))
+
+    def update(self, chunk, latency):
+        """Update the estimated execution time per index.
+
+        :param tuple chunk: executed chunk
+        :param float latency: execution time of chunk in seconds
+        """
+        time_per_index = latency / max(1, chunk[1] - chunk[0])
+        if self.time_per_index is None:
+            self.time_per_index = time_per_index
+        else:
+            self.time_per_index += self.smoothing * (time_per_index - self.time_per_index)
+
+
+class ForkWorkerPool:
+    """Pool of long-lived forked worker processes.
+
+    The workers are forked once, when the pool is started, and execute the
+    target function for every task they pull from their task queue.  Results
+    are sent back to the parent process through a pipe.  This avoids paying
+    process creation and exit for every single task.
+
+    >>> pool = ForkWorkerPool(4, target=lambda fidx: fidx ** 2)
+    >>> pool.start()
+    >>> results = pool.map(range(100))
+    >>> pool.close()
+
+    Note that workers are forked at start, so they see the state of the
+    parent process at that time.  The pool can be used for multiple calls
+    of map as long as that state does not need to be refreshed.
+    """
+
+    _poll_interval = 0.1
+
+    def __init__(self, n_workers, target, on_exit=None):
+        """Initialize pool.
+
+        :param int n_workers: number of worker processes
+        :param target: function that is called by a worker for each task
+        :param on_exit: function that is called by a worker before it exits (optional)
+        """
+        self.n_workers = max(1, int(n_workers))
+        self._target = target
+        self._on_exit = on_exit
+        self._reader, self._writer = multiprocessing.Pipe(duplex=False)
+        self._write_lock = multiprocessing.Lock()
+        # task queue of each running worker
+        self._queues = {}
+
+    @property
+    def pids(self) -> list:
+        """Process IDs of running workers."""
+        return list(self._queues)
+
+    def start(self):
+        """Fork worker processes."""
+        for _ in range(self.n_workers):
+            tasks = multiprocessing.SimpleQueue()
+            pid = os.fork()
+            if pid == 0:
+                self._work(tasks)
+            logger.debug('Started fork worker process {pid:d}.', pid=pid)
+            self._queues[pid] = tasks
+
+    def _work(self, tasks):
+        """Execute tasks in worker process until a stop signal is received."""
+        exit_code = os.EX_OK
+        pid = os.getpid()
+        after_fork()
+        fork_context.handle_sigterm()
+        try:
+            while True:
+                task = tasks.get()
+                if task is None:
+                    break
+                self._send(('start', pid, task, None))
+                try:
+                    result = self._target(task)
+                except Exception:
+                    logger.error('Task {task!s} failed in fork worker process {pid:d}:\n{tb}',
+                                 task=task, pid=pid, tb=traceback.format_exc())
+                    result = None
+                self._send(('done', pid, task, result))
+        except BaseException:
+            exit_code = 1
+        finally:
+            try:
+                if self._on_exit is not None:
+                    self._on_exit()
+            finally:
+                # safe jupyter exit when forking
+                os._exit(exit_code)
+
+    def _send(self, message):
+        """Send message from worker to parent process."""
+        with self._write_lock:
+            self._writer.send(message)
+
+    def _reap(self):
+        """Remove workers that have exited from the list of running workers.
+
+        :return: process IDs of the workers that have exited
+        :rtype: list
+        """
+        exited = []
+        for pid in self.pids:
+            finished, exit_status = os.waitpid(pid, os.WNOHANG)
+            if finished:
+                logger.warning('Fork worker process {pid:d} exited unexpectedly with status {status:d}.',
+                               pid=pid, status=exit_status)
+                del self._queues[pid]
+                exited.append(pid)
+        return exited
+
+    def map(self, tasks, callback=None, stop=None) -> dict:
+        """Execute tasks on the workers.
+
+        Tasks are assigned to workers incrementally, such that a limited
+        number of them is waiting in the queue of each worker at any time.
+        The result of a task that raised an exception, or whose worker exited
+        while executing it, is None.  Tasks that a worker had not started
+        when it exited are assigned to the other workers.  Once the stop
+        criterion is met, no new tasks are assigned; tasks that are never
+        assigned have no result.
+
+        :param tasks: iterable of tasks; None is not a valid task
+        :param callback: function called with task and result when a task has finished, before next task is queued
+        :param stop: function of a task result; stop queueing tasks if true
+        :return: result of each task
+        :rtype: dict
+        """
+        if not self._queues:
+            raise RuntimeError('Fork worker pool has not been started.')
+
+        results = {}
+        # tasks assigned to each worker that have not finished, in order of execution
+        assigned = {pid: collections.deque() for pid in self._queues}
+        in_progress = {}
+        requeued = collections.deque()
+        task_iter = iter(tasks)
+        queued = []
+
+        def assign(pid):
+            """Assign tasks to worker until two of them are waiting or running."""
+            while len(assigned[pid]) < 2:
+                task = requeued.popleft() if requeued else next(task_iter, None)
+                if task is None:
+                    break
+                self._queues[pid].put(task)
+                assigned[pid].append(task)
+                queued.append(task)
+
+        def receive():
+            """Receive message from worker."""
+            nonlocal task_iter
+            kind, pid, task, result = self._reader.recv()
+            if kind == 'start':
+                in_progress[pid] = task
+                return
+            in_progress.pop(pid, None)
+            if task in assigned.get(pid, ()):
+                assigned[pid].remove(task)
+            results[task] = result
+            if callback is not None:
+                callback(task, result)
+            if stop is not None and stop(result):
+                task_iter = iter(())
+            if pid in self._queues:
+                assign(pid)
+
+        for pid in self._queues:
+            assign(pid)
+        while any(assigned.values()):
+            if self._reader.poll(self._poll_interval):
+                receive()
+                continue
+            exited = self._reap()
+            # messages sent by workers just before they exited
+            while self._reader.poll(0):
+                receive()
+            for pid in exited:
+                lost = assigned.pop(pid)
+                if pid in in_progress:
+                    task = in_progress.pop(pid)
+                    results[task] = None
+                    if task in lost:
+                        lost.remove(task)
+                if lost:
+                    logger.warning('Assigning {n:d} tasks of exited fork worker process {pid:d} to other workers.',
+                                   n=len(lost), pid=pid)
+                    requeued.extend(lost)
+            if not self._queues:
+                logger.error('All fork worker processes have exited; {n:d} tasks unfinished.',
+                             n=len(requeued) + sum(len(tasks_) for tasks_ in assigned.values()))
+                break
+            for pid in self._queues:
+                assign(pid)
+
+        for task in itertools.chain(queued, requeued, task_iter):
+            results.setdefault(task, None)
+        return results
+
+    def close(self, timeout=None):
+        """Stop workers and wait until they have exited.
+
+        Workers finish the tasks that are still in the queue before they
+        exit.  Workers that have not exited within the timeout are
+        terminated and killed.
+
+        :param float timeout: time in seconds to wait for the workers; default is no limit
+        """
+        for tasks in self._queues.values():
+            tasks.put(None)
+        if timeout is not None:
+            deadline = timeit.default_timer() + timeout
+            while self._queues and timeit.default_timer() < deadline:
+                for pid in self.pids:
+                    if os.waitpid(pid, os.WNOHANG)[0]:
+                        del self._queues[pid]
+                time.sleep(min(self._poll_interval, max(0., deadline - timeit.default_timer())))
+            if self._queues:
+                logger.warning('Killing {n:d} fork worker processes that did not exit within {timeout:g} seconds.',
+                               n=len(self._queues), timeout=timeout)
+                for pid in self._queues:
+                    os.kill(pid, signal.SIGKILL)
+        for pid in self.pids:
+            os.waitpid(pid, 0)
+            logger.debug('Fork worker process {pid:d} has finished.', pid=pid)
+        self._queues.clear()
+
+
+def _read_first_line(path):
+    """Read first line of a file; None if the file cannot be read."""
+    try:
+        with open(path) as file_:
+            return file_.readline().strip()
+    except OSError:
+        return None
+
+
+def _cgroup_dirs(root, controller=None, proc_cgroup='/proc/self/cgroup'):
+    """Get the directories of the control group of the running process and of its ancestors.
+
+    The path of the control group is read from the cgroup file of the
+    process.  If that path is not found under the mount point, e.g. in a
+    container that only sees its own control group, the mount point itself
+    is the control group of the process.
+
+    :param str root: mount point of the cgroup hierarchy
+    :param str controller: name of the cgroup v1 controller; None for cgroup v2
+    :param str proc_cgroup: path of the cgroup file of the process
+    :return: directories from the control group of the process up to the mount point
+    :rtype: list
+    """
+    path = ''
+    try:
+        with open(proc_cgroup) as file_:
+            for line in file_:
+                # "<hierarchy id>:<controllers>:<path>"; no controllers for cgroup v2
+                _, controllers, cgroup_path = line.rstrip('\n').split(':', 2)
+                if controller in controllers.split(',') if controller else not controllers:
+                    path = cgroup_path.strip('/')
+                    break
+    except (OSError, ValueError):
+        pass
+    root = os.path.normpath(root)
+    cgroup_dir = os.path.normpath(os.path.join(root, path))
+    if not path or not os.path.isdir(cgroup_dir):
+        return [root]
+    dirs = [cgroup_dir]
+    while dirs[-1] != root:
+        dirs.append(os.path.dirname(dirs[-1]))
+    return dirs
+
+
+def _read_cgroup_files(root, controller, names, proc_cgroup):
+    """Read the first lines of files in the control group of the running process and of its ancestors.
+
+    :return: tuple of first lines for each control group in which all files can be read
+    :rtype: list
+    """
+    lines = []
+    for cgroup_dir in _cgroup_dirs(root, controller, proc_cgroup):
+        values = tuple(_read_first_line(os.path.join(cgroup_dir, name)) for name in names)
+        if all(values):
+            lines.append(values)
+    return lines
+
+
+def cgroup_cpu_limit(root='/sys/fs/cgroup', proc_cgroup='/proc/self/cgroup'):
+    """Get the CPU limit of the control group of the running process.
+
+    Both cgroup v2 (cpu.max) and cgroup v1 (cpu.cfs_quota_us) are supported.
+    The limits of the control group of the process, as found in the cgroup
+    file of the process, and of its ancestors apply.
+
+    :param str root: mount point of the cgroup file system
+    :param str proc_cgroup: path of the cgroup file of the process
+    :return: number of CPUs the control group may use, or None if not limited
+    :rtype: float
+    """
+    # cgroup v2: "<quota> <period>" or "max <period>"
+    lines = _read_cgroup_files(root, None, ('cpu.max',), proc_cgroup)
+    if lines:
+        limits = [float(quota) / float(period) for quota, _, period in (line.partition(' ') for line, in lines)
+                  if quota != 'max']
+    else:
+        # cgroup v1: quota is -1 if not limited
+        lines = _read_cgroup_files(os.path.join(root, 'cpu'), 'cpu', ('cpu.cfs_quota_us', 'cpu.cfs_period_us'),
+                                   proc_cgroup)
+        limits = [int(quota) / int(period) for quota, period in lines if int(quota) > 0]
+    return min(limits) if limits else None
+
+
+def cgroup_memory_available(root='/sys/fs/cgroup', proc_cgroup='/proc/self/cgroup'):
+    """Get the memory available within the limit of the control group of the running process.
+
+    Both cgroup v2 (memory.max) and cgroup v1 (memory.limit_in_bytes) are
+    supported.  The limits of the control group of the process, as found in
+    the cgroup file of the process, and of its ancestors apply.
+
+    :param str root: mount point of the cgroup file system
+    :param str proc_cgroup: path of the cgroup file of the process
+    :return: available memory in bytes, or None if not limited
+    :rtype: int
+    """
+    for mount, controller, names in ((root, None, ('memory.max', 'memory.current')),
+                                     (os.path.join(root, 'memory'), 'memory',
+                                      ('memory.limit_in_bytes', 'memory.usage_in_bytes'))):
+        lines = _read_cgroup_files(mount, controller, names, proc_cgroup)
+        if not lines:
+            continue
+        # cgroup v1 reports a huge number if not limited
+        available = [max(0, int(limit) - int(usage)) for limit, usage in lines
+                     if limit != 'max' and int(limit) < 2 ** 62]
+        return min(available) if available else None
+    return None
+
+
+def meminfo_available(path='/proc/meminfo'):
+    """Get the memory available on the machine for new processes, from /proc/meminfo.
+
+    :param str path: path of meminfo file
+    :return: available memory in bytes, or None if not known
+    :rtype: int
+    """
+    try:
+        with open(path) as meminfo:
+            for line in meminfo:
+                if line.startswith('MemAvailable:'):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError):
+        pass
+    return None
+
+
+def available_cpus() -> int:
+    """Get the number of CPUs the running process may use.
+
+    Takes into account the CPU affinity of the process and the CPU limit of
+    its control group, e.g. a container quota.
+
+    :rtype: int
+    """
+    n_cpu = len(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity') else multiprocessing.cpu_count()
+    limit = cgroup_cpu_limit()
+    if limit is not None:
+        n_cpu = min(n_cpu, max(1, math.ceil(limit)))
+    return n_cpu
+
+
+def available_memory():
+    """Get the memory available for new processes.
+
+    The memory available within the limit of the control group of the
+    running process, or, if no limit is set, the memory available on the
+    machine.
+
+    :return: available memory in bytes, or None if not known
+    :rtype: int
+    """
+    available = cgroup_memory_available()
+    return meminfo_available() if available is None else available
+
+
+class ForkThrottle:
+    """Limit on the number of forked processes that run at the same time.
+
+    At most n_jobs processes run at the same time.  If the memory usage of
+    a forked process is known, a new process is only started if the
+    available memory can accommodate it, so the machine does not start
+    swapping.  The memory usage per process can be given as an estimate and
+    is updated with the private memory measured in finished processes.
+
+    >>> throttle = ForkThrottle(n_jobs=8, memory_per_child=2 * 1024 ** 3)
+    >>> if throttle.may_start(n_running):
+    >>>     fork()
+    """
+
+    # fraction of the available memory that may be used by new processes
+    memory_margin = 0.9
+
+    def __init__(self, n_jobs=None, memory_per_child=None):
+        """Initialize throttle.
+
+        :param int n_jobs: maximum number of running processes; default is the number of available CPUs
+        :param int memory_per_child: estimated memory usage of a forked process in bytes
+        """
+        self.n_jobs = max(1, int(n_jobs or available_cpus()))
+        self.memory_per_child = memory_per_child
+        self._memory_limited = False
+
+    def update(self, result):
+        """Update the estimated memory usage with the result of a finished process.
+
+        :param ForkResult result: result of finished process
+        """
+        if result.private_dirty is None:
+            return
+        memory = result.private_dirty * 1024
+        if self.memory_per_child is None or memory > self.memory_per_child:
+            self.memory_per_child = memory
+
+    def may_start(self, n_running) -> bool:
+        """Check if a new process may be started.
+
+        A process may always be started if none is running.
+
+        :param int n_running: number of running processes
+        :rtype: bool
+        """
+        if n_running >= self.n_jobs:
+            return False
+        if n_running == 0 or not self.memory_per_child:
+            return True
+        available = available_memory()
+        if available is None or available * self.memory_margin >= self.memory_per_child:
+            self._memory_limited = False
+            return True
+        if not self._memory_limited:
+            logger.info('Available memory ({avail:d} MB) is insufficient for another forked process ({mem:d} MB); '
+                        'waiting with {n:d} processes running.', avail=available // 1024 ** 2,
+                        mem=self.memory_per_child // 1024 ** 2, n=n_running)
+            self._memory_limited = True
+        return False
+
+    def max_workers(self, n_tasks) -> int:
+        """Get the number of worker processes for a pool.
+
+        :param int n_tasks: number of tasks to be executed
+        :rtype: int
+        """
+        n_workers = min(self.n_jobs, n_tasks)
+        available = available_memory()
+        if self.memory_per_child and available is not None:
+            n_workers = min(n_workers, int(available * self.memory_margin // self.memory_per_child))
+        return max(1, n_workers)
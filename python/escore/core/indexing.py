@@ -0,0 +1,145 @@
+"""Project: Eskapade - A python-based package for data analysis.
+
+Created: 2026/10/18
+
+Description:
+    Secondary indexes of the keys of a store, by type of the stored object,
+    key prefix and tag.
+
+Authors:
+    KPMG Advanced Analytics & Big Data team, Amstelveen, The Netherlands
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted according to the terms listed in the file
+LICENSE.
+"""
+
+import bisect
+
+
+class KeyIndex:
+    """Secondary indexes of the keys of a store.
+
+    The index is updated incrementally as objects are stored and deleted,
+    so that keys can be looked up without a scan of the store:
+
+        - by type: keys of objects of a type, or of a subclass of it
+        - by prefix: string keys that start with a prefix
+        - by tag: keys that have been tagged by the user
+
+    >>> index = KeyIndex()
+    >>> index.add('hist_x', dict)
+    >>> index.add('hist_y', list)
+    >>> index.tag('hist_y', 'final')
+    >>> index.of_type(dict), index.with_prefix('hist_'), index.with_tag('final')
+    (['hist_x'], ['hist_x', 'hist_y'], ['hist_y'])
+    """
+
+    def __init__(self):
+        """Initialize index."""
+        self.types = {}
+        self.key_types = {}
+        self.sorted_keys = []
+        self.tags = {}
+        self.key_tags = {}
+
+    def __len__(self):
+        return len(self.key_types)
+
+    def add(self, key, value_type):
+        """Index a key.
+
+        :param key: key of the stored object
+        :param type value_type: type of the stored object
+        """
+        previous = self.key_types.get(key)
+        if previous is value_type:
+            return
+        if previous is not None:
+            self._discard_type(key, previous)
+        elif isinstance(key, str):
+            bisect.insort(self.sorted_keys, key)
+        self.key_types[key] = value_type
+        self.types.setdefault(value_type, set()).add(key)
+
+    def remove(self, key):
+        """Remove a key and its tags from the index.
+
+        :param key: key of the deleted object
+        """
+        value_type = self.key_types.pop(key, None)
+        if value_type is None:
+            return
+        self._discard_type(key, value_type)
+        if isinstance(key, str):
+            pos = bisect.bisect_left(self.sorted_keys, key)
+            if pos < len(self.sorted_keys) and self.sorted_keys[pos] == key:
+                del self.sorted_keys[pos]
+        self.untag(key, *self.key_tags.get(key, ()))
+
+    def _discard_type(self, key, value_type):
+        """Remove a key from the index of a type."""
+        keys = self.types[value_type]
+        keys.discard(key)
+        if not keys:
+            del self.types[value_type]
+
+    def tag(self, key, *tags):
+        """Tag an indexed key.
+
+        :param key: key of the stored object
+        :param tags: tags of the key
+        :raises KeyError: if the key is not indexed
+        """
+        if key not in self.key_types:
+            raise KeyError(key)
+        self.key_tags.setdefault(key, set()).update(tags)
+        for tag in tags:
+            self.tags.setdefault(tag, set()).add(key)
+
+    def untag(self, key, *tags):
+        """Remove tags from a key.
+
+        :param key: key of the stored object
+        :param tags: tags to remove; all tags of the key if none are given
+        """
+        key_tags = self.key_tags.get(key, set())
+        for tag in list(tags or key_tags):
+            key_tags.discard(tag)
+            keys = self.tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self.tags[tag]
+        if not key_tags:
+            self.key_tags.pop(key, None)
+
+    def of_type(self, cls) -> list:
+        """Get the keys of objects of a type or of its subclasses.
+
+        :param cls: type, or tuple of types
+        :return: keys
+        :rtype: list
+        """
+        return [key for value_type, keys in self.types.items() if issubclass(value_type, cls) for key in keys]
+
+    def with_prefix(self, prefix) -> list:
+        """Get the string keys that start with a prefix, in sorted order.
+
+        :param str prefix: key prefix
+        :return: keys
+        :rtype: list
+        """
+        start = end = bisect.bisect_left(self.sorted_keys, prefix)
+        while end < len(self.sorted_keys) and self.sorted_keys[end].startswith(prefix):
+            end += 1
+        return self.sorted_keys[start:end]
+
+    def with_tag(self, tag) -> list:
+        """Get the keys with a tag.
+
+        :param tag: tag
+        :return: keys
+        :rtype: list
+        """
+        return list(self.tags.get(tag, ()))
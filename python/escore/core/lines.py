@@ -0,0 +1,199 @@
+"""Project: Eskapade - A python-based package for data analysis.
+
+Created: 2026/10/18
+
+Description:
+    Compact storage of text lines.
+
+Authors:
+    KPMG Advanced Analytics & Big Data team, Amstelveen, The Netherlands
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted according to the terms listed in the file
+LICENSE.
+"""
+
+from array import array
+
+
+class LineArray:
+    """Compact sequence of text lines.
+
+    The lines are stored UTF-8 encoded in one contiguous buffer, with the
+    start and end offsets of each line in two arrays, instead of as one
+    Python string per line.  A line is only decoded to a string when it is
+    accessed.  Slicing, sorting and selecting unique lines rearrange the
+    offsets, and share the buffer.
+
+    With interning, a line that has been stored before is not stored again;
+    its offsets point to the earlier copy.
+
+    >>> lines = LineArray(intern=True)
+    >>> lines.extend(['b', 'a', 'b'])
+    >>> list(lines.sorted()), list(lines.unique())
+    (['a', 'b', 'b'], ['b', 'a'])
+    """
+
+    def __init__(self, lines=(), intern=False):
+        """Initialize line array.
+
+        :param lines: iterable of strings to store
+        :param bool intern: store identical lines only once. Default is false.
+        """
+        self._buffer = bytearray()
+        self._starts = array('q')
+        self._ends = array('q')
+        self.intern = intern
+        self._interned = {} if intern else None
+        self.extend(lines)
+
+    def __getstate__(self):
+        # the interned lines are found again from the offsets
+        state = dict(vars(self))
+        state['_interned'] = None
+        return state
+
+    def __setstate__(self, state):
+        vars(self).update(state)
+        if self.intern:
+            self._interned = {self._line_bytes(idx): (start, end)
+                              for idx, (start, end) in enumerate(zip(self._starts, self._ends))}
+
+    def _view(self, starts, ends):
+        """Get a line array with other offsets in the same buffer."""
+        view = type(self).__new__(type(self))
+        view._buffer = self._buffer
+        view._starts = starts
+        view._ends = ends
+        view.intern = self.intern
+        view._interned = self._interned
+        return view
+
+    def append(self, line: str) -> None:
+        """Append a line.
+
+        :param str line: line to append
+        """
+        data = line.encode('utf-8')
+        span = self._interned.get(data) if self._interned is not None else None
+        if span is None:
+            span = (len(self._buffer), len(self._buffer) + len(data))
+            self._buffer += data
+            if self._interned is not None:
+                self._interned[data] = span
+        self._starts.append(span[0])
+        self._ends.append(span[1])
+
+    def extend(self, lines) -> None:
+        """Append lines.
+
+        :param lines: iterable of strings to append
+        """
+        for line in lines:
+            self.append(line)
+
+    def __len__(self):
+        return len(self._starts)
+
+    def __getitem__(self, idx):
+        if isinstance(idx, slice):
+            return self._view(self._starts[idx], self._ends[idx])
+        return self._line_bytes(idx).decode('utf-8')
+
+    def __iter__(self):
+        for idx in range(len(self)):
+            yield self._line_bytes(idx).decode('utf-8')
+
+    def __add__(self, other):
+        if not isinstance(other, LineArray):
+            return NotImplemented
+        joined = self._view(array('q', self._starts), array('q', self._ends))
+        joined._buffer = self._buffer + other._buffer
+        joined._interned = None
+        joined.intern = False
+        offset = len(self._buffer)
+        joined._starts.extend(start + offset for start in other._starts)
+        joined._ends.extend(end + offset for end in other._ends)
+        return joined
+
+    def __eq__(self, other):
+        if isinstance(other, LineArray):
+            # compare the encoded lines, without decoding them
+            return len(self) == len(other) and all(mine == theirs for mine, theirs
+                                                   in zip(self.iter_bytes(), other.iter_bytes()))
+        if isinstance(other, (list, tuple)):
+            return list(self) == list(other)
+        return NotImplemented
+
+    def _line_bytes(self, idx):
+        """Get the encoded line at an index."""
+        return bytes(self._buffer[self._starts[idx]:self._ends[idx]])
+
+    def iter_bytes(self):
+        """Iterate over the lines as zero-copy views of their UTF-8 bytes.
+
+        :return: iterator over memoryviews
+        """
+        buffer = memoryview(self._buffer)
+        for start, end in zip(self._starts, self._ends):
+            yield buffer[start:end]
+
+    @property
+    def nbytes(self) -> int:
+        """Number of bytes of the buffer and the offset arrays."""
+        return len(self._buffer) + (len(self._starts) + len(self._ends)) * self._starts.itemsize
+
+    def argsort(self) -> list:
+        """Get the indices that sort the lines.
+
+        The order of the UTF-8 bytes is the order of the strings, so the
+        lines are compared without decoding them.
+
+        :return: indices of the lines in sorted order
+        :rtype: list
+        """
+        buffer = self._buffer
+        return sorted(range(len(self)), key=lambda idx: buffer[self._starts[idx]:self._ends[idx]])
+
+    def take(self, indices):
+        """Get a line array with the lines at the given indices, sharing the buffer.
+
+        :param indices: indices of lines
+        :rtype: LineArray
+        """
+        indices = list(indices)
+        return self._view(array('q', (self._starts[idx] for idx in indices)),
+                          array('q', (self._ends[idx] for idx in indices)))
+
+    def sorted(self):
+        """Get a line array with the lines in sorted order, sharing the buffer.
+
+        :rtype: LineArray
+        """
+        return self.take(self.argsort())
+
+    def unique(self):
+        """Get a line array with the first occurrence of each line, sharing the buffer.
+
+        With interning, identical lines have the same offsets and no line is
+        compared by content.
+
+        :rtype: LineArray
+        """
+        seen = set()
+        indices = []
+        for idx, span in enumerate(zip(self._starts, self._ends)):
+            key = span if self.intern else self._line_bytes(idx)
+            if key not in seen:
+                seen.add(key)
+                indices.append(idx)
+        return self.take(indices)
+
+    def write(self, stream) -> None:
+        """Write the lines to a text stream, one per line.
+
+        :param stream: text stream, e.g. sys.stdout
+        """
+        for line in self:
+            stream.write(line)
+            stream.write('\n')
@@ -0,0 +1,273 @@
+"""Project: Eskapade - A python-based package for data analysis.
+
+Created: 2026/10/18
+
+Description:
+    Estimates of the memory used by objects, and spilling of objects to
+    disk.
+
+Authors:
+    KPMG Advanced Analytics & Big Data team, Amstelveen, The Netherlands
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted according to the terms listed in the file
+LICENSE.
+"""
+
+import itertools
+import math
+import os
+import pickle
+import sys
+import types
+
+# objects of these types are counted, but the objects they refer to are not
+_OPAQUE_TYPES = (str, bytes, bytearray, int, float, complex, type(None), type, types.ModuleType,
+                 types.FunctionType, types.BuiltinFunctionType, types.MethodType)
+
+
+def _package(obj) -> str:
+    """Get the name of the top-level package of the type of an object."""
+    return type(obj).__module__.partition('.')[0]
+
+
+def _sample(items, n_items, max_items):
+    """Get an evenly spaced sample of the items of a container.
+
+    :return: sampled items and the number of items each sampled item represents
+    :rtype: tuple
+    """
+    if max_items is None or n_items <= max_items:
+        return items, 1.
+    step = math.ceil(n_items / max_items)
+    sample = list(itertools.islice(items, 0, None, step))
+    return sample, n_items / len(sample)
+
+
+def deep_size(obj, max_items=1000) -> int:
+    """Estimate the memory used by an object and the objects it refers to.
+
+    NumPy arrays report the size of their data and pandas objects their
+    deep memory usage.  The items of lists, tuples, sets and dicts, and the
+    attributes of objects with a __dict__, are counted recursively.  Objects
+    referred to more than once are counted once.
+
+    Of containers with more than max_items items, only an evenly spaced
+    sample of the items is measured, and the size of the other items is
+    extrapolated from the sample.
+
+    :param obj: object
+    :param int max_items: maximum number of measured items of a container; None for all items
+    :return: estimated size in bytes
+    :rtype: int
+    """
+    size = 0.
+    seen = set()
+    # objects to measure, with the number of objects each of them represents
+    stack = [(obj, 1.)]
+    while stack:
+        obj, weight = stack.pop()
+        if id(obj) in seen:
+            continue
+        seen.add(id(obj))
+        package = _package(obj)
+        if package == 'numpy' and hasattr(obj, 'nbytes'):
+            size += weight * max(sys.getsizeof(obj), obj.nbytes)
+        elif package == 'pandas' and hasattr(obj, 'memory_usage'):
+            usage = obj.memory_usage(deep=True)
+            size += weight * (int(usage.sum()) if hasattr(usage, 'sum') else int(usage))
+        elif isinstance(obj, dict):
+            size += weight * sys.getsizeof(obj)
+            items, item_weight = _sample(obj.items(), len(obj), max_items)
+            for item in items:
+                stack.extend((member, weight * item_weight) for member in item)
+        elif isinstance(obj, (list, tuple, set, frozenset)):
+            size += weight * sys.getsizeof(obj)
+            items, item_weight = _sample(obj, len(obj), max_items)
+            stack.extend((item, weight * item_weight) for item in items)
+        elif isinstance(obj, _OPAQUE_TYPES):
+            size += weight * sys.getsizeof(obj)
+        else:
+            size += weight * sys.getsizeof(obj)
+            if hasattr(obj, '__dict__'):
+                stack.append((vars(obj), weight))
+    return int(round(size))
+
+
+class SpilledObject:
+    """Placeholder for an object that has been spilled to disk.
+
+    NumPy arrays with a fixed-size data type are stored in NumPy format;
+    other objects are pickled.  A spilled object is pickled as the original
+    object, so a data store with spilled objects can be persisted.
+
+    The spill file is only removed by the process that created it, so
+    that a forked process does not remove the files of its parent.
+    """
+
+    def __init__(self, path, size, fmt, obj_type=object):
+        """Initialize placeholder.
+
+        :param str path: path of spill file
+        :param int size: estimated size of the object in memory in bytes
+        :param str fmt: format of spill file, 'npy' or 'pickle'
+        :param type obj_type: type of the spilled object
+        """
+        self.path = path
+        self.size = size
+        self.fmt = fmt
+        self.type = obj_type
+        self.pid = os.getpid()
+
+    def __repr__(self):
+        return '<SpilledObject path={!r} size={:d}B>'.format(self.path, self.size)
+
+    def __reduce__(self):
+        return self.__class__.load_path, (self.path, self.fmt)
+
+    @classmethod
+    def spill(cls, obj, path, size):
+        """Write an object to a spill file.
+
+        :param obj: object to spill
+        :param str path: path of spill file, without extension
+        :param int size: estimated size of the object in memory in bytes
+        :return: placeholder of the spilled object
+        :rtype: SpilledObject
+        :raises pickle.PicklingError, AttributeError, TypeError: if the object cannot be pickled
+        :raises OSError: if the spill file cannot be written
+        """
+        is_array = _package(obj) == 'numpy' and type(obj).__name__ == 'ndarray' and not obj.dtype.hasobject
+        path += '.npy' if is_array else '.pkl'
+        try:
+            if is_array:
+                import numpy as np
+                np.save(path, obj, allow_pickle=False)
+            else:
+                with open(path, 'wb') as spill_file:
+                    pickle.dump(obj, spill_file, protocol=pickle.HIGHEST_PROTOCOL)
+        except BaseException:
+            # do not leave a partial spill file
+            if os.path.exists(path):
+                os.remove(path)
+            raise
+        return cls(path, size, 'npy' if is_array else 'pickle', type(obj))
+
+    @staticmethod
+    def load_path(path, fmt):
+        """Read an object from a spill file.
+
+        :param str path: path of spill file
+        :param str fmt: format of spill file, 'npy' or 'pickle'
+        :return: spilled object
+        """
+        if fmt == 'npy':
+            import numpy as np
+            return np.load(path, allow_pickle=False)
+        with open(path, 'rb') as spill_file:
+            return pickle.load(spill_file)
+
+    def load(self):
+        """Read the object from the spill file.
+
+        :return: spilled object
+        """
+        return self.load_path(self.path, self.fmt)
+
+    def remove(self):
+        """Remove the spill file, if it was created by this process."""
+        if self.pid == os.getpid() and os.path.exists(self.path):
+            os.remove(self.path)
+
+
+class MemoryAccount:
+    """Accounting of the memory used by the objects in a store.
+
+    The size of an object is estimated when it is stored, so the account
+    follows the total size of the objects as they are stored and deleted,
+    and records its high-water mark in each accounting period, e.g. a
+    chain.  Objects that are modified in place are not measured again.
+
+    When the total size exceeds the soft limit, a warning is due; when it
+    exceeds the hard limit, the account is marked as exceeded.
+
+    >>> account = MemoryAccount(soft_limit=2**30, hard_limit=2**31)
+    >>> account.start_period('prepare')
+    >>> account.store('df', deep_size(df))
+    >>> account.high_water
+    {'prepare': 104857600}
+    """
+
+    def __init__(self, soft_limit=None, hard_limit=None):
+        """Initialize account.
+
+        :param int soft_limit: total size in bytes above which a warning is due
+        :param int hard_limit: total size in bytes above which the account is exceeded
+        """
+        self.soft_limit = soft_limit
+        self.hard_limit = hard_limit
+        self.sizes = {}
+        self.stored_in = {}
+        self.total = 0
+        self.period = None
+        self.high_water = {}
+        self.exceeded = False
+
+    def start_period(self, name):
+        """Start an accounting period, in which the high-water mark is recorded.
+
+        :param name: name of the period, e.g. the name of a chain
+        """
+        self.period = name
+        self.high_water[name] = max(self.high_water.get(name, 0), self.total)
+
+    def store(self, key, size) -> str:
+        """Account for an object that is stored.
+
+        :param key: key of the object
+        :param int size: estimated size of the object in bytes
+        :return: 'hard' or 'soft' if the object makes the total exceed the hard or soft limit, else None
+        :rtype: str
+        """
+        previous = self.total
+        self.total += size - self.sizes.get(key, 0)
+        self.sizes[key] = size
+        self.stored_in[key] = self.period
+        if self.period is not None:
+            self.high_water[self.period] = max(self.high_water.get(self.period, 0), self.total)
+        if self.hard_limit is not None and self.total > self.hard_limit:
+            self.exceeded = True
+            return 'hard'
+        if self.soft_limit is not None and self.total > self.soft_limit >= previous:
+            return 'soft'
+        return None
+
+    def remove(self, key):
+        """Account for an object that is deleted.
+
+        :param key: key of the object
+        """
+        self.total -= self.sizes.pop(key, 0)
+        self.stored_in.pop(key, None)
+
+    def largest(self, n=5) -> list:
+        """Get the keys of the largest objects.
+
+        :param int n: number of keys
+        :return: key and size of the largest objects, in decreasing order of size
+        :rtype: list
+        """
+        return sorted(self.sizes.items(), key=lambda item: item[1], reverse=True)[:n]
+
+    def report(self) -> dict:
+        """Get a machine-readable report of the account.
+
+        :return: limits, total size, high-water mark of each period, and size and period of each key
+        :rtype: dict
+        """
+        return dict(soft_limit=self.soft_limit,
+                    hard_limit=self.hard_limit,
+                    total_bytes=self.total,
+                    high_water_bytes=dict(self.high_water),
+                    keys={str(key): dict(bytes=size, stored_in=self.stored_in.get(key))
+                          for key, size in sorted(self.sizes.items(), key=lambda item: str(item[0]))})
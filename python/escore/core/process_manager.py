@@ -17,19 +17,30 @@ modification, are permitted according to the terms listed in the file
 LICENSE.
 """
 
+import gc
 import glob
 import importlib
+import json
 import os, sys
+import signal
+import statistics
+import timeit
 
 import multiprocessing
-from multiprocessing import Manager
+import multiprocessing.connection
 
 from escore.core import persistence
 from escore.core.definitions import StatusCode
 from escore.core.element import Chain
+from escore.core.exceptions import ReadOnlyKey
+from escore.core.forking import (AdaptiveChunks, ForkResult, ForkThrottle, ForkWorkerPool, after_fork, available_cpus,
+                                 fork_context)
 from escore.core.meta import Processor, ProcessorSequence
 from escore.core.mixin import TimerMixin
-from escore.core.process_services import ConfigObject, ForkStore, ProcessService
+from escore.core.process_services import (BufferPool, CacheService, ConfigObject, DataStore, DeferredValue,
+                                          ForkStore, ProcessService)
+from escore.core.reducers import TreeReducer
+from escore.core.scheduling import build_dependencies, chain_keys, flatten_keys, last_uses, run_concurrently
 
 
 class ProcessManager(Processor, ProcessorSequence, TimerMixin):
@@ -75,7 +86,8 @@ class ProcessManager(Processor, ProcessorSequence, TimerMixin):
 
         self.prev_chain_name = ''
         self._services = {}
-        self.num_cpu = multiprocessing.cpu_count()
+        self.num_cpu = available_cpus()
+        self.__fork_snapshot = {}
 
     def service(self, service_spec):
         """Get or register process service.
@@ -439,16 +451,24 @@ class ProcessManager(Processor, ProcessorSequence, TimerMixin):
         :returns: status code of execution attempt
         :rtype: StatusCode
         """
+        # record the high-water mark of data-store memory of this chain
+        account = self.service(DataStore).memory_account
+        if account is not None:
+            account.start_period(chain.name)
+
         #  first initialize
         status = chain.initialize()
+        if self.__memory_exceeded(chain):
+            return StatusCode.Failure
         if status.is_failure():
             return status
         elif status.is_skip_chain():
             self.prev_chain_name = chain.name
+            chain.clear_scratch()
             return status
 
         # execute
-        if chain.n_fork > 0: # fork
+        if chain.n_fork > 0 or chain.n_thread > 0: # fork
             status = self.__fork(chain)
         else: # default
             # execute() of a chain can be called to be repeated.
@@ -457,6 +477,8 @@ class ProcessManager(Processor, ProcessorSequence, TimerMixin):
             while status.is_repeat_chain():
                 self.logger.debug('Executing chain={chain}', chain=chain.name)
                 status = chain.execute()
+        if self.__memory_exceeded(chain):
+            return StatusCode.Failure
         if status.is_failure():
             return status
         elif status.is_break_chain():
@@ -464,10 +486,13 @@ class ProcessManager(Processor, ProcessorSequence, TimerMixin):
             pass
         elif status.is_skip_chain():
             self.prev_chain_name = chain.name
+            chain.clear_scratch()
             return status
 
         # finalize.
         status = chain.finalize()
+        if self.__memory_exceeded(chain):
+            return StatusCode.Failure
         if status.is_failure():
             return status
 
@@ -483,88 +508,588 @@ class ProcessManager(Processor, ProcessorSequence, TimerMixin):
 
         return status
 
+    def __memory_exceeded(self, chain) -> bool:
+        """Check if the data-store objects exceed the hard memory limit.
+
+        :param Chain chain: chain that is executed
+        :rtype: bool
+        """
+        account = self.service(DataStore).memory_account
+        if account is None or not account.exceeded:
+            return False
+        self.logger.fatal('Data-store objects exceeded the hard memory limit of {limit:d} bytes in chain {chain}.',
+                          limit=account.hard_limit, chain=chain.name)
+        return True
+
+    def __write_memory_report(self):
+        """Write the memory account of the data store to a JSON file with the results data.
+
+        For each key, the report lists the links of the storing chain that
+        declare the key as store key.  For forked chains, the peak RSS of
+        the forked processes is included.
+        """
+        settings = self.service(ConfigObject)
+        report = self.service(DataStore).memory_account.report()
+        chains = {chain.name: chain for chain in self}
+        for key, entry in report['keys'].items():
+            chain = chains.get(entry['stored_in'])
+            entry['stored_by'] = [link.name for link in chain if key in flatten_keys(link.store_key)] if chain else []
+        report['fork_max_rss_kb'] = {chain.name: max(res.max_rss for res in chain.fork_results)
+                                     for chain in self if any(res.max_rss for res in chain.fork_results)}
+
+        path = persistence.io_path('results_data', 'memory_report.json', settings.io_conf())
+        with open(path, 'w') as report_file:
+            json.dump(report, report_file, indent=2, default=str)
+        self.logger.info('Wrote memory report of data store to "{path}".', path=path)
+
     def __fork(self, chain) -> StatusCode:
         """Fork and execute a chain
 
+        The results of the forked executions are stored in chain.fork_results.
+
         :return: status code of chain-ensemble of fork execution attempts
         :rtype: StatusCode
         """
         self.logger.info("Process id before forking chain {0}: {1}".format(chain.name, os.getpid()))
         self.logger.debug("Running maximum of {} processes concurrently.".format(self.num_cpu))
+        throttle = ForkThrottle(self.num_cpu, memory_per_child=chain.fork_memory)
 
         # store basic fork information
         # settings['fork'] indicates we are currently forking
         settings = self.service(ConfigObject)
         settings['fork'] = True
         fs = self.service(ForkStore)
-        fs['n_fork'] = chain.n_fork
+        fs['n_fork'] = chain.n_fork if chain.n_fork > 0 else chain.n_thread
+
+        for key, reducer in self.__fork_reducers(chain).items():
+            fs.register_reducer(('DataStore', key), reducer)
+        # data-store objects before forking, to detect the objects written by the forked processes
+        self.__fork_snapshot = dict(self.service(DataStore))
+        if chain.fork_warm:
+            self.__warm_up_fork(chain)
+        fork_context.arm()
+        try:
+            if chain.n_fork <= 0:
+                results = self.__fork_threads(chain)
+            elif chain.fork_dynamic:
+                results = self.__fork_chunks(chain, throttle)
+            elif chain.fork_pool:
+                results = self.__fork_pool(chain, throttle)
+            else:
+                results = self.__fork_processes(chain, throttle)
+        finally:
+            fork_context.disarm()
+            self.__fork_snapshot = {}
+            if chain.fork_warm:
+                self.__cool_down_fork()
+        chain.fork_results = sorted(results, key=lambda res: res.fork_index)
+        gathered = self.__gather_fork_data(chain)
 
-        # shared memory between fork processes,
-        # for keeping track of statuscode of each chain
-        status_list = Manager().list()
-        status = StatusCode.Success
+        self.logger.info('Finished forking chain {}'.format(chain.name))
+        for result in chain.fork_results:
+            self.logger.debug('Fork indices {start:d}-{stop:d} of chain {chain}: {result!r}',
+                              start=result.indices[0], stop=result.indices[-1], chain=chain.name, result=result)
+        self.__report_fork_memory(chain)
 
-        # keep track of number of forked processes
-        child_pid_list = []
-        n_running = 0
-        fidx = 0
+        # cleanup; no longer in fork
+        if 'fork' in settings:
+            del settings['fork']
 
-        # start forks
-        while fidx < chain.n_fork:
-            # throttle number of processes running at the same time
-            if n_running < self.num_cpu:
+        # cancelled executions do not contribute to the status of the chain
+        status = StatusCode.Success if gathered else StatusCode.Failure
+        n_cancelled = sum(result.cancelled for result in results)
+        if n_cancelled:
+            self.logger.warning('Cancelled {n:d} forked executions of chain {chain}.', n=n_cancelled,
+                                chain=chain.name)
+        return max([status] + [result.status for result in results if not result.cancelled])
+
+    @staticmethod
+    def __fork_reducers(chain) -> dict:
+        """Get the reducers of the data-store keys that are known to be gathered after forking a chain.
+
+        :rtype: dict
+        """
+        reducers = dict(chain.fork_reducers) if chain.fork_merge else {}
+        reducers.update(chain.fork_gather)
+        return reducers
+
+    def __warm_up_fork(self, chain):
+        """Prepare the parent process for copy-on-write friendly forking.
+
+        Objects that exist before forking are moved to the permanent
+        generation of the garbage collector, so the collector in the forked
+        processes does not write to their headers, which would copy the
+        memory pages they are in.  The data-store keys in
+        chain.fork_read_only are marked as read-only.
+        """
+        self.service(DataStore).set_read_only(chain.fork_read_only)
+        if not hasattr(gc, 'freeze'):
+            self.logger.warning('Garbage-collector freeze requires Python 3.7 or newer; not freezing objects.')
+            return
+        gc.collect()
+        gc.freeze()
+        self.logger.debug('Froze {n:d} objects before forking chain {chain}.', n=gc.get_freeze_count(),
+                          chain=chain.name)
+
+    def __cool_down_fork(self):
+        """Undo the preparation of copy-on-write friendly forking."""
+        if hasattr(gc, 'unfreeze'):
+            gc.unfreeze()
+        self.service(DataStore).set_read_only()
+
+    def __gather_fork_data(self, chain) -> bool:
+        """Gather the data-store objects written by the forked processes of a chain.
+
+        The objects of the keys in chain.fork_gather and, in fork-merge
+        mode, all new or replaced objects are reduced in order of fork index
+        and stored in the data store of the parent process.  Objects that
+        cannot be combined with the built-in join reducer, e.g. numbers, are
+        gathered in a list with the object of each fork index.
+
+        :return: True if all objects have been gathered successfully
+        :rtype: bool
+        """
+        ds = self.service(DataStore)
+        fs = self.service(ForkStore)
+        reducers = self.__fork_reducers(chain)
+        gathered = {}
+        errors = {}
+        for key in chain.fork_gather:
+            try:
+                gathered[key] = fs.reduce(('DataStore', key))
+            except (TypeError, ValueError) as exc:
+                errors[key] = exc
+                continue
+            if gathered[key] is None:
+                self.logger.warning('No forked process of chain {chain} stored data-store key {key}.',
+                                    chain=chain.name, key=key)
+                del gathered[key]
+        if chain.fork_merge:
+            # reduce the objects of all other written keys in one pass over the namespaces
+            trees = {}
+            for name, namespace in fs.namespaces().items():
+                for ns_key, obj in namespace.items():
+                    if not isinstance(ns_key, tuple) or ns_key[0] != 'DataStore':
+                        continue
+                    key = ns_key[1]
+                    if key in chain.fork_gather or key in errors:
+                        continue
+                    if key not in trees:
+                        trees[key] = TreeReducer(reducers.get(key, chain.fork_merge_default))
+                    try:
+                        trees[key].add(name, name + 1, obj)
+                    except (TypeError, ValueError) as exc:
+                        errors[key] = exc
+                        del trees[key]
+            for key, tree in trees.items():
                 try:
-                    # submit a new process
-                    pid = os.fork()
-                except OSError:
-                    sys.stderr.write("Could not create a child process\n")
-                    continue
+                    gathered[key] = tree.result()
+                except (TypeError, ValueError) as exc:
+                    errors[key] = exc
+            self.logger.debug('Merged {n:d} data-store objects written by forked processes of chain {chain}: '
+                              '{keys}.', n=len(trees), chain=chain.name, keys=', '.join(sorted(trees)))
+        for key, exc in errors.items():
+            if reducers.get(key, chain.fork_merge_default) != 'join':
+                self.logger.error('Failed to gather data-store object {key} of forked chain {chain}: {exc!s}. '
+                                  'Configure a reducer for each key in chain.fork_reducers.',
+                                  key=key, chain=chain.name, exc=exc)
+                return False
+            self.logger.warning('Cannot join data-store objects {key} of forked chain {chain}: {exc!s}. '
+                                'Gathering the object of each fork index in a list.',
+                                key=key, chain=chain.name, exc=exc)
+            gathered[key] = fs.collect(('DataStore', key))
+        ds.update(gathered)
+        return True
+
+    def __report_fork_memory(self, chain):
+        """Report the memory usage of the forked processes of a chain."""
+        results = [res for res in chain.fork_results if res.max_rss]
+        if not results:
+            return
+        dirty = [res.private_dirty for res in results if res.private_dirty is not None]
+        self.logger.info('Maximum peak RSS of {n:d} forked executions of chain {chain}: {rss:d} kB.',
+                         n=len(results), chain=chain.name, rss=max(res.max_rss for res in results))
+        if dirty:
+            self.logger.info('Private (unshared) memory of forked executions of chain {chain}: {mean:.0f} kB on '
+                             'average, {max:d} kB maximum.', chain=chain.name, mean=sum(dirty) / len(dirty),
+                             max=max(dirty))
+
+    def __execute_fork_indices(self, chain, indices, isolate=False) -> ForkResult:
+        """Execute a chain for a range of fork indices, in a forked process.
+
+        The data-store objects that the execution writes, i.e. new or
+        replaced objects compared to the data store before forking, are
+        shipped to the parent process.
+
+        :param range indices: fork indices assigned to this execution
+        :param bool isolate: roll the data store back to its state before forking after the execution,
+                             for worker processes that execute multiple ranges of fork indices
+        :return: status code and resource usage of execution attempt
+        :rtype: ForkResult
+        """
+        settings = self.service(ConfigObject)
+        fs = self.service(ForkStore)
 
-                if pid == 0:
-                    self.logger.info("In child process {}, chain={}, with PID {}".format(fidx, chain.name, os.getpid()))
-                    settings['fork_index'] = fidx
-                    # execute() of a chain can be called to be repeated.
-                    # Note: by default this is not done. i.e. chains are only executed once
-                    fstatus = StatusCode.RepeatChain
-                    while fstatus.is_repeat_chain():
-                        self.logger.debug('Executing chain={chain}', chain=chain.name)
-                        fstatus = chain.execute()
-                    # store exit status of each forked chain
-                    status_list.append(fstatus)
-                    # safe jupyter exit when forking
-                    os._exit(os.EX_OK)
-                else:
-                    self.logger.debug("In parent process after forking child {}".format(pid))
-                    child_pid_list.append(pid)
-                    n_running += 1
-                    fidx += 1
+        def execute():
+            # execute() of a chain can be called to be repeated.
+            # Note: by default this is not done. i.e. chains are only executed once
+            fstatus = StatusCode.RepeatChain
+            while fstatus.is_repeat_chain():
+                if fork_context.cancelled:
+                    return StatusCode.BreakChain
+                self.logger.debug('Executing chain={chain}', chain=chain.name)
+                fstatus = chain.execute()
+            return fstatus
+
+        if fork_context.cancelled:
+            # e.g. queued for a pool worker before the execution was cancelled
+            return ForkResult(indices, cancelled=True)
+        ds = self.service(DataStore)
+        thread_view = ds.thread_view()
+        if thread_view is None:
+            # in a thread, the fork index is a thread-local override of the setting
+            settings['fork_index'] = indices[0]
+        fork_context.assign(indices)
+        fs.open_namespace(indices[0])
+        snapshot = ds.snapshot() if isolate else None
+        try:
+            try:
+                result = ForkResult.measure(indices, execute, threaded=thread_view is not None)
+            finally:
+                fork_context.release()
+            if thread_view is not None:
+                # the objects written by a thread are exactly those in its view of the data store
+                written = dict(thread_view)
+            elif chain.fork_merge:
+                written = {key: obj for key, obj in ds.items() if self.__is_written(key, obj)}
             else:
-                self.logger.debug("Waiting for a child process to finish before forking again.")
-                finished = os.waitpid(0, 0)
-                if finished[0] in child_pid_list:
-                    self.logger.debug("Finished child process {} with status {}".format(finished[0], finished[1]))
-                    child_pid_list.remove(finished[0])
-                    n_running -= 1
-
-        self.logger.debug("Back in parent process after forking {} children".format(chain.n_fork))
-
-        # double-check all forks are finished
-        while child_pid_list:
-            self.logger.debug("Waiting for all child processes to finish.")
-            finished = os.waitpid(0, 0)
-            if finished[0] in child_pid_list:
-                self.logger.debug("Finished child process {} with status {}".format(finished[0], finished[1]))
-                child_pid_list.remove(finished[0])
+                written = {key: ds[key] for key in chain.fork_gather if key in ds and self.__is_written(key, ds[key])}
+            # data-store objects to be gathered in the parent process
+            for key, obj in written.items():
+                if chain.fork_merge or key in chain.fork_gather:
+                    fs.local[('DataStore', key)] = obj
+            if result.traceback:
+                self.logger.error('Exception in fork indices {start:d}-{stop:d} of chain {chain}:\n{tb}',
+                                  start=indices[0], stop=indices[-1], chain=chain.name, tb=result.traceback)
+            # ship the objects of this fork index to the parent in a single message
+            fs.commit()
+        finally:
+            if snapshot is not None:
+                # the next execution in this worker process starts from the data store before forking
+                ds.rollback(snapshot)
+        return result
+
+    def __is_written(self, key, obj) -> bool:
+        """Check if a data-store object is new or replaced compared to the data store before forking."""
+        previous = self.__fork_snapshot.get(key, self.__fork_snapshot)
+        if isinstance(previous, DeferredValue) and previous.evaluated and previous.evaluate() is obj:
+            # a deferred value that was evaluated is not a new object
+            return False
+        return previous is not obj
+
+    def __fork_pool(self, chain, throttle) -> list:
+        """Execute the fork indices of a chain on a pool of long-lived worker processes.
+
+        :param ForkThrottle throttle: limit on the number of worker processes
+        :return: results of the fork indices
+        :rtype: list
+        """
+        n_workers = throttle.max_workers(chain.n_fork)
+        self.logger.debug('Executing {n:d} fork indices on a pool of {n_workers:d} worker processes.',
+                          n=chain.n_fork, n_workers=n_workers)
 
-        self.logger.info('Finished forking chain {}'.format(chain.name))
+        fs = self.service(ForkStore)
 
-        # cleanup; no longer in fork
-        if 'fork' in settings:
-            del settings['fork']
+        def execute(fidx):
+            """Execute a fork index in a worker process, which executes other fork indices before and after."""
+            return self.__execute_fork_indices(chain, range(fidx, fidx + 1), isolate=True)
 
-        if len(status_list)>0:
-            status = max(status_list)
-        return status
+        pool = ForkWorkerPool(n_workers, target=execute, on_exit=self.service(DataStore).finish)
+        pool.start()
+        try:
+            fork_results = pool.map(range(chain.n_fork), callback=lambda fidx, _: fs.absorb(range(fidx, fidx + 1)),
+                                    stop=self.__stops_fork)
+        finally:
+            pool.close(timeout=chain.fork_grace_period if fork_context.cancelled else None)
+
+        return [ForkResult.lost(range(fidx, fidx + 1), 'No result received from worker process.',
+                                cancelled=fork_context.cancelled)
+                if result is None else result for fidx, result in fork_results.items()]
+
+    def __fork_chunks(self, chain, throttle) -> list:
+        """Execute a chain for chunks of fork indices pulled by a pool of worker processes.
+
+        Workers pull the next chunk of fork indices when they are done with
+        the previous one.  The chunk size is adapted to the measured
+        execution time, see AdaptiveChunks.
+
+        :param ForkThrottle throttle: limit on the number of worker processes
+        :return: results of the executed chunks
+        :rtype: list
+        """
+        n_workers = throttle.max_workers(chain.n_fork)
+        chunks = AdaptiveChunks(chain.n_fork, n_workers)
+        fs = self.service(ForkStore)
+
+        def update_chunks(chunk, result):
+            """Pass the measured chunk latency to the chunk iterator and absorb the results of the chunk."""
+            if result is not None:
+                chunks.update(chunk, result.wall_time)
+            fs.absorb(range(*chunk))
+
+        pool = ForkWorkerPool(n_workers,
+                              target=lambda chunk: self.__execute_fork_indices(chain, range(*chunk), isolate=True),
+                              on_exit=self.service(DataStore).finish)
+        pool.start()
+        try:
+            chunk_results = pool.map(chunks, callback=update_chunks, stop=self.__stops_fork)
+        finally:
+            pool.close(timeout=chain.fork_grace_period if fork_context.cancelled else None)
+        self.logger.debug('Executed {n:d} fork indices in {n_chunks:d} chunks on {n_workers:d} worker processes.',
+                          n=chain.n_fork, n_chunks=len(chunk_results), n_workers=n_workers)
+
+        return [ForkResult.lost(range(*chunk), 'No result received from worker process.',
+                                cancelled=fork_context.cancelled)
+                if result is None else result for chunk, result in chunk_results.items()]
+
+    def __fork_threads(self, chain) -> list:
+        """Execute the fork indices of a chain on a pool of threads.
+
+        Each thread has its own fork index in the configuration object, its
+        own view of the data store and its own namespace in the fork store,
+        so links see the same state as in a forked process.  Objects that
+        are already in the data store are shared by the threads and must not
+        be modified in place.
+
+        :return: results of the fork indices
+        :rtype: list
+        """
+        settings = self.service(ConfigObject)
+        ds = self.service(DataStore)
+        fs = self.service(ForkStore)
+        n_workers = min(self.num_cpu, chain.n_thread)
+        self.logger.debug('Executing {n:d} fork indices on a pool of {n_workers:d} threads.',
+                          n=chain.n_thread, n_workers=n_workers)
+
+        def execute(fidx):
+            """Execute a fork index in a worker thread."""
+            settings.override_in_thread(fork_index=fidx)
+            ds.open_thread_view()
+            chain.open_thread_scratch()
+            try:
+                return self.__execute_fork_indices(chain, range(fidx, fidx + 1))
+            finally:
+                chain.close_thread_scratch()
+                ds.close_thread_view()
+                settings.override_in_thread()
+
+        indices = list(range(chain.n_thread))
+        fork_results = run_concurrently(indices, [set()] * len(indices), execute, n_workers,
+                                        stop=self.__stops_fork,
+                                        done=lambda fidx, _: fs.absorb(range(fidx, fidx + 1)))
+
+        return list(fork_results.values())
+
+    @staticmethod
+    def __stops_fork(result) -> bool:
+        """Check if a result of a forked execution cancels the execution of the other fork indices.
+
+        The execution is cancelled if the result is missing, or if its
+        status is Failure or BreakChain.  The cancellation flag is set.
+
+        :rtype: bool
+        """
+        if result is not None and not result.status.is_failure() and not result.status.is_break_chain():
+            return False
+        fork_context.cancel()
+        return True
+
+    @staticmethod
+    def __find_straggler(children, started, duplicated, wall_times):
+        """Find the slowest running fork index that qualifies for speculative re-execution.
+
+        A fork index qualifies if it has no speculative copy yet and has
+        been running longer than the median wall-clock time of the finished
+        fork indices.
+
+        :param dict children: fork index and result pipe of each running process id
+        :param dict started: start time of each running process id
+        :param set duplicated: fork indices with a speculative copy
+        :param list wall_times: wall-clock times of the finished fork indices
+        :return: fork index of straggler, or None, and time to wait until the next fork index qualifies
+        :rtype: tuple
+        """
+        candidates = [(started[pid], fidx) for pid, (fidx, _) in children.items() if fidx not in duplicated]
+        if not candidates or not wall_times:
+            return None, None
+        start, fidx = min(candidates)
+        running_time = timeit.default_timer() - start
+        threshold = statistics.median(wall_times)
+        if running_time >= threshold:
+            return fidx, None
+        return None, threshold - running_time
+
+    def __fork_processes(self, chain, throttle) -> list:
+        """Fork one child process for each fork index of a chain.
+
+        Each child sends its result to the parent through its own pipe.  The
+        parent only waits for its own children.  After the first Failure or
+        BreakChain, the forked execution is cancelled: no new children are
+        forked, running children are sent SIGTERM, and children that have
+        not finished after chain.fork_grace_period seconds are killed.
+
+        With chain.fork_speculative, a straggler is executed twice: once the
+        fraction chain.fork_speculative_after of the fork indices has
+        finished, the slowest running fork index that takes longer than the
+        median fork index is forked again.  The first copy to finish wins and
+        the other copy is killed.  Objects in the fork store are committed
+        once per fork index, so only the objects of one copy are gathered.
+
+        :param ForkThrottle throttle: limit on the number of running child processes
+        :return: results of the forked chains
+        :rtype: list
+        """
+        fs = self.service(ForkStore)
+        results = []
+        # running children: fork index and result pipe, and start time of each process id
+        children = {}
+        started = {}
+        fidx = 0
+        # time at which running children are killed after cancellation
+        deadline = None
+        killed = False
+        # speculative re-execution of stragglers
+        finished = set()
+        wall_times = []
+        duplicated = set()
+        speculative_pids = set()
+
+        def fork_child(child_fidx):
+            """Fork a child process that executes a fork index.
+
+            :return: process id of child, or None if no process could be created
+            """
+            reader, writer = multiprocessing.Pipe(duplex=False)
+            try:
+                # submit a new process
+                pid = os.fork()
+            except OSError as exc:
+                reader.close()
+                writer.close()
+                if not children:
+                    raise
+                self.logger.warning('Could not create a child process: {exc!s}; waiting for a child to finish.',
+                                    exc=exc)
+                return None
+
+            if pid == 0:
+                exit_code = os.EX_OK
+                try:
+                    after_fork()
+                    fork_context.handle_sigterm()
+                    reader.close()
+                    self.logger.info("In child process {}, chain={}, with PID {}".format(child_fidx, chain.name,
+                                                                                         os.getpid()))
+                    writer.send(self.__execute_fork_indices(chain, range(child_fidx, child_fidx + 1)))
+                except BaseException:
+                    exit_code = 1
+                finally:
+                    try:
+                        # remove the spill files of the child process
+                        self.service(DataStore).finish()
+                    finally:
+                        # safe jupyter exit when forking
+                        os._exit(exit_code)
+            self.logger.debug("In parent process after forking child {}".format(pid))
+            writer.close()
+            children[pid] = (child_fidx, reader)
+            started[pid] = timeit.default_timer()
+            return pid
+
+        while (fidx < chain.n_fork and deadline is None) or children:
+            timeout = None
+            # throttle number of processes running at the same time
+            if fidx < chain.n_fork and deadline is None and throttle.may_start(len(children)):
+                if fork_child(fidx) is not None:
+                    fidx += 1
+                    continue
+            elif (chain.fork_speculative and fidx >= chain.n_fork and deadline is None
+                  and len(finished) >= chain.fork_speculative_after * chain.n_fork):
+                straggler, timeout = self.__find_straggler(children, started, duplicated, wall_times)
+                if straggler is not None and throttle.may_start(len(children)):
+                    pid = fork_child(straggler)
+                    if pid is not None:
+                        self.logger.info('Started speculative copy of straggling fork index {fidx:d} of chain '
+                                         '{chain}.', fidx=straggler, chain=chain.name)
+                        duplicated.add(straggler)
+                        speculative_pids.add(pid)
+                        continue
+
+            # a child sends its result, or closes its pipe, when it finishes
+            self.logger.debug("Waiting for a child process to finish.")
+            if deadline is not None:
+                timeout = None if killed else max(0., deadline - timeit.default_timer())
+            ready = multiprocessing.connection.wait([reader for _, reader in children.values()], timeout)
+            if not ready:
+                if deadline is None:
+                    # a running fork index now qualifies for speculative re-execution
+                    continue
+                self.logger.warning('Killing {n:d} child processes that did not finish within {grace:g} seconds '
+                                    'after cancellation.', n=len(children), grace=chain.fork_grace_period)
+                for pid in children:
+                    os.kill(pid, signal.SIGKILL)
+                killed = True
+                continue
+            for pid, (child_fidx, reader) in list(children.items()):
+                if reader not in ready:
+                    continue
+                indices = range(child_fidx, child_fidx + 1)
+                try:
+                    result = reader.recv()
+                except EOFError:
+                    result = None
+                reader.close()
+                _, exit_status = os.waitpid(pid, 0)
+                del children[pid]
+                del started[pid]
+                self.logger.debug("Finished child process {} with status {}".format(pid, exit_status))
+                copies = [other_pid for other_pid, (other_fidx, _) in children.items() if other_fidx == child_fidx]
+                if child_fidx in finished or (result is None and copies and deadline is None):
+                    # the other copy of a speculatively executed fork index finished first, or is still running
+                    continue
+                if result is None:
+                    if deadline is None:
+                        result = ForkResult.lost(indices, 'Child process {:d} exited with status {:d} without '
+                                                          'sending a result.'.format(pid, exit_status))
+                    else:
+                        result = ForkResult.lost(indices, 'Terminated after cancellation.', cancelled=True)
+                result.speculative = pid in speculative_pids
+                for other_pid in copies:
+                    # first copy to finish wins
+                    self.logger.debug('Killing child process {pid:d} of fork index {fidx:d}, which finished in '
+                                      'child process {winner:d}.', pid=other_pid, fidx=child_fidx, winner=pid)
+                    os.kill(other_pid, signal.SIGKILL)
+                finished.add(child_fidx)
+                if result.status == StatusCode.Success:
+                    wall_times.append(result.wall_time)
+                results.append(result)
+                throttle.update(result)
+                fs.absorb(indices)
+
+                if deadline is None and self.__stops_fork(result):
+                    # cancel: stop forking and terminate the running children
+                    deadline = timeit.default_timer() + chain.fork_grace_period
+                    self.logger.error('Fork index {fidx:d} of chain {chain} returned {status!s}; cancelling {n:d} '
+                                      'running child processes.', fidx=child_fidx, chain=chain.name,
+                                      status=result.status, n=len(children))
+                    if result.traceback:
+                        self.logger.error('{tb}', tb=result.traceback)
+                    for other_pid in children:
+                        os.kill(other_pid, signal.SIGTERM)
+
+        self.logger.debug("Back in parent process after forking {} children".format(fidx + len(duplicated)))
+
+        return results
 
     def execute(self):
         """Execute all chains in order.
@@ -577,10 +1102,33 @@ class ProcessManager(Processor, ProcessorSequence, TimerMixin):
         self.logger.info('Executing process manager.')
 
         settings = self.service(ConfigObject)
+        if settings.get('nJobs'):
+            self.num_cpu = settings['nJobs']
+        ds = self.service(DataStore)
+        if settings.get('dsMemoryBudget'):
+            ds.set_memory_budget(settings['dsMemoryBudget'], spill_dir=settings.get('dsSpillDir'))
+        if settings.get('dsMemoryAccounting') or settings.get('dsSoftLimit') or settings.get('dsHardLimit'):
+            ds.enable_memory_accounting(soft_limit=settings.get('dsSoftLimit'), hard_limit=settings.get('dsHardLimit'))
+        if settings.get('bufferPoolMaxBytes'):
+            self.service(BufferPool).max_bytes = settings['bufferPoolMaxBytes']
+        if settings.get('cacheMemoryBudget'):
+            self.service(CacheService).memory_budget = settings['cacheMemoryBudget']
+        if settings.get('cacheDisk'):
+            cache_dir = os.path.join(persistence.io_dir('proc_service_data', settings.io_conf()), 'cache')
+            self.service(CacheService).enable_disk_tier(cache_dir, ttl=settings.get('cacheTtl'))
+
+        if settings.get('parallelChains'):
+            status = self.__execute_concurrently()
+            if ds.memory_account is not None:
+                self.__write_memory_report()
+            self.logger.debug('Done executing process manager.')
+            return status
 
         # execute chains
         last_chain = None
         persist_results = settings.get('storeResultsEachChain')
+        dead_keys = self.__dead_keys([chain for chain in self if chain.enabled]) \
+            if settings.get('dsReleaseDeadKeys') else {}
 
         for chain in self:
             if chain.enabled:
@@ -593,6 +1141,7 @@ class ProcessManager(Processor, ProcessorSequence, TimerMixin):
                 # check if we need to persist process services
                 if settings.get('doNotStoreResults'):
                     # never persist anything
+                    self.__release_keys(chain, dead_keys.get(chain, ()))
                     continue
 
                 persist_results = persist_results or (settings.get('storeResultsOneChain') == chain.name)
@@ -603,6 +1152,7 @@ class ProcessManager(Processor, ProcessorSequence, TimerMixin):
                 # persist process services with the output of this chain
                 self.persist_services(io_conf=settings.io_conf(), chain=chain.name)
                 last_chain = None
+                self.__release_keys(chain, dead_keys.get(chain, ()))
 
         # TODO (janos4276) I don't like this. We need to rethink this.
         # We need to find a better way of persisting or specifying options
@@ -612,10 +1162,115 @@ class ProcessManager(Processor, ProcessorSequence, TimerMixin):
             # persist process services with the output of the last executed chain
             self.persist_services(io_conf=settings.io_conf(), chain=last_chain.name)
 
+        if ds.memory_account is not None:
+            self.__write_memory_report()
+
         self.logger.debug('Done executing process manager.')
 
         return status
 
+    def __dead_keys(self, chains) -> dict:
+        """Determine the data-store keys that are no longer used after each chain.
+
+        The last use of a key follows from the read and store keys declared
+        by the links of the chains; a chain with links that do not declare
+        their keys may use any key.  Keys in the setting dsFinalKeys are
+        final output and are kept.  As the process services are persisted
+        after the last chain, unless the setting doNotStoreResults is true,
+        keys are only released if no later chain persists the data store.
+
+        :param list chains: enabled chains, in execution order
+        :return: keys to release after each chain
+        :rtype: dict
+        """
+        settings = self.service(ConfigObject)
+        final_keys = set(settings.get('dsFinalKeys') or ())
+        # the process services are persisted after the last chain, and possibly after earlier ones
+        first_release = 0 if settings.get('doNotStoreResults') else len(chains) - 1
+
+        dead_keys = {}
+        for key, idx in last_uses([chain_keys(chain) for chain in chains]).items():
+            if key not in final_keys and idx >= first_release:
+                dead_keys.setdefault(chains[idx], set()).add(key)
+        return dead_keys
+
+    def __release_keys(self, chain, keys):
+        """Release data-store objects that are no longer used after a chain.
+
+        :param Chain chain: chain after which the objects are released
+        :param keys: data-store keys of the objects
+        """
+        ds = self.service(DataStore)
+        freed = 0
+        for key in sorted(keys):
+            if key not in ds:
+                continue
+            size = ds.memory_size(key)
+            try:
+                del ds[key]
+            except ReadOnlyKey:
+                continue
+            freed += size
+            self.logger.info('Released data-store object "{key}" after its last use in chain {chain}, '
+                             'freeing an estimated {size:d} bytes.', key=key, chain=chain.name, size=size)
+        if freed:
+            self.logger.info('Released an estimated {size:d} bytes of data-store objects after chain {chain}.',
+                             size=freed, chain=chain.name)
+
+    def __execute_concurrently(self) -> StatusCode:
+        """Execute chains without data dependencies concurrently.
+
+        The dependencies between chains follow from the read and store keys
+        declared by their links.  Independent chains are executed on a pool
+        of at most num_cpu threads.  Forked chains, chains with links that do
+        not declare their keys, and chains after which process services are
+        persisted are executed on their own, in order.
+
+        :return: status code of execution attempt
+        :rtype: StatusCode
+        """
+        settings = self.service(ConfigObject)
+        chains = [chain for chain in self if chain.enabled]
+
+        # determine after which chains the process services are persisted
+        persist_chains = set()
+        if not settings.get('doNotStoreResults'):
+            persist_results = settings.get('storeResultsEachChain')
+            for chain in chains:
+                persist_results = persist_results or (settings.get('storeResultsOneChain') == chain.name)
+                if persist_results:
+                    persist_chains.add(chain)
+
+        # build chain dependencies
+        keys = [None if chain.n_fork > 0 or chain.n_thread > 0 or chain in persist_chains else chain_keys(chain)
+                for chain in chains]
+        deps = build_dependencies(keys)
+        self.logger.info('Executing {n:d} chains concurrently on a maximum of {n_cpu:d} threads.',
+                         n=len(chains), n_cpu=self.num_cpu)
+
+        def exec_chain(chain):
+            """Execute chain and store its exit status."""
+            status = self.__exec(chain)
+            chain.exitStatus = status
+            return status
+
+        def persist_chain(chain, status):
+            """Persist process services with the output of a chain."""
+            if status != StatusCode.Failure and chain in persist_chains:
+                self.persist_services(io_conf=settings.io_conf(), chain=chain.name)
+
+        statuses = run_concurrently(chains, deps, exec_chain, self.num_cpu,
+                                    stop=lambda status: status == StatusCode.Failure, done=persist_chain)
+
+        executed = [chain for chain in chains if chain in statuses and statuses[chain] != StatusCode.Failure]
+        if executed and executed[-1] not in persist_chains and not settings.get('doNotStoreResults'):
+            # persist process services with the output of the last executed chain
+            self.persist_services(io_conf=settings.io_conf(), chain=executed[-1].name)
+
+        if StatusCode.Failure in statuses.values():
+            return StatusCode.Failure
+        return statuses[executed[-1]] if executed else StatusCode.Success
+
     def finalize(self):
         """Finalize the process manager manager.
 
@@ -628,6 +1283,10 @@ class ProcessManager(Processor, ProcessorSequence, TimerMixin):
         total_time = self.stop_timer()
         self.logger.info('Total runtime: {time:.2f} seconds', time=total_time)
 
+        # hit rates of the cache
+        if CacheService in self._services:
+            self._services[CacheService].Print()
+
         self.logger.debug('Done finalizing process manager.')
 
         return StatusCode.Success
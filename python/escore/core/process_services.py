@@ -13,14 +13,23 @@ modification, are permitted according to the terms listed in the file
 LICENSE.
 """
 
+import contextlib
+import functools
+import hashlib
+import mmap
 import os
 import pickle
 import re
-from collections import defaultdict
+import shutil
+import tempfile
+import threading
+import types
+from collections import OrderedDict, defaultdict
 from typing import Any
 import time
 
 import multiprocessing
+import multiprocessing.util
 from multiprocessing import Manager
 
 import escore.utils
@@ -28,11 +37,20 @@ from escore.core.definitions import CONFIG_DEFAULTS
 from escore.core.definitions import CONFIG_OPTS_SETTERS
 from escore.core.definitions import CONFIG_VARS
 from escore.core.definitions import USER_OPTS
-from escore.core.exceptions import UnknownSetting
+from escore.core.exceptions import ReadOnlyKey, UnknownSetting
+from escore.core.indexing import KeyIndex
+from escore.core.memory import MemoryAccount, SpilledObject, deep_size
+from escore.core.reducers import TreeReducer
 from escore.logger import Logger
 from escore.utils import check_interactive_backend
 
 
+# per-thread views of process services, for chains executed on a pool of threads
+_thread_state = threading.local()
+# marker of a key that was absent when a data-store snapshot was taken
+_ABSENT = object()
+
+
 class ProcessServiceMeta(type):
     """Meta class for process-services base class."""
 
@@ -211,6 +229,9 @@ class ConfigObject(ProcessService):
         :return: The value of setting.
         :raise: UnknownSetting if it does not exist.
         """
+        overrides = getattr(_thread_state, 'settings', None)
+        if overrides and setting in overrides:
+            return overrides[setting]
         if setting in self.__settings:
             return self.__settings[setting]
 
@@ -241,7 +262,20 @@ class ConfigObject(ProcessService):
         :param setting: The setting to check for.
         :return: True if setting is present else False.
         """
-        return setting in self.__settings
+        overrides = getattr(_thread_state, 'settings', None)
+        return setting in self.__settings or bool(overrides and setting in overrides)
+
+    @staticmethod
+    def override_in_thread(**settings) -> None:
+        """Override settings in the running thread only.
+
+        Used for settings that differ per thread, such as the fork index of a
+        chain that is executed on a pool of threads.  The overrides are not
+        part of the configuration object and are not persisted.
+
+        :param settings: values of the overridden settings; without settings all overrides are removed
+        """
+        _thread_state.settings = dict(settings)
 
     def get(self, setting: str, default: Any = None) -> object:
         """Get value of setting. If it does not exists return the default value.
@@ -366,6 +400,61 @@ class ConfigObject(ProcessService):
             self['analysis_version'] = str(self['analysis_version'])
 
 
+class DeferredValue:
+    """Value in the data store that is computed on first access.
+
+    A deferred value holds a function and its arguments.  The function is
+    called once, when the value is first read from the data store, and its
+    result replaces the deferred value in the data store.
+
+    >>> ds.defer('hist', make_histogram, df, bins=100)
+    >>> 'hist' in ds  # True, without making the histogram
+    >>> hist = ds['hist']  # makes the histogram
+    """
+
+    def __init__(self, func, *args, **kwargs):
+        """Initialize deferred value.
+
+        :param func: function that computes the value
+        :param args: positional arguments of the function
+        :param kwargs: keyword arguments of the function
+        """
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+        self.evaluated = False
+        self._value = None
+        self._lock = threading.Lock()
+
+    def __repr__(self):
+        return '<DeferredValue func={} evaluated={}>'.format(getattr(self.func, '__name__', self.func), self.evaluated)
+
+    def __getstate__(self):
+        state = dict(vars(self))
+        del state['_lock']
+        return state
+
+    def __setstate__(self, state):
+        vars(self).update(state)
+        self._lock = threading.Lock()
+
+    def evaluate(self):
+        """Compute the value, once.
+
+        The function is called on the first evaluation; later evaluations,
+        also by other threads, return the same value.  The function and its
+        arguments are released after the evaluation.
+
+        :return: value
+        """
+        with self._lock:
+            if not self.evaluated:
+                self._value = self.func(*self.args, **self.kwargs)
+                self.evaluated = True
+                self.func, self.args, self.kwargs = None, (), {}
+        return self._value
+
+
 class DataStore(ProcessService, dict):
     """Store for transient data sets and related objects.
 
@@ -403,9 +492,647 @@ class DataStore(ProcessService, dict):
     And reload from the pickle file with:
 
     >>> ds = DataStore.import_from_file(file_path)
+
+    Keys can be marked as read-only, e.g. while forking, such that objects
+    shared with forked processes are not replaced or deleted:
+
+    >>> ds.set_read_only(['big_df'])
+    >>> ds['big_df'] = other_df  # raises ReadOnlyKey
+
+    The memory used by the objects in the data store can be limited.  When
+    the budget is exceeded, the least-recently-used objects are spilled to
+    disk, and loaded again when they are accessed:
+
+    >>> ds.set_memory_budget(8 * 1024**3, spill_dir='/tmp/spill')
+    >>> ds.spill_stats()
+    {'hits': 12, 'misses': 1, 'spills': 2, 'spilled_bytes': 1073741824, 'in_memory_bytes': 7516192768}
+
+    Only objects that are not referred to elsewhere are actually freed by
+    spilling.  Iterating over the values or items of the data store yields
+    placeholders (SpilledObject) for spilled objects.
+
+    A value can be deferred: it is computed by a function when it is first
+    accessed, and then replaced by the result:
+
+    >>> ds.defer('summary', summarize, df)
+    >>> summary = ds['summary']  # summarize(df) is called here
+
+    When the data store is persisted, deferred values are evaluated, or
+    skipped if deferred_policy is 'skip'.  Iterating over the values or
+    items of the data store yields the unevaluated DeferredValue objects.
+
+    The memory used by each object can be accounted for as objects are
+    stored, with optional soft and hard limits on the total:
+
+    >>> ds.enable_memory_accounting(soft_limit=4 * 1024**3, hard_limit=6 * 1024**3)
+    >>> ds.memory_usage()
+    {'big_df': 1073741824, 'n_events': 28}
+    >>> ds.memory_account.report()
+
+    Keys can be looked up by the type of their object, by prefix and by
+    tag.  Without indexes, such a lookup scans the data store; with indexes,
+    which are kept up to date as objects are stored and deleted, it does
+    not:
+
+    >>> ds.enable_indexes()
+    >>> ds.tag('hist_x', 'final')
+    >>> ds.keys_of_type(pd.DataFrame), ds.keys_with_prefix('hist_'), ds.keys_with_tag('final')
+
+    Spilled objects are indexed by the type of the original object and
+    unevaluated deferred values as DeferredValue.  Tags are persisted with
+    the data store.
+
+    A snapshot of the data store can be taken, e.g. before a risky
+    iteration of a chain, and the data store rolled back to it afterwards.
+    Taking a snapshot is cheap: the previous objects are only kept for keys
+    that are set or deleted after the snapshot.  Objects that are modified
+    in place are not restored.
+
+    >>> snapshot = ds.snapshot()
+    >>> ds['model'] = fit(ds['model'], ds['batch'])
+    >>> if not converged:
+    >>>     ds.rollback(snapshot)
+    >>> else:
+    >>>     ds.drop_snapshot(snapshot)
     """
 
     _persist = True
+    _read_only = frozenset()
+    _memory_budget = None
+    _account = None
+    _index = None
+    _undo = None
+    # persist deferred values that have not been evaluated: 'evaluate' or 'skip'
+    deferred_policy = 'evaluate'
+
+    def __getstate__(self):
+        # the memory budget is not persisted; spilled objects are pickled as the original objects
+        state = {attr: value for attr, value in vars(self).items()
+                 if attr not in ('_memory_budget', '_spill_dir', '_spill_pid', '_spill_lock', '_sizes', '_spill_stats',
+                                 '_unspillable', '_account', '_index', '_undo')}
+        if self._index is not None:
+            state['_index_tags'] = {key: set(tags) for key, tags in self._index.key_tags.items()}
+        return state
+
+    def __setstate__(self, state):
+        tags = state.pop('_index_tags', None)
+        vars(self).update(state)
+        if tags is not None:
+            # the indexes are rebuilt from the persisted objects
+            self.enable_indexes()
+            for key, key_tags in tags.items():
+                if super().__contains__(key):
+                    self._index.tag(key, *key_tags)
+
+    def __reduce_ex__(self, protocol):
+        # apply the policy for deferred values when the data store is pickled
+        reduced = super().__reduce_ex__(protocol)
+        if len(reduced) < 5 or reduced[4] is None:
+            return reduced
+        if self.deferred_policy == 'skip':
+            items = ((key, obj) for key, obj in reduced[4] if not isinstance(obj, DeferredValue))
+        else:
+            items = ((key, self._evaluate(key, obj) if isinstance(obj, DeferredValue) else obj)
+                     for key, obj in reduced[4])
+        return reduced[:4] + (items,) + reduced[5:]
+
+    def __getitem__(self, key: str) -> Any:
+        view = getattr(_thread_state, 'datastore', None)
+        if view is not None and key in view:
+            obj = view[key]
+            return obj.evaluate() if isinstance(obj, DeferredValue) else obj
+        obj = super().__getitem__(key)
+        if isinstance(obj, DeferredValue):
+            return self._evaluate(key, obj)
+        if self._memory_budget is None:
+            return obj
+        with self._spill_lock:
+            # another thread may have spilled or loaded the object in the meantime
+            obj = super().__getitem__(key)
+            if isinstance(obj, SpilledObject):
+                # load spilled object and make room for it
+                self._spill_stats['misses'] += 1
+                placeholder, obj = obj, obj.load()
+                placeholder.remove()
+                super().__setitem__(key, obj)
+                self._sizes[key] = placeholder.size
+                self._enforce_budget()
+            else:
+                self._spill_stats['hits'] += 1
+                self._sizes[key] = self._sizes.pop(key) if key in self._sizes else deep_size(obj)
+        return obj
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        if key in self._read_only:
+            raise ReadOnlyKey('Data-store key {key} is read-only.'.format(key=key))
+        view = getattr(_thread_state, 'datastore', None)
+        if view is not None:
+            view[key] = value
+            return
+        if self._undo:
+            self._record(key)
+        self._release(key)
+        super().__setitem__(key, value)
+        size = None
+        if self._memory_budget is not None and not isinstance(value, DeferredValue):
+            # deferred values are not spilled
+            size = deep_size(value)
+            with self._spill_lock:
+                self._sizes[key] = size
+                self._enforce_budget()
+        if self._account is not None:
+            self._account_for(key, deep_size(value) if size is None else size)
+        if self._index is not None:
+            self._index.add(key, type(value))
+
+    def __delitem__(self, key: str) -> None:
+        if key in self._read_only:
+            raise ReadOnlyKey('Data-store key {key} is read-only.'.format(key=key))
+        view = getattr(_thread_state, 'datastore', None)
+        if view is not None:
+            if key not in view:
+                raise ReadOnlyKey('Data-store key {key} is shared between threads and cannot be deleted.'
+                                  .format(key=key))
+            del view[key]
+            return
+        if self._undo:
+            self._record(key)
+        self._release(key)
+        super().__delitem__(key)
+        if self._account is not None:
+            self._account.remove(key)
+        if self._index is not None:
+            self._index.remove(key)
+
+    def __contains__(self, key) -> bool:
+        view = getattr(_thread_state, 'datastore', None)
+        return (view is not None and key in view) or super().__contains__(key)
+
+    # the dict methods that modify the data store go through __setitem__ and __delitem__
+
+    def pop(self, key: str, *default) -> Any:
+        if key not in self:
+            if default:
+                return default[0]
+            raise KeyError(key)
+        value = self[key]
+        del self[key]
+        return value
+
+    def popitem(self) -> tuple:
+        if not super().__len__():
+            raise KeyError('popitem(): data store is empty')
+        # the last inserted key; reversed() of dict keys requires Python 3.8
+        key = list(super().keys())[-1]
+        return key, self.pop(key)
+
+    def setdefault(self, key: str, default: Any = None) -> Any:
+        if key not in self:
+            self[key] = default
+        return self[key]
+
+    def update(self, *args, **kwargs) -> None:
+        for key, value in dict(*args, **kwargs).items():
+            self[key] = value
+
+    def clear(self) -> None:
+        for key in list(super().keys()):
+            if self._undo:
+                self._record(key)
+            self._release(key)
+        super().clear()
+        if self._account is not None:
+            for key in list(self._account.sizes):
+                self._account.remove(key)
+        if self._index is not None:
+            self._index = KeyIndex()
+
+    @staticmethod
+    def open_thread_view() -> None:
+        """Open a view of the data store for the running thread.
+
+        Objects stored in the view are only visible to the running thread;
+        objects in the data store are visible through the view.  Used for
+        chains that are executed on a pool of threads.
+        """
+        _thread_state.datastore = {}
+
+    @staticmethod
+    def thread_view():
+        """Get the objects stored in the view of the running thread.
+
+        :return: objects stored in the view, or None if no view is open
+        :rtype: dict
+        """
+        return getattr(_thread_state, 'datastore', None)
+
+    @staticmethod
+    def close_thread_view() -> dict:
+        """Close the view of the data store for the running thread.
+
+        :return: objects stored in the view
+        :rtype: dict
+        """
+        view = getattr(_thread_state, 'datastore', None)
+        _thread_state.datastore = None
+        return view or {}
+
+    def set_read_only(self, keys=()) -> None:
+        """Mark keys as read-only.
+
+        Items with these keys cannot be set or deleted.  Note that this does
+        not prevent in-place modification of the objects themselves.
+
+        :param keys: keys to mark as read-only; an empty sequence removes all marks
+        """
+        self._read_only = frozenset(keys)
+
+    def set_memory_budget(self, budget=None, spill_dir=None) -> None:
+        """Limit the memory used by the objects in the data store.
+
+        When the estimated size of the objects in memory exceeds the budget,
+        the least-recently-used objects are spilled to files in the spill
+        directory.  A spilled object is loaded again when it is accessed.
+        The most recently used object is never spilled, even if it exceeds
+        the budget by itself.  Without budget, spilled objects are loaded
+        and spilling is disabled.
+
+        The spill files are written to a new directory, which is removed
+        with the spill files when the data store is finished.  A forked
+        process writes its spill files to its own subdirectory, which it
+        removes when it finishes the data store before exiting.
+
+        :param int budget: memory budget in bytes
+        :param str spill_dir: directory in which the spill directory is created; default is the temporary directory
+        """
+        if self._memory_budget is not None:
+            with self._spill_lock:
+                for key in list(self.keys()):
+                    obj = super().__getitem__(key)
+                    if isinstance(obj, SpilledObject):
+                        super().__setitem__(key, obj.load())
+                self._remove_spill_dir()
+                self._memory_budget = None
+        if budget is None:
+            return
+
+        if spill_dir is not None:
+            os.makedirs(spill_dir, exist_ok=True)
+        self._spill_dir = tempfile.mkdtemp(prefix='eskapade_spill_', dir=spill_dir)
+        self._spill_pid = os.getpid()
+        self._sizes = OrderedDict((key, deep_size(value)) for key, value in self.items())
+        self._spill_stats = dict(hits=0, misses=0, spills=0, spilled_bytes=0)
+        self._unspillable = set()
+        # the spill bookkeeping is shared by the threads of parallel chains and thread views
+        self._spill_lock = threading.RLock()
+        multiprocessing.util.register_after_fork(self, DataStore._after_fork)
+        self._memory_budget = budget
+        self.logger.debug('Set memory budget of data store to {budget:d} bytes; spill directory is "{dir}".',
+                          budget=budget, dir=self._spill_dir)
+        self._enforce_budget()
+
+    def _after_fork(self):
+        # the lock may have been held by another thread of the parent process
+        if self._memory_budget is not None:
+            self._spill_lock = threading.RLock()
+
+    def spill_stats(self) -> dict:
+        """Get statistics of the spilling of objects to disk.
+
+        Accesses of objects in memory are hits, accesses of spilled objects
+        are misses.
+
+        :return: numbers of hits, misses and spills, and total sizes of spilled objects and objects in memory
+        :rtype: dict
+        """
+        if self._memory_budget is None:
+            return {}
+        with self._spill_lock:
+            stats = dict(self._spill_stats)
+            stats['in_memory_bytes'] = sum(self._sizes.values())
+        return stats
+
+    def defer(self, key: str, func, *args, **kwargs) -> None:
+        """Store a value that is computed on first access.
+
+        :param str key: data-store key
+        :param func: function that computes the value
+        :param args: positional arguments of the function
+        :param kwargs: keyword arguments of the function
+        """
+        self[key] = DeferredValue(func, *args, **kwargs)
+
+    def _evaluate(self, key, deferred) -> Any:
+        """Evaluate a deferred value and replace it by the result.
+
+        In a thread with a view of the data store, the data store is not
+        modified; the result is kept by the deferred value.
+        """
+        value = deferred.evaluate()
+        if getattr(_thread_state, 'datastore', None) is not None or dict.get(self, key) is not deferred:
+            return value
+        super().__setitem__(key, value)
+        if self._index is not None:
+            self._index.add(key, type(value))
+        size = None
+        if self._memory_budget is not None:
+            size = deep_size(value)
+            with self._spill_lock:
+                self._sizes.pop(key, None)
+                self._sizes[key] = size
+                self._enforce_budget()
+        if self._account is not None:
+            self._account_for(key, deep_size(value) if size is None else size)
+        return value
+
+    def snapshot(self) -> int:
+        """Take a snapshot of the data store.
+
+        From the snapshot on, the previous object of each key that is set or
+        deleted is kept, until the snapshot is rolled back or dropped.
+        Snapshots can be nested.
+
+        :return: snapshot number
+        :rtype: int
+        """
+        if self._undo is None:
+            self._undo = []
+        self._undo.append({})
+        return len(self._undo)
+
+    def _record(self, key) -> None:
+        """Keep the object stored under a key before it is changed for the last snapshot."""
+        log = self._undo[-1]
+        if key in log:
+            return
+        obj = super().get(key, _ABSENT)
+        # the spill file is removed when the key is changed
+        log[key] = obj.load() if isinstance(obj, SpilledObject) else obj
+
+    def _pop_snapshots(self, snapshot) -> list:
+        """Remove a snapshot and the snapshots taken after it."""
+        if not self._undo:
+            raise ValueError('No snapshot of the data store has been taken.')
+        if snapshot is None:
+            snapshot = len(self._undo)
+        if not 0 < snapshot <= len(self._undo):
+            raise ValueError('Unknown data-store snapshot {}.'.format(snapshot))
+        logs = self._undo[snapshot - 1:]
+        del self._undo[snapshot - 1:]
+        return logs
+
+    def rollback(self, snapshot: int = None) -> None:
+        """Roll the data store back to a snapshot.
+
+        The snapshot, and the snapshots taken after it, are removed.
+
+        :param int snapshot: snapshot number; the last snapshot if None
+        :raises ValueError: if the snapshot is unknown
+        """
+        if getattr(_thread_state, 'datastore', None) is not None:
+            raise RuntimeError('The data store cannot be rolled back in a thread with a view of the data store.')
+        logs = self._pop_snapshots(snapshot)
+        # restore without recording the changes for earlier snapshots
+        undo, self._undo = self._undo, None
+        try:
+            for log in reversed(logs):
+                for key, obj in log.items():
+                    if obj is _ABSENT:
+                        if super().__contains__(key):
+                            del self[key]
+                    else:
+                        self[key] = obj
+        finally:
+            self._undo = undo
+        self.logger.debug('Rolled back {n:d} data-store keys.', n=len(set().union(*logs)))
+
+    def drop_snapshot(self, snapshot: int = None) -> None:
+        """Drop a snapshot, keeping the changes made since.
+
+        The snapshots taken after it are dropped too.
+
+        :param int snapshot: snapshot number; the last snapshot if None
+        :raises ValueError: if the snapshot is unknown
+        """
+        logs = self._pop_snapshots(snapshot)
+        if not self._undo:
+            return
+        # an earlier snapshot needs the objects from before the dropped snapshots
+        for log in logs:
+            for key, obj in log.items():
+                self._undo[-1].setdefault(key, obj)
+
+    def enable_indexes(self) -> None:
+        """Index the keys of the data store by type, prefix and tag.
+
+        The indexes are built from the objects in the data store, and then
+        kept up to date as objects are stored and deleted.
+        """
+        if self._index is not None:
+            return
+        self._index = KeyIndex()
+        for key, obj in super().items():
+            self._index.add(key, obj.type if isinstance(obj, SpilledObject) else type(obj))
+
+    def tag(self, key: str, *tags) -> None:
+        """Tag a data-store key; enables the indexes.
+
+        :param str key: data-store key
+        :param tags: tags of the key
+        :raises KeyError: if the key is not in the data store
+        """
+        self.enable_indexes()
+        self._index.tag(key, *tags)
+
+    def untag(self, key: str, *tags) -> None:
+        """Remove tags from a data-store key.
+
+        :param str key: data-store key
+        :param tags: tags to remove; all tags of the key if none are given
+        """
+        if self._index is not None:
+            self._index.untag(key, *tags)
+
+    def _shared_and_view_keys(self, keys, match):
+        """Add the matching keys of the thread view to keys from the shared data store."""
+        view = getattr(_thread_state, 'datastore', None)
+        if not view:
+            return keys
+        keys = set(keys)
+        return list(keys) + [key for key, obj in view.items() if key not in keys and match(key, obj)]
+
+    def keys_of_type(self, cls) -> list:
+        """Get the keys of objects of a type or of its subclasses.
+
+        :param cls: type, or tuple of types
+        :return: data-store keys
+        :rtype: list
+        """
+        def match(key, obj):
+            return isinstance(obj, cls)
+
+        if self._index is not None:
+            keys = self._index.of_type(cls)
+        else:
+            keys = [key for key, obj in super().items()
+                    if (issubclass(obj.type, cls) if isinstance(obj, SpilledObject) else match(key, obj))]
+        return self._shared_and_view_keys(keys, match)
+
+    def keys_with_prefix(self, prefix: str) -> list:
+        """Get the keys that start with a prefix.
+
+        :param str prefix: key prefix
+        :return: data-store keys
+        :rtype: list
+        """
+        def match(key, obj):
+            return isinstance(key, str) and key.startswith(prefix)
+
+        if self._index is not None:
+            keys = self._index.with_prefix(prefix)
+        else:
+            keys = sorted(key for key in super().keys() if match(key, None))
+        return self._shared_and_view_keys(keys, match)
+
+    def keys_with_tag(self, tag) -> list:
+        """Get the keys with a tag.
+
+        :param tag: tag
+        :return: data-store keys
+        :rtype: list
+        """
+        return self._index.with_tag(tag) if self._index is not None else []
+
+    def enable_memory_accounting(self, soft_limit=None, hard_limit=None) -> None:
+        """Account for the memory used by the objects in the data store.
+
+        The size of each object is estimated when it is stored; see
+        escore.core.memory.MemoryAccount.  Spilled objects are accounted for
+        with their size in memory.  Exceeding the soft limit gives a
+        warning.  Exceeding the hard limit gives an error and marks the
+        account as exceeded, on which the process manager fails the chain.
+
+        :param int soft_limit: total size in bytes above which a warning is given
+        :param int hard_limit: total size in bytes above which the account is exceeded
+        """
+        self._account = MemoryAccount(soft_limit=soft_limit, hard_limit=hard_limit)
+        for key in self.keys():
+            obj = super().__getitem__(key)
+            self._account_for(key, obj.size if isinstance(obj, SpilledObject) else self.memory_size(key))
+
+    @property
+    def memory_account(self):
+        """Memory account of the data store, or None if memory is not accounted for.
+
+        :rtype: MemoryAccount
+        """
+        return self._account
+
+    def memory_usage(self) -> dict:
+        """Estimate the memory used by each object in the data store.
+
+        :return: estimated size in bytes of each key
+        :rtype: dict
+        """
+        if self._account is not None:
+            return dict(self._account.sizes)
+        return {key: self.memory_size(key) for key in self.keys()}
+
+    def _account_for(self, key, size) -> None:
+        """Account for a stored object and check the memory limits."""
+        exceeded = self._account.store(key, size)
+        if exceeded is None:
+            return
+        largest = ', '.join('{}: {:d}'.format(*item) for item in self._account.largest())
+        limit = self._account.hard_limit if exceeded == 'hard' else self._account.soft_limit
+        log = self.logger.error if exceeded == 'hard' else self.logger.warning
+        log('Data-store objects use an estimated {total:d} bytes after storing "{key}" ({size:d} bytes), exceeding '
+            'the {exceeded} limit of {limit:d} bytes. Largest objects: {largest}.', total=self._account.total,
+            key=key, size=size, exceeded=exceeded, limit=limit, largest=largest)
+
+    def memory_size(self, key: str) -> int:
+        """Estimate the memory used by the object stored under a key.
+
+        A spilled object is not loaded and does not use memory.
+
+        :param str key: data-store key
+        :return: estimated size in bytes
+        :rtype: int
+        """
+        obj = super().__getitem__(key)
+        if isinstance(obj, SpilledObject):
+            return 0
+        size = self._sizes.get(key) if self._memory_budget is not None else None
+        return deep_size(obj) if size is None else size
+
+    def _release(self, key) -> None:
+        """Release the accounting and spill file of the object stored under a key."""
+        if self._memory_budget is None:
+            return
+        with self._spill_lock:
+            if not super().__contains__(key):
+                return
+            self._sizes.pop(key, None)
+            self._unspillable.discard(key)
+            obj = super().__getitem__(key)
+            if isinstance(obj, SpilledObject):
+                obj.remove()
+
+    def _enforce_budget(self) -> None:
+        """Spill least-recently-used objects to disk until the objects in memory fit in the budget.
+
+        Objects that cannot be spilled are kept in memory, and are not tried
+        again until they are replaced.
+        """
+        with self._spill_lock:
+            in_memory = sum(self._sizes.values())
+            if in_memory <= self._memory_budget:
+                return
+            # the most recently used object is never spilled
+            for key in list(self._sizes)[:-1]:
+                if in_memory <= self._memory_budget:
+                    break
+                if key in self._unspillable:
+                    continue
+                size = self._sizes[key]
+                path = os.path.join(self._process_spill_dir(),
+                                    'object_{:d}_{:d}'.format(os.getpid(), self._spill_stats['spills']))
+                try:
+                    placeholder = SpilledObject.spill(super().__getitem__(key), path, size)
+                except (pickle.PicklingError, AttributeError, TypeError, OSError) as exc:
+                    self._unspillable.add(key)
+                    self.logger.warning('Unable to spill data-store object "{key}" to disk; '
+                                        'keeping it in memory: {exc}', key=key, exc=exc)
+                    continue
+                del self._sizes[key]
+                super().__setitem__(key, placeholder)
+                self._spill_stats['spills'] += 1
+                self._spill_stats['spilled_bytes'] += size
+                in_memory -= size
+                self.logger.debug('Spilled data-store object "{key}" of {size:d} bytes to "{path}".',
+                                  key=key, size=size, path=placeholder.path)
+
+    def _process_spill_dir(self) -> str:
+        """Get the spill directory of the current process; a forked process has its own subdirectory."""
+        if os.getpid() == self._spill_pid:
+            return self._spill_dir
+        path = os.path.join(self._spill_dir, 'process_{:d}'.format(os.getpid()))
+        os.makedirs(path, exist_ok=True)
+        return path
+
+    def _remove_spill_dir(self) -> None:
+        """Remove the spill directory of the current process with the spill files."""
+        for key in list(self.keys()):
+            obj = super().__getitem__(key)
+            if isinstance(obj, SpilledObject):
+                obj.remove()
+        shutil.rmtree(self._process_spill_dir(), ignore_errors=True)
+
+    def finish(self):
+        """Remove the spill files of the data store."""
+        if self._memory_budget is not None:
+            with self._spill_lock:
+                self._remove_spill_dir()
 
     def get(self, key: str, default: Any = None, assert_type: Any = None, assert_len: bool = False, assert_in: bool = False) -> object:
         """Get value of setting. If it does not exists return the default value.
@@ -446,11 +1173,184 @@ class DataStore(ProcessService, dict):
 
         max_key_len = max(len(str(k)) for k in self.keys())
         for key in sorted(self.keys()):
-            self.logger.info('  {{0:<{:d}s}}  <{{1:s}}.{{2:s}} at {{3:x}}>'.
+            obj = super().__getitem__(key)
+            size = '  {:d} bytes'.format(self._account.sizes.get(key, 0)) if self._account is not None else ''
+            if isinstance(obj, SpilledObject):
+                self.logger.info('  {{0:<{:d}s}}  <spilled to {{1:s}}>{{2:s}}'.format(max_key_len)
+                                 .format(key, obj.path, size))
+                continue
+            if isinstance(obj, DeferredValue):
+                self.logger.info('  {{0:<{:d}s}}  <unevaluated {{1:s}}>{{2:s}}'.format(max_key_len)
+                                 .format(key, getattr(obj.func, '__name__', type(obj.func).__name__), size))
+                continue
+            self.logger.info('  {{0:<{:d}s}}  <{{1:s}}.{{2:s}} at {{3:x}}>{{4:s}}'.
                              format(max_key_len).format(key,
-                                                        type(self[key]).__module__,
-                                                        type(self[key]).__name__,
-                                                        id(self[key])))
+                                                        type(obj).__module__,
+                                                        type(obj).__name__,
+                                                        id(obj),
+                                                        size))
+        if self._memory_budget is not None:
+            self.logger.info('Spill statistics: {stats}', stats=self.spill_stats())
+        if self._account is not None:
+            self.logger.info('Memory of data-store objects: {total:d} bytes; high-water mark per chain: {hwm}',
+                             total=self._account.total, hwm=self._account.high_water)
+
+
+class SharedSlots:
+    """Preallocated slots in shared memory, one per fork index.
+
+    The slots are allocated in the parent process, before forking, in an
+    anonymous shared memory map that is inherited by the forked processes.
+    Each forked process writes its payload into its own slot, without
+    pickling, a manager process, or a lock.  The parent process reads the
+    payloads as zero-copy views.
+
+    Slots hold either bytes-like payloads of at most slot_size bytes, or,
+    if shape and dtype are given, NumPy arrays with that shape and type.
+
+    >>> slots = SharedSlots(n_slots=8, shape=(1000,), dtype='float64')
+    >>> slots[fork_index] = np.random.normal(size=1000)  # in forked process
+    >>> all_arrays = slots.array()  # in parent process: array with shape (8, 1000)
+    """
+
+    _header_item_size = 8
+
+    def __init__(self, n_slots: int, slot_size: int = None, shape: tuple = None, dtype: Any = None):
+        """Allocate slots.
+
+        :param int n_slots: number of slots
+        :param int slot_size: size of each slot in bytes (bytes-like payloads)
+        :param tuple shape: shape of array in each slot (NumPy payloads)
+        :param dtype: data type of array in each slot (NumPy payloads)
+        """
+        self.n_slots = int(n_slots)
+        self.shape = tuple(shape) if shape is not None else None
+        self.dtype = None
+        if self.shape is not None:
+            import numpy as np
+            self.dtype = np.dtype(dtype if dtype is not None else 'float64')
+            slot_size = int(np.prod(self.shape, dtype=int)) * self.dtype.itemsize
+        if slot_size is None:
+            raise ValueError('Either slot_size or shape must be specified for shared-memory slots.')
+        self.slot_size = int(slot_size)
+
+        # header with number of bytes written in each slot, followed by the slots
+        self._offset = self.n_slots * self._header_item_size
+        self._mmap = mmap.mmap(-1, max(1, self._offset + self.n_slots * self.slot_size))
+        self._buffer = memoryview(self._mmap)
+        self._lengths = self._buffer[:self._offset].cast('q')
+
+    def __len__(self):
+        return self.n_slots
+
+    def _slot(self, idx: int) -> memoryview:
+        """Get memory of slot."""
+        if not 0 <= idx < self.n_slots:
+            raise IndexError('Shared-memory slot index {idx} out of range.'.format(idx=idx))
+        start = self._offset + idx * self.slot_size
+        return self._buffer[start:start + self.slot_size]
+
+    def __setitem__(self, idx: int, value: Any) -> None:
+        """Copy payload into slot.
+
+        :param int idx: slot (fork) index
+        :param value: bytes-like object or array
+        """
+        slot = self._slot(idx)
+        if self.shape is not None:
+            import numpy as np
+            np.frombuffer(slot, dtype=self.dtype).reshape(self.shape)[...] = value
+            self._lengths[idx] = self.slot_size
+            return
+        data = memoryview(value).cast('B')
+        if data.nbytes > self.slot_size:
+            raise ValueError('Payload of {n:d} bytes does not fit in shared-memory slot of {size:d} bytes.'
+                             .format(n=data.nbytes, size=self.slot_size))
+        slot[:data.nbytes] = data
+        self._lengths[idx] = data.nbytes
+
+    def __getitem__(self, idx: int) -> Any:
+        """Get zero-copy view of payload in slot.
+
+        :param int idx: slot (fork) index
+        :return: memoryview of written bytes, or array, or None if nothing was written
+        """
+        slot = self._slot(idx)
+        if self._lengths[idx] == 0:
+            return None
+        if self.shape is not None:
+            import numpy as np
+            return np.frombuffer(slot, dtype=self.dtype).reshape(self.shape)
+        return slot[:self._lengths[idx]]
+
+    def filled(self) -> list:
+        """Get indices of slots that payloads have been written to.
+
+        :rtype: list
+        """
+        return [idx for idx in range(self.n_slots) if self._lengths[idx] > 0]
+
+    def array(self) -> Any:
+        """Get zero-copy view of all slots as one array, with shape (n_slots,) + shape.
+
+        :rtype: numpy.ndarray
+        """
+        if self.shape is None:
+            raise TypeError('Shared-memory slots do not hold arrays.')
+        import numpy as np
+        data = self._buffer[self._offset:]
+        return np.frombuffer(data, dtype=self.dtype).reshape((self.n_slots,) + self.shape)
+
+    def __getstate__(self):
+        raise TypeError('Shared-memory slots cannot be pickled; they are shared with forked processes.')
+
+
+class ContentionLock:
+    """Lock shared between forked processes that counts contended acquisitions.
+
+    Behaves like a multiprocessing.Lock.  Each time a process has to wait
+    for the lock because another process holds it, the contention counter
+    is incremented.  The counter is a diagnostic for how much forked
+    processes are serialised on the lock.
+    """
+
+    def __init__(self):
+        """Initialize lock and contention counter."""
+        self._lock = multiprocessing.Lock()
+        self._contention = multiprocessing.Value('i', 0)
+
+    @property
+    def contention(self) -> int:
+        """Number of acquisitions that had to wait for the lock."""
+        return self._contention.value
+
+    def acquire(self, block: bool = True, timeout: float = None) -> bool:
+        """Acquire the lock.
+
+        :param bool block: block until the lock is acquired
+        :param float timeout: maximum time to block in seconds; block without limit if None
+        :return: True if the lock has been acquired
+        :rtype: bool
+        """
+        if self._lock.acquire(False):
+            return True
+        if not block:
+            return False
+        with self._contention.get_lock():
+            self._contention.value += 1
+        return self._lock.acquire(True, timeout)
+
+    def release(self):
+        """Release the lock."""
+        self._lock.release()
+
+    def __enter__(self):
+        if not self.acquire():
+            raise RuntimeError('Failed to acquire lock.')
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
 
 
 class ForkStore(ProcessService):
@@ -475,6 +1375,29 @@ class ForkStore(ProcessService):
     >>> fs['b'] = 2
     >>> fs['0'] = 3
     >>> a = fs['a']
+
+    Every item access is a round-trip to a manager process.  Large numeric
+    payloads are better collected in shared-memory slots, allocated before
+    forking, e.g. in the initialize of a link:
+
+    >>> fs.allocate('hist', n_slots=chain.n_fork, shape=(100,), dtype='int64')
+    >>> fs.shared('hist')[fork_index] = counts  # in forked process
+    >>> total = fs.shared('hist').array().sum(axis=0)  # after forking
+
+    Objects that each forked process produces independently are better
+    written to its local namespace.  The local namespace is a plain dict in
+    the forked process, which is committed to the fork store in a single
+    message after the fork index has been executed.  No lock is needed:
+
+    >>> fs.local['n_events'] = fs.local.get('n_events', 0) + n_events  # in forked process
+    >>> n_events = sum(fs.collect('n_events'))  # after forking
+
+    Namespaces are combined in order of fork index with a reducer.  Objects
+    of keys with a registered reducer are combined while the forks are still
+    running:
+
+    >>> fs.register_reducer('hist', 'np_sum')  # before forking
+    >>> hist = fs.reduce('hist')  # after forking
     """
 
     _persist = False
@@ -483,7 +1406,13 @@ class ForkStore(ProcessService):
         """Initialize ForkStore instance."""
         self.__manager = Manager()
         self.__forkstore = self.__manager.dict()
-        self.lock = multiprocessing.Lock()
+        self.__namespaces = self.__manager.dict()
+        self.__shared = {}
+        self.__thread = threading.local()
+        self.__reductions = {}
+        self.__absorbed = set()
+        self.__reduce_errors = {}
+        self.lock = ContentionLock()
         # NOTE: don't use lock = manager.Lock(), it's unstable!
 
     def __repr__(self):
@@ -558,6 +1487,160 @@ class ForkStore(ProcessService):
     def clear(self):
         """Clear fork store dictionary"""
         self.__forkstore.clear()
+        self.__namespaces.clear()
+        self.__shared.clear()
+        self.__thread = threading.local()
+        self.__reductions.clear()
+        self.__absorbed.clear()
+        self.__reduce_errors.clear()
+
+    @property
+    def local(self) -> dict:
+        """Local namespace of the fork index executed by this process or thread.
+
+        :rtype: dict
+        """
+        if not hasattr(self.__thread, 'local'):
+            self.__thread.local = {}
+        return self.__thread.local
+
+    @property
+    def lock_contention(self) -> int:
+        """Number of times a process had to wait for the fork-store lock."""
+        return self.lock.contention
+
+    def open_namespace(self, name: Any) -> dict:
+        """Open an empty local namespace.
+
+        Called by the process manager in a forked process, or a worker
+        thread, before a fork index is executed; the name is typically the
+        fork index.  Each thread has its own local namespace.
+
+        :param name: name of the namespace
+        :return: local namespace
+        :rtype: dict
+        """
+        self.__thread.name = name
+        self.__thread.local = {}
+        return self.__thread.local
+
+    def commit(self):
+        """Commit the local namespace to the fork store in a single message.
+
+        An empty namespace is not committed.  A namespace is committed only
+        once: a later commit under the same name, e.g. by a speculative copy
+        of the execution of a fork index, is ignored, so that the objects of
+        a fork index are gathered exactly once.
+        """
+        name = getattr(self.__thread, 'name', None)
+        if name is not None and self.local:
+            self.__namespaces.setdefault(name, self.__thread.local)
+        self.__thread.name = None
+        self.__thread.local = {}
+
+    def namespaces(self) -> dict:
+        """Get the committed namespaces, ordered by name.
+
+        :return: namespace dict of each committed namespace name
+        :rtype: dict
+        """
+        namespaces = self.__namespaces.copy()
+        return {name: namespaces[name] for name in sorted(namespaces)}
+
+    def collect(self, key: str) -> list:
+        """Collect the objects stored under a key in the committed namespaces.
+
+        :param str key: key of the objects in the namespaces
+        :return: objects, ordered by namespace name
+        :rtype: list
+        """
+        return [ns[key] for ns in self.namespaces().values() if key in ns]
+
+    def register_reducer(self, key: str, reducer: Any = 'concat') -> None:
+        """Register a reducer for the objects stored under a key in the namespaces.
+
+        The objects of registered keys are reduced while forks are still
+        running, as namespaces are absorbed.  Register before forking.
+
+        :param str key: key of the objects in the namespaces
+        :param reducer: name of built-in reducer or function of two partial results, see escore.core.reducers
+        """
+        self.__reductions[key] = TreeReducer(reducer)
+
+    def absorb(self, indices: range) -> None:
+        """Absorb the namespace committed for a range of fork indices into the registered reductions.
+
+        Called by the process manager when the execution of a range of fork
+        indices has finished.
+
+        :param range indices: fork indices of the namespace
+        """
+        if not self.__reductions or indices[0] in self.__absorbed:
+            return
+        namespace = self.__namespaces.get(indices[0])
+        if namespace is None:
+            return
+        self.__absorbed.add(indices[0])
+        for key, tree in self.__reductions.items():
+            if key in namespace and key not in self.__reduce_errors:
+                try:
+                    tree.add(indices[0], indices[-1] + 1, namespace[key])
+                except (TypeError, ValueError) as exc:
+                    # raised when the key is reduced, not while the forks are running
+                    self.__reduce_errors[key] = exc
+
+    def reduce(self, key: str, reducer: Any = None, default: Any = None) -> Any:
+        """Reduce the objects stored under a key in the committed namespaces.
+
+        Objects are combined in order of fork index.  For a registered key,
+        namespaces that have not been absorbed yet are absorbed first.
+
+        :param str key: key of the objects in the namespaces
+        :param reducer: reducer for a key that is not registered; default is concat
+        :param default: result if no namespace contains key
+        :return: reduced object
+        :raise: TypeError or ValueError if the reducer cannot combine the objects
+        """
+        if key not in self.__reductions:
+            tree = TreeReducer(reducer or 'concat')
+            for name, namespace in self.namespaces().items():
+                if key in namespace:
+                    tree.add(name, name + 1, namespace[key])
+            return tree.result(default)
+        for name in sorted(self.__namespaces.keys()):
+            self.absorb(range(name, name + 1))
+        if key in self.__reduce_errors:
+            raise self.__reduce_errors[key]
+        return self.__reductions[key].result(default)
+
+    def allocate(self, key: str, n_slots: int, slot_size: int = None, shape: tuple = None,
+                 dtype: Any = None) -> SharedSlots:
+        """Allocate shared-memory slots, one per fork index.
+
+        Slots must be allocated before forking.  See SharedSlots.
+
+        :param str key: key of the slots
+        :param int n_slots: number of slots, typically the number of forks
+        :param int slot_size: size of each slot in bytes (bytes-like payloads)
+        :param tuple shape: shape of array in each slot (NumPy payloads)
+        :param dtype: data type of array in each slot (NumPy payloads)
+        :return: allocated slots
+        :rtype: SharedSlots
+        """
+        self.__shared[key] = SharedSlots(n_slots, slot_size=slot_size, shape=shape, dtype=dtype)
+        return self.__shared[key]
+
+    def shared(self, key: str) -> SharedSlots:
+        """Get shared-memory slots.
+
+        :param str key: key of the slots
+        :return: slots allocated for key
+        :rtype: SharedSlots
+        :raise: UnknownSetting if no slots are allocated for key.
+        """
+        if key in self.__shared:
+            return self.__shared[key]
+        raise UnknownSetting('No shared-memory slots for key {key}!'.format(key=key))
 
     def wait_until_unlocked(self):
         """Wait until unlocked"""
@@ -580,3 +1663,479 @@ class ForkStore(ProcessService):
                                                         type(self.get(key)).__module__,
                                                         type(self.get(key)).__name__,
                                                         id(self.get(key))))
+        for key in sorted(self.__shared):
+            slots = self.__shared[key]
+            self.logger.info('  {key}  <shared memory: {n:d} of {n_slots:d} slots filled, {size:d} bytes each>',
+                             key=key, n=len(slots.filled()), n_slots=len(slots), size=slots.slot_size)
+        namespaces = self.namespaces()
+        if namespaces:
+            self.logger.info('  <{n:d} committed namespaces, keys: {keys}>', n=len(namespaces),
+                             keys=sorted(set().union(*namespaces.values()), key=str))
+        if self.lock_contention:
+            self.logger.info('  <lock contention: {n:d}>', n=self.lock_contention)
+
+
+class BufferPool(ProcessService):
+    """Pool of reusable buffers for NumPy arrays and bytes.
+
+    Links that allocate the same large arrays in each iteration of a
+    repeated chain can borrow them from the pool instead, and give them back
+    when they are done.  A buffer that is given back is reused for the next
+    request of the same size class, i.e. the size rounded up to a power of
+    two, so memory is not allocated, and faulted in, again in each
+    iteration:
+
+    >>> pool = process_manager.service(BufferPool)
+    >>> arr = pool.borrow((1000, 50), dtype='float64')
+    >>> ...
+    >>> pool.give_back(arr)
+
+    or:
+
+    >>> with pool.borrowed(4096, dtype='uint8') as arr:
+    >>>     ...
+
+    A borrowed buffer is not zeroed, unless requested, and must not be used
+    after it has been given back.  The total size of the idle buffers in the
+    pool is capped at max_bytes; buffers given back beyond the cap are
+    freed.
+    """
+
+    _persist = False
+    # size of the smallest size class in bytes
+    _min_size = 64
+
+    def __init__(self):
+        """Initialize pool."""
+        self.max_bytes = None
+        self._lock = threading.Lock()
+        self._idle = defaultdict(list)
+        self._idle_bytes = 0
+        self._borrowed = {}
+        self._stats = dict(borrows=0, reuses=0, allocations=0, returns=0, drops=0)
+
+    def _size_class(self, nbytes: int) -> int:
+        """Get the size class of a buffer of nbytes bytes."""
+        return max(self._min_size, 1 << max(0, int(nbytes) - 1).bit_length())
+
+    def _take(self, nbytes: int) -> bytearray:
+        """Take an idle buffer of the size class of nbytes bytes, or allocate one."""
+        size = self._size_class(nbytes)
+        with self._lock:
+            self._stats['borrows'] += 1
+            idle = self._idle.get(size)
+            if idle:
+                self._idle_bytes -= size
+                self._stats['reuses'] += 1
+                return idle.pop()
+            self._stats['allocations'] += 1
+        return bytearray(size)
+
+    def _lend(self, obj, buffer):
+        """Register a borrowed object and its buffer."""
+        with self._lock:
+            self._borrowed[id(obj)] = (obj, buffer)
+        return obj
+
+    def borrow(self, shape, dtype='float64', zero: bool = False):
+        """Borrow a NumPy array.
+
+        :param shape: shape of the array, or number of items
+        :param dtype: data type of the array. Default is float64.
+        :param bool zero: fill the array with zeros. Default is false.
+        :return: array backed by a pooled buffer
+        :rtype: numpy.ndarray
+        """
+        import numpy as np
+        dtype = np.dtype(dtype)
+        shape = (shape,) if isinstance(shape, int) else tuple(shape)
+        count = int(np.prod(shape, dtype=int))
+        buffer = self._take(count * dtype.itemsize)
+        arr = np.frombuffer(buffer, dtype=dtype, count=count).reshape(shape)
+        if zero:
+            arr.fill(0)
+        return self._lend(arr, buffer)
+
+    def borrow_bytes(self, size: int, zero: bool = False) -> memoryview:
+        """Borrow a bytes buffer.
+
+        :param int size: size of the buffer in bytes
+        :param bool zero: fill the buffer with zeros. Default is false.
+        :return: writable view of a pooled buffer
+        :rtype: memoryview
+        """
+        buffer = self._take(size)
+        view = memoryview(buffer)[:size]
+        if zero:
+            view[:] = bytes(size)
+        return self._lend(view, buffer)
+
+    def give_back(self, obj) -> None:
+        """Give a borrowed array or bytes buffer back to the pool.
+
+        :param obj: object returned by borrow or borrow_bytes
+        :raises ValueError: if the object was not borrowed from the pool
+        """
+        with self._lock:
+            _, buffer = self._borrowed.pop(id(obj), (None, None))
+            if buffer is None:
+                raise ValueError('Object was not borrowed from the buffer pool.')
+            size = len(buffer)
+            if self.max_bytes is not None and self._idle_bytes + size > self.max_bytes:
+                self._stats['drops'] += 1
+                return
+            self._idle[size].append(buffer)
+            self._idle_bytes += size
+            self._stats['returns'] += 1
+
+    @contextlib.contextmanager
+    def borrowed(self, shape, dtype='float64', zero: bool = False):
+        """Borrow a NumPy array for the duration of a with block.
+
+        :param shape: shape of the array, or number of items
+        :param dtype: data type of the array. Default is float64.
+        :param bool zero: fill the array with zeros. Default is false.
+        """
+        arr = self.borrow(shape, dtype=dtype, zero=zero)
+        try:
+            yield arr
+        finally:
+            self.give_back(arr)
+
+    def stats(self) -> dict:
+        """Get the reuse statistics of the pool.
+
+        :return: numbers of borrows, reuses, allocations, returns and drops (returns beyond the cap),
+                 and the numbers of bytes idle in the pool and borrowed
+        :rtype: dict
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            stats['idle_bytes'] = self._idle_bytes
+            stats['borrowed_bytes'] = sum(len(buffer) for _, buffer in self._borrowed.values())
+        return stats
+
+    def clear(self) -> None:
+        """Free the idle buffers in the pool."""
+        with self._lock:
+            self._idle.clear()
+            self._idle_bytes = 0
+
+    def finish(self):
+        """Free the buffers of the pool."""
+        self.logger.debug('Buffer pool statistics: {stats}.', stats=self.stats())
+        self.clear()
+        with self._lock:
+            self._borrowed.clear()
+
+
+class CacheService(ProcessService):
+    """Cache of the results of function calls.
+
+    Results are cached under a key of the function identity and a hash of
+    the pickled arguments, in a memory tier and, optionally, in a disk tier.
+    The memory tier evicts the least-recently-used results when its budget
+    is exceeded.  The disk tier persists across runs: by default it is in
+    the process-service data directory of the analysis name and version.
+    Results on disk expire after ttl seconds, if set.
+
+    >>> cache = process_manager.service(CacheService)
+    >>> cache.memory_budget = 2 * 1024**3
+    >>> cache.enable_disk_tier(ttl=24 * 3600)
+    >>> fit_model = cache.cached(fit_model)
+    >>> model = fit_model(df, alpha=0.1)  # computed once, then cached
+
+    or with the explicit API:
+
+    >>> cache.put('features:v2', features)
+    >>> features = cache.get('features:v2')
+    >>> cache.invalidate(fit_model)  # all cached results of fit_model
+
+    Forked processes start with the memory tier of the parent process.
+    Their results are cached in their own memory tier, and in the disk tier
+    shared with the parent.
+    """
+
+    _persist = False
+
+    def __init__(self):
+        """Initialize cache."""
+        self.memory_budget = None
+        self.disk_dir = None
+        self.ttl = None
+        self._memory = OrderedDict()
+        self._memory_bytes = 0
+        self._stats = dict(hits=0, disk_hits=0, misses=0, puts=0, evictions=0, uncacheable=0)
+        self._lock = threading.Lock()
+        multiprocessing.util.register_after_fork(self, CacheService._after_fork)
+
+    def _after_fork(self):
+        # the lock may have been held by another thread of the parent process
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _code_digest(code, digest) -> None:
+        """Update a digest with the instructions, names and constants of a code object."""
+        digest.update(code.co_code)
+        digest.update(repr(code.co_names).encode('utf-8'))
+        for const in code.co_consts:
+            if isinstance(const, types.CodeType):
+                CacheService._code_digest(const, digest)
+            elif isinstance(const, frozenset):
+                digest.update(repr(sorted(map(repr, const))).encode('utf-8'))
+            else:
+                digest.update(repr(const).encode('utf-8'))
+
+    @classmethod
+    def namespace(cls, func) -> str:
+        """Get the cache namespace of a function.
+
+        The namespace consists of the module and qualified name of the
+        function, and a hash of its code, closure variables and defaults.
+        Closures of the same function with different variables, e.g. created
+        by one factory function, have different namespaces.
+
+        :param func: function
+        :return: namespace
+        :rtype: str
+        :raises TypeError: if the closure variables or defaults cannot be pickled
+        """
+        name = '{}.{}'.format(getattr(func, '__module__', None), getattr(func, '__qualname__', type(func).__name__))
+        code = getattr(func, '__code__', None)
+        if code is None:
+            return name
+        digest = hashlib.sha256()
+        cls._code_digest(code, digest)
+        cells = []
+        for cell in func.__closure__ or ():
+            try:
+                cells.append(cell.cell_contents)
+            except ValueError:
+                # cell of a variable that is not assigned yet
+                cells.append(None)
+        try:
+            digest.update(pickle.dumps((cells, func.__defaults__, func.__kwdefaults__), protocol=4))
+        except (pickle.PicklingError, AttributeError, TypeError) as exc:
+            raise TypeError('Closure variables or defaults of {} cannot be pickled: {}'.format(name, exc))
+        return '{}.{}'.format(name, digest.hexdigest()[:16])
+
+    @staticmethod
+    def is_local(namespace: str) -> bool:
+        """Check if a namespace is of a lambda or of a function defined in another function.
+
+        Such functions cannot be identified across runs by their names, and
+        their results are not cached in the disk tier.
+        """
+        return '<lambda>' in namespace or '<locals>' in namespace
+
+    @classmethod
+    def make_key(cls, func, args=(), kwargs=None, namespace: str = None) -> str:
+        """Make the cache key of a function call.
+
+        :param func: function
+        :param tuple args: positional arguments
+        :param dict kwargs: keyword arguments
+        :param str namespace: namespace of the function. Default is the namespace derived from the function.
+        :return: key "namespace:hash"
+        :rtype: str
+        :raises TypeError: if the arguments cannot be pickled
+        """
+        if namespace is None:
+            namespace = cls.namespace(func)
+        try:
+            data = pickle.dumps((args, sorted((kwargs or {}).items())), protocol=4)
+        except (pickle.PicklingError, AttributeError) as exc:
+            raise TypeError('Arguments of {} cannot be pickled: {}'.format(namespace, exc))
+        return '{}:{}'.format(namespace, hashlib.sha256(data).hexdigest())
+
+    def enable_disk_tier(self, directory: str = None, ttl: float = None) -> None:
+        """Cache results on disk too.
+
+        :param str directory: directory of the disk tier. Default is "cache" in the
+                              process-service data directory of the analysis.
+        :param float ttl: time in seconds after which results on disk expire; never if None
+        """
+        if directory is None:
+            from escore.core import persistence
+            directory = os.path.join(persistence.io_dir('proc_service_data'), 'cache')
+        os.makedirs(directory, exist_ok=True)
+        self.disk_dir = directory
+        self.ttl = ttl
+
+    def _namespace_dir(self, namespace) -> str:
+        """Get the disk-tier directory of a namespace."""
+        return os.path.join(self.disk_dir, re.sub(r'[^\w.\-]', '_', namespace) or '_')
+
+    def _disk_path(self, key) -> str:
+        """Get the path of the disk-tier file of a key."""
+        namespace, _, name = str(key).rpartition(':')
+        if not re.fullmatch(r'[\w.\-]{1,128}', name):
+            name = hashlib.sha256(str(key).encode('utf-8')).hexdigest()
+        return os.path.join(self._namespace_dir(namespace), name + '.pkl')
+
+    def _keep(self, key, value) -> None:
+        """Keep a value in the memory tier, evicting least-recently-used values if needed."""
+        size = deep_size(value)
+        with self._lock:
+            if key in self._memory:
+                self._memory_bytes -= self._memory.pop(key)[1]
+            if self.memory_budget is not None and size > self.memory_budget:
+                return
+            self._memory[key] = (value, size)
+            self._memory_bytes += size
+            while self.memory_budget is not None and self._memory_bytes > self.memory_budget:
+                _, (_, evicted) = self._memory.popitem(last=False)
+                self._memory_bytes -= evicted
+                self._stats['evictions'] += 1
+
+    def get(self, key, default=None):
+        """Get a cached value.
+
+        :param key: cache key
+        :param default: value to return if the key is not cached
+        :return: cached value or default
+        """
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                self._memory.move_to_end(key)
+                self._stats['hits'] += 1
+                return entry[0]
+        if self.disk_dir is not None:
+            path = self._disk_path(key)
+            try:
+                if self.ttl is not None and time.time() - os.path.getmtime(path) > self.ttl:
+                    os.remove(path)
+                else:
+                    with open(path, 'rb') as cache_file:
+                        value = pickle.load(cache_file)
+                    self._keep(key, value)
+                    with self._lock:
+                        self._stats['disk_hits'] += 1
+                    return value
+            except (OSError, EOFError, pickle.UnpicklingError):
+                pass
+        with self._lock:
+            self._stats['misses'] += 1
+        return default
+
+    def put(self, key, value, disk: bool = True) -> None:
+        """Cache a value.
+
+        :param key: cache key
+        :param value: value to cache
+        :param bool disk: also cache the value in the disk tier, if enabled. Default is true.
+        """
+        self._keep(key, value)
+        with self._lock:
+            self._stats['puts'] += 1
+        if not disk or self.disk_dir is None:
+            return
+        path = self._disk_path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # write atomically, as other processes may read the file
+        tmp_path = '{}.{:d}.tmp'.format(path, os.getpid())
+        try:
+            with open(tmp_path, 'wb') as cache_file:
+                pickle.dump(value, cache_file, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, path)
+        except (OSError, pickle.PicklingError, AttributeError, TypeError) as exc:
+            self.logger.warning('Unable to cache "{key}" on disk: {exc}', key=key, exc=exc)
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def cached(self, func=None, disk: bool = True, namespace: str = None):
+        """Decorate a function to cache its results.
+
+        Calls with arguments that cannot be pickled are not cached.  The
+        results of lambdas and of functions defined in other functions are
+        only cached in the disk tier with an explicit namespace.
+
+        :param func: function to decorate
+        :param bool disk: also cache the results in the disk tier, if enabled. Default is true.
+        :param str namespace: namespace of the cached results. Default is the namespace derived from the function,
+                              see namespace().  Required if its closure variables or defaults cannot be pickled.
+        :return: decorated function
+        """
+        if func is None:
+            return functools.partial(self.cached, disk=disk, namespace=namespace)
+        if namespace is None:
+            namespace = self.namespace(func)
+            disk = disk and not self.is_local(namespace)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            try:
+                key = self.make_key(func, args, kwargs, namespace=namespace)
+            except TypeError:
+                with self._lock:
+                    self._stats['uncacheable'] += 1
+                return func(*args, **kwargs)
+            value = self.get(key, _ABSENT)
+            if value is _ABSENT:
+                value = func(*args, **kwargs)
+                self.put(key, value, disk=disk)
+            return value
+
+        wrapper.cache_namespace = namespace
+        return wrapper
+
+    def invalidate(self, key=None) -> None:
+        """Remove cached values.
+
+        :param key: cache key; or function or decorated function, for all its cached results; or None, for all values
+        """
+        if callable(key):
+            namespace = getattr(key, 'cache_namespace', None) or self.namespace(key)
+            prefix = namespace + ':'
+            with self._lock:
+                for mem_key in [k for k in self._memory if str(k).startswith(prefix)]:
+                    self._memory_bytes -= self._memory.pop(mem_key)[1]
+            if self.disk_dir is not None:
+                shutil.rmtree(self._namespace_dir(namespace), ignore_errors=True)
+        elif key is None:
+            with self._lock:
+                self._memory.clear()
+                self._memory_bytes = 0
+            if self.disk_dir is not None:
+                shutil.rmtree(self.disk_dir, ignore_errors=True)
+                os.makedirs(self.disk_dir, exist_ok=True)
+        else:
+            with self._lock:
+                entry = self._memory.pop(key, None)
+                if entry is not None:
+                    self._memory_bytes -= entry[1]
+            if self.disk_dir is not None and os.path.exists(self._disk_path(key)):
+                os.remove(self._disk_path(key))
+
+    def stats(self) -> dict:
+        """Get the statistics of the cache.
+
+        :return: numbers of memory hits, disk hits, misses, puts, evictions and uncacheable calls,
+                 hit rate, and number of values and bytes in the memory tier
+        :rtype: dict
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            stats['memory_values'] = len(self._memory)
+            stats['memory_bytes'] = self._memory_bytes
+        lookups = stats['hits'] + stats['disk_hits'] + stats['misses']
+        stats['hit_rate'] = (stats['hits'] + stats['disk_hits']) / lookups if lookups else 0.
+        return stats
+
+    def Print(self):
+        """Print a summary of the cache statistics."""
+        stats = self.stats()
+        self.logger.info('Summary of cache ({n:d} values, {size:d} bytes in memory)',
+                         n=stats['memory_values'], size=stats['memory_bytes'])
+        self.logger.info('  hit rate {rate:.1%}: {hits:d} memory hits, {disk_hits:d} disk hits, {misses:d} misses, '
+                         '{evictions:d} evictions', rate=stats['hit_rate'], hits=stats['hits'],
+                         disk_hits=stats['disk_hits'], misses=stats['misses'], evictions=stats['evictions'])
+        if self.disk_dir is not None:
+            self.logger.info('  disk tier in "{path}"', path=self.disk_dir)
+
+    def finish(self):
+        """Free the memory tier of the cache."""
+        with self._lock:
+            self._memory.clear()
+            self._memory_bytes = 0
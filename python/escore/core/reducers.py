@@ -0,0 +1,184 @@
+"""Project: Eskapade - A python-based package for data analysis.
+
+Created: 2026/10/18
+
+Description:
+    Reducers for combining partial results of forked processes.
+
+    A reducer is a function of two partial results that returns their
+    combination.  Reducers must be associative, but need not be
+    commutative: partial results are always combined in order of fork
+    index.  Built-in reducers are available by name:
+
+        - concat: concatenate lists
+        - sum: add values with +
+        - dict_merge: merge dicts; later fork indices take precedence
+        - np_sum: add NumPy arrays element-wise
+        - min, max: minimum, maximum of values
+        - join: join shards of a data set: concatenate lists, tuples,
+          NumPy arrays and pandas objects, merge dicts
+
+    Any other associative function of two arguments can be used as a
+    user-defined reducer.
+
+Authors:
+    KPMG Advanced Analytics & Big Data team, Amstelveen, The Netherlands
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted according to the terms listed in the file
+LICENSE.
+"""
+
+import operator
+
+from escore.core.lines import LineArray
+
+
+def concat(left, right) -> list:
+    """Concatenate two lists."""
+    return [*left, *right]
+
+
+def merge_dicts(left, right) -> dict:
+    """Merge two dicts; items of the right dict take precedence."""
+    merged = dict(left)
+    merged.update(right)
+    return merged
+
+
+def np_sum(left, right):
+    """Add two NumPy arrays element-wise."""
+    import numpy as np
+    return np.add(left, right)
+
+
+def join(left, right):
+    """Join two shards of a data set.
+
+    Lists and tuples, line arrays, NumPy arrays and pandas objects are
+    concatenated, and dicts are merged.
+    """
+    if isinstance(left, dict):
+        return merge_dicts(left, right)
+    if isinstance(left, (list, tuple)):
+        joined = [*left, *right]
+        return joined if type(left) is list else type(left)(joined)
+    if isinstance(left, LineArray):
+        return left + right
+    package = type(left).__module__.partition('.')[0]
+    if package == 'numpy':
+        import numpy as np
+        return np.concatenate([left, right])
+    if package == 'pandas':
+        import pandas as pd
+        return pd.concat([left, right])
+    raise TypeError('Cannot join shards of type {}.'.format(type(left).__name__))
+
+
+REDUCERS = dict(concat=concat,
+                sum=operator.add,
+                dict_merge=merge_dicts,
+                np_sum=np_sum,
+                min=min,
+                max=max,
+                join=join)
+
+
+def get_reducer(reducer):
+    """Get reducer function.
+
+    :param reducer: name of built-in reducer or function of two partial results
+    :return: reducer function
+    :raise: ValueError if reducer is not known.
+    """
+    if callable(reducer):
+        return reducer
+    if reducer not in REDUCERS:
+        raise ValueError('Unknown reducer "{}"; built-in reducers are {}.'.format(reducer, ', '.join(REDUCERS)))
+    return REDUCERS[reducer]
+
+
+class TreeReducer:
+    """Incremental reduction of partial results over ranges of fork indices.
+
+    Partial results are added as they become available, each for a range of
+    fork indices.  A partial result is combined with those of the adjacent
+    ranges as soon as these are available, so that the reduction proceeds
+    while other forks are still running.  Only results of ranges of
+    comparable sizes are combined, so that the combined results form a
+    balanced tree, also if the forks finish in order of fork index: a
+    reducer that copies its arguments, e.g. concat, copies each partial
+    result of order log(n_fork) times.  Results are always combined left to
+    right, i.e. in order of fork index, so for an associative reducer the
+    outcome does not depend on the order in which the forks finish.
+
+    >>> tree = TreeReducer('sum')
+    >>> tree.add(1, 2, 10)
+    >>> tree.add(0, 1, 5)
+    >>> tree.result()
+    15
+    """
+
+    def __init__(self, reducer='concat'):
+        """Initialize reducer.
+
+        :param reducer: name of built-in reducer or function of two partial results
+        """
+        self.reducer = get_reducer(reducer)
+        self._segments = {}
+        self._start_of = {}
+
+    def __len__(self):
+        return len(self._segments)
+
+    def add(self, start, stop, value):
+        """Add partial result for a range of fork indices.
+
+        :param int start: first fork index of range
+        :param int stop: end of range, i.e. last fork index plus one
+        :param value: partial result
+        """
+        while True:
+            # combine with the result of the range to the left
+            left = self._start_of.get(start)
+            if left is not None and self._balanced(start - left, stop - start):
+                del self._start_of[start]
+                _, left_value = self._segments.pop(left)
+                value = self.reducer(left_value, value)
+                start = left
+                continue
+            # combine with the result of the range to the right
+            right_stop = self._segments.get(stop, (None,))[0]
+            if right_stop is not None and self._balanced(stop - start, right_stop - stop):
+                _, right_value = self._segments.pop(stop)
+                del self._start_of[right_stop]
+                value = self.reducer(value, right_value)
+                stop = right_stop
+                continue
+            break
+        self._segments[start] = (stop, value)
+        self._start_of[stop] = start
+
+    @staticmethod
+    def _balanced(left_size, right_size) -> bool:
+        """Check if ranges are of comparable sizes, i.e. within a factor two."""
+        return left_size <= 2 * right_size and right_size <= 2 * left_size
+
+    def result(self, default=None):
+        """Get the reduced result.
+
+        The remaining results are combined in order of fork index, smallest
+        adjacent ranges first.  This includes results of ranges that are not
+        adjacent, e.g. because of a failed fork.
+
+        :param default: result if no partial results have been added
+        :return: reduced result
+        """
+        segments = [(stop - start, value) for start, (stop, value) in sorted(self._segments.items())]
+        if not segments:
+            return default
+        while len(segments) > 1:
+            pos = min(range(len(segments) - 1), key=lambda idx: segments[idx][0] + segments[idx + 1][0])
+            (left_size, left_value), (right_size, right_value) = segments[pos:pos + 2]
+            segments[pos:pos + 2] = [(left_size + right_size, self.reducer(left_value, right_value))]
+        return segments[0][1]
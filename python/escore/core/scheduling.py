@@ -0,0 +1,186 @@
+"""Project: Eskapade - A python-based package for data analysis.
+
+Created: 2026/10/18
+
+Description:
+    Dependency analysis and concurrent scheduling of processors.
+
+    The data-store keys that links declare as input (read_key) and output
+    (store_key) are used to build a dependency graph of links or chains.
+    Processors without data dependencies can then be executed concurrently
+    on a pool of worker threads.
+
+Authors:
+    KPMG Advanced Analytics & Big Data team, Amstelveen, The Netherlands
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted according to the terms listed in the file
+LICENSE.
+"""
+
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from escore.core.definitions import StatusCode
+
+
+def flatten_keys(key_spec) -> set:
+    """Get the set of data-store keys in a read_key or store_key specification.
+
+    A key specification can be a string, a link (whose store_key is taken),
+    or a (nested) list of these.
+
+    :param key_spec: key specification
+    :return: set of keys
+    :rtype: set
+    """
+    if key_spec is None:
+        return set()
+    if isinstance(key_spec, str):
+        return {key_spec} if key_spec else set()
+    if hasattr(key_spec, 'store_key'):
+        # a link: it refers to the output of that link
+        return flatten_keys(key_spec.store_key)
+    keys = set()
+    for spec in key_spec:
+        keys |= flatten_keys(spec)
+    return keys
+
+
+def link_keys(link):
+    """Get the data-store keys read and stored by a link.
+
+    A link that declares neither a read_key nor a store_key may access any
+    object in the data store.  For such a link None is returned, which marks
+    it as a barrier in the dependency graph.
+
+    :param link: link to inspect
+    :return: tuple of read keys and store keys, or None
+    :rtype: (set, set)
+    """
+    if link.read_key is None and link.store_key is None:
+        return None
+    return flatten_keys(link.read_key), flatten_keys(link.store_key)
+
+
+def chain_keys(chain):
+    """Get the data-store keys read and stored by the links of a chain.
+
+    :param chain: chain to inspect
+    :return: tuple of read keys and store keys, or None if any of the links does not declare its keys
+    :rtype: (set, set)
+    """
+    reads = set()
+    stores = set()
+    for link in chain:
+        keys = link_keys(link)
+        if keys is None:
+            return None
+        reads |= keys[0]
+        stores |= keys[1]
+    return reads, stores
+
+
+def last_uses(keys) -> dict:
+    """Determine the last processor that uses each data-store key.
+
+    A processor uses a key if it reads or stores it.  A processor with
+    undeclared keys (None) may use any key, so no key is used for the last
+    time before the last such processor.
+
+    :param list keys: (read keys, store keys) tuple or None for each processor, in execution order
+    :return: index of the last processor that uses each declared key
+    :rtype: dict
+    """
+    last = {}
+    last_barrier = -1
+    for idx, keys_idx in enumerate(keys):
+        if keys_idx is None:
+            last_barrier = idx
+            continue
+        for key in keys_idx[0] | keys_idx[1]:
+            last[key] = idx
+    return {key: max(idx, last_barrier) for key, idx in last.items()}
+
+
+def build_dependencies(keys) -> list:
+    """Build the dependency graph of a sequence of processors.
+
+    Processor j depends on an earlier processor i if j reads a key stored by
+    i (read after write), stores a key read by i (write after read), or
+    stores a key also stored by i (write after write).  A processor with
+    undeclared keys (None) is a barrier: it depends on all earlier
+    processors and all later processors depend on it.
+
+    :param list keys: (read keys, store keys) tuple or None for each processor, in execution order
+    :return: set of indices of the processors each processor depends on
+    :rtype: list
+    """
+    deps = []
+    last_barrier = None
+    for j, keys_j in enumerate(keys):
+        if keys_j is None:
+            deps.append(set(range(j)))
+            last_barrier = j
+            continue
+        reads_j, stores_j = keys_j
+        dep = set() if last_barrier is None else {last_barrier}
+        for i in range(0 if last_barrier is None else last_barrier + 1, j):
+            reads_i, stores_i = keys[i]
+            if (reads_j & stores_i) or (stores_j & reads_i) or (stores_j & stores_i):
+                dep.add(i)
+        deps.append(dep)
+    return deps
+
+
+def run_concurrently(processors, deps, func, n_workers, stop=None, done=None, ordered=False) -> dict:
+    """Execute processors concurrently on a pool of worker threads.
+
+    A processor is submitted as soon as all processors it depends on have
+    finished.  Once the stop criterion is met, no new processors are
+    submitted, but processors that are already running are waited for.
+
+    In ordered mode, the processors that come before the first stopping
+    processor, in the order of the processors, are still submitted.  The
+    processors executed up to the first stopping one are then the same as
+    in a sequential execution, whichever processor finished first.
+
+    :param list processors: processors to execute
+    :param list deps: indices of dependencies for each processor, see build_dependencies
+    :param func: function that executes a processor and returns a status code
+    :param int n_workers: maximum number of processors that run at the same time
+    :param stop: function of a returned status code; stop submitting if true. Default is any status except Success.
+    :param done: function called with a processor and its status in the scheduling thread when it has finished
+    :param bool ordered: after a stop, still submit the processors before the stopping one. Default is false.
+    :return: status code of each executed processor
+    :rtype: dict
+    """
+    if stop is None:
+        stop = lambda status: status != StatusCode.Success  # noqa: E731
+
+    statuses = {}
+    pending = set(range(len(processors)))
+    finished = set()
+    running = {}
+    # processors from this index on are not submitted anymore
+    stop_at = len(processors)
+
+    with ThreadPoolExecutor(max_workers=max(1, n_workers)) as pool:
+        while any(idx < stop_at for idx in pending) or running:
+            for idx in sorted(pending):
+                if idx < stop_at and deps[idx] <= finished:
+                    pending.discard(idx)
+                    running[pool.submit(func, processors[idx])] = idx
+            if not running:
+                break
+            completed, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in completed:
+                idx = running.pop(future)
+                status = future.result()
+                statuses[processors[idx]] = status
+                finished.add(idx)
+                if done is not None:
+                    done(processors[idx], status)
+                if stop(status):
+                    stop_at = min(stop_at, idx) if ordered else -1
+
+    return statuses
@@ -14,6 +14,7 @@ from escore.core_ops.links.apply import DsApply
 from escore.core_ops.links.import_data_store import ImportDataStore
 from escore.core_ops.links.fork_example import ForkExample
 from escore.core_ops.links.fork_data_collector import ForkDataCollector
+from escore.core_ops.links.fork_partitioner import ForkPartitioner
 from escore.core_ops.links.apply_func import ApplyFunc
 from escore.core_ops.links.skip_chain_if_present import SkipChainIfPresent
 
@@ -33,5 +34,6 @@ __all__ = ['AssertInDs',
            'ImportDataStore',
            'ForkExample',
            'ForkDataCollector',
+           'ForkPartitioner',
            'ApplyFunc',
            'SkipChainIfPresent']
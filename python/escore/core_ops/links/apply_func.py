@@ -15,7 +15,7 @@ modification, are permitted according to the terms listed in the file
 LICENSE.
 """
 
-from escore import process_manager, ConfigObject, DataStore, Link, StatusCode
+from escore import process_manager, ConfigObject, DataStore, DeferredValue, Link, StatusCode
 import copy
 
 class ApplyFunc(Link):
@@ -35,6 +35,8 @@ class ApplyFunc(Link):
         :param args: all args are passed pass to function as args.
         :param kwargs: all other key word arguments are passed on to the function as kwargs.
         :param str store_key: key of output data to store in data store
+        :param bool deferred: if true, the input data is read at execution, but the function is only applied
+                              when the output data is first accessed in the data store. Default is false.
         """
         # initialize Link, pass name from kwargs
         Link.__init__(self, kwargs.pop('name', 'ApplyFunc'))
@@ -48,7 +50,8 @@ class ApplyFunc(Link):
                              assert_len = False,
                              assert_in = True,
                              func = None,
-                             store_key='')
+                             store_key='',
+                             deferred=False)
 
         # pass on remaining kwargs to pandas reader
         self.args = copy.deepcopy(args)
@@ -65,6 +68,8 @@ class ApplyFunc(Link):
         self.check_arg_types(store_key=str)
         if self.func is None:
             raise AssertionError('Input function not set.')
+        if self.deferred and not self.store_key:
+            raise AssertionError('Deferred function requires a store key.')
 
         return StatusCode.Success
 
@@ -82,11 +87,17 @@ class ApplyFunc(Link):
                 obj = ds.get(self.read_key, self.default, self.assert_type, self.assert_len, self.assert_in)
             elif isinstance(self.read_key, list):
                 obj = [ds.get(key, self.default, self.assert_type, self.assert_len, self.assert_in) for key in self.read_key]
-            # apply function
-            trans_obj = self.func(obj, *self.args, **self.kwargs)
+            args = (obj,) + tuple(self.args)
         else:
             # possibly function does not require object as input
-            trans_obj = self.func(*self.args, **self.kwargs)
+            args = tuple(self.args)
+
+        if self.deferred:
+            # apply function on first access of the output data
+            trans_obj = DeferredValue(self.func, *args, **self.kwargs)
+        else:
+            # apply function
+            trans_obj = self.func(*args, **self.kwargs)
 
         if self.store_key:
             ds[self.store_key] = trans_obj
@@ -70,10 +70,9 @@ class DsObjectDeleter(Link):
 
         # delete specific class types
         for cls in self.deletion_classes:
-            for key in ds:
-                if isinstance(ds[key], cls):
-                    self.logger.debug('Now deleting datastore object with key "{key}".', key=key)
-                    del ds[key]
+            for key in ds.keys_of_type(cls):
+                self.logger.debug('Now deleting datastore object with key "{key}".', key=key)
+                del ds[key]
 
         # delete all but specific items
         if len(self.keep_only):
@@ -16,13 +16,13 @@ modification, are permitted according to the terms listed in the file
 LICENSE.
 """
 
-import copy
 import sys
 
 from escore import DataStore
 from escore import Link
 from escore import StatusCode
 from escore import process_manager
+from escore.core.lines import LineArray
 
 
 class EventLooper(Link):
@@ -42,6 +42,9 @@ class EventLooper(Link):
         :param bool unique: if true, keep only unique lines before storage (optional),
         :param list skip_line_beginning_with: skip line if it starts with any of the list. input is list of strings.
             Default is ['#'] (optional)
+        :param bool compact: if true, collect lines in a compact LineArray instead of a list; falls back to a list
+            if a line processor returns anything but a string (optional)
+        :param bool intern: if true, store identical lines only once in the LineArray (optional)
         """
         # initialize Link
         Link.__init__(self, kwargs.pop('name', 'EventLooper'))
@@ -54,7 +57,9 @@ class EventLooper(Link):
                              line_processor_set=[],
                              sort=False,
                              unique=False,
-                             skip_line_beginning_with=['#'])
+                             skip_line_beginning_with=['#'],
+                             compact=False,
+                             intern=False)
 
         # process keyword arguments
         self.check_extra_kwargs(kwargs)
@@ -95,7 +100,7 @@ class EventLooper(Link):
         No output is printed except for lines that are passed on,
         such that the output lines can be picked up again by another parser.
         """
-        lines = []
+        lines = LineArray(intern=self.intern) if self.compact else []
 
         # default line stream is set to sys.stdin
         # print or collect (processed) lines
@@ -104,23 +109,30 @@ class EventLooper(Link):
             # skip empty and comment lines
             if not line or any(line.startswith(c) for c in self.skip_line_beginning_with):
                 continue
-            myline = copy.deepcopy(line)
+            myline = line
             for func in self.line_processor_set:
                 myline = func(myline)
             if not self._collect:
                 print(myline)
-            else:
-                lines.append(myline)
+                continue
+            if isinstance(lines, LineArray) and not isinstance(myline, str):
+                # a line array only holds strings, so keep processed objects in a plain list
+                self.logger.warning('Line processor returned a {type}; collecting lines in a list.',
+                                    type=type(myline).__name__)
+                lines = list(lines)
+            lines.append(myline)
 
         if not self._collect:
             return StatusCode.Success
 
         # perform basic operations before storage, if desired:
         # sorting and unique set.
+        # a line array keeps the first occurrence of each line in order
+        compact = isinstance(lines, LineArray)
         if self.sort:
-            lines = sorted(lines)
+            lines = lines.sorted() if compact else sorted(lines)
         if self.unique:
-            lines = list(set(lines))
+            lines = lines.unique() if compact else list(set(lines))
 
         ds = process_manager.service(DataStore)
         ds[self.store_key] = lines
@@ -16,6 +16,7 @@ LICENSE.
 """
 
 from escore import process_manager, ConfigObject, DataStore, ForkStore, Link, StatusCode
+from escore.core.reducers import concat, get_reducer
 
 def unit_func(x):
     return x
@@ -33,6 +34,9 @@ class ForkDataCollector(Link):
           - 'key_fs' (string, optional): output key in forkstore
           - 'func': function to apply, optional
           - 'append': if key_ds points to a list, append each item to list in forkstore. Default is True.
+          - 'reducer': name of built-in reducer or associative function of two partial results, used to
+            combine the objects of all forks, see escore.core.reducers. Default is 'concat', which collects
+            the objects in a list.
           - 'args' (tuple, optional): args for 'func'
           - 'kwargs' (dict, optional): kwargs for 'func'
         """
@@ -69,11 +73,17 @@ class ForkDataCollector(Link):
             keys = list(arr.keys())
             if 'key_ds' not in keys:
                 raise AssertionError('key input is insufficient.')
+            arr['reducer'] = get_reducer(arr.get('reducer', 'concat'))
 
         # will count number of times execute has been called.
         fs = process_manager.service(ForkStore)
         fs['n_'+self.name+'_executed'] = 0
 
+        # objects of the forks are reduced as the forks finish
+        fs.register_reducer('n_'+self.name+'_executed', 'sum')
+        for arr in self.keys:
+            fs.register_reducer(arr.get('key_fs', arr['key_ds']), arr['reducer'])
+
         return StatusCode.Success
 
     def execute(self):
@@ -86,35 +96,35 @@ class ForkDataCollector(Link):
         if not 'fork' in settings:
             # nothing to do
             return StatusCode.Success
-        fidx = settings.get('fork_index', 0)
+        # number of fork indices processed in this execution
+        n_indices = sum(1 for _ in self.fork_indices())
 
         ds = process_manager.service(DataStore)
         fs = process_manager.service(ForkStore)
 
-        # collecting inputs from datastore and adding to forkstore
+        # collecting inputs from datastore and adding to the local namespace of the fork index.
+        # the namespace is committed to the forkstore in one go, so no lock is needed.
+        n_key = 'n_' + self.name + '_executed'
+        fs.local[n_key] = fs.local.get(n_key, 0) + n_indices
         for arr in self.keys:
             keys = list(arr.keys())
             key_ds = arr['key_ds']
             assert key_ds in ds, 'key {} not in datastore'.format(key_ds)
             key_fs = key_ds if 'key_fs' not in keys else arr['key_fs']
             append_items = True if 'append' not in keys else arr['append']
-            # make sure forkstore is unlocked, then lock
-            #fs.wait_until_unlocked()
-            with fs.lock:
-                fs['n_'+self.name+'_executed'] += 1
-                #EOFError: Ran out of input
-                #_pickle.UnpicklingError: invalid load key, '\x00'.
-                # make sure of order
-                temp_list = fs.get(key_fs, [])
-                obj = ds[key_ds]
-                if not isinstance(obj, list):
-                    temp_list.append(obj)
+            obj = ds[key_ds]
+            if arr['reducer'] is not concat:
+                # reduce locally: only the partial result of this fork is committed
+                fs.local[key_fs] = arr['reducer'](fs.local[key_fs], obj) if key_fs in fs.local else obj
+                continue
+            temp_list = fs.local.setdefault(key_fs, [])
+            if not isinstance(obj, list):
+                temp_list.append(obj)
+            else:
+                if append_items:
+                    temp_list += obj
                 else:
-                    if append_items:
-                        temp_list += obj
-                    else:
-                        temp_list.append(obj)
-                fs[key_fs] = temp_list
+                    temp_list.append(obj)
 
         return StatusCode.Success
 
@@ -127,19 +137,24 @@ class ForkDataCollector(Link):
         ds = process_manager.service(DataStore)
         fs = process_manager.service(ForkStore)
 
+        # the namespaces committed by the forked processes are reduced in order of fork index
+        n_key = 'n_' + self.name + '_executed'
+        n_executed = fs.get(n_key, 0) + fs.reduce(n_key, default=0)
+
         # check if nothing to do
-        if fs.get('n_'+self.name+'_executed', 0) == 0:
+        if n_executed == 0:
             return StatusCode.Success
         # check number of times forkdatacollector has run
-        if fs.get('n_fork', 0) > 0 and (fs['n_'+self.name+'_executed'] % fs['n_fork'] > 0):
-            self.logger.warning('Did not execute multiple of n_fork {0} times: {1}. Data may be missing.'.format(fs['n_fork'], fs['n_'+self.name+'_executed']))
+        if fs.get('n_fork', 0) > 0 and (n_executed % fs['n_fork'] > 0):
+            self.logger.warning('Did not execute multiple of n_fork {0} times: {1}. Data may be missing.'.format(fs['n_fork'], n_executed))
 
         # putting (transformed) objects from forkstore back into datastore
         for arr in self.keys:
             keys = list(arr.keys())
             key_ds = arr['key_ds']
             key_fs = key_ds if 'key_fs' not in keys else arr['key_fs']
-            if key_fs not in fs:
+            obj = fs.reduce(key_fs)
+            if obj is None:
                 raise AssertionError('key {} not in forkstore.'.format(key_fs))
             # retrieve function to apply
             func = unit_func if 'func' not in keys else arr['func']
@@ -147,7 +162,6 @@ class ForkDataCollector(Link):
             kwargs = {} if 'kwargs' not in keys else arr['kwargs']
             # apply transformation
             self.logger.debug('Applying function {function!s}.', function=func)
-            obj = fs[key_fs]
             try:
                 trans_obj = func(obj, *args, **kwargs)
             except:
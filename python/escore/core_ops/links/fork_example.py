@@ -66,23 +66,18 @@ class ForkExample(Link):
         ds = process_manager.service(DataStore)
         fs = process_manager.service(ForkStore)
 
-        # retrieve the index of the forked process
-        fidx = settings.get('fork_index', 0)
-        self.logger.debug('Now executing link: {link}. Fork index: {fidx}', link=self.name, fidx=fidx)
+        # retrieve the indices assigned to the forked process
+        fidx = list(self.fork_indices())
+        self.logger.debug('Now executing link: {link}. Fork indices: {fidx}', link=self.name, fidx=fidx)
 
-        # store a number for later collection
+        # store the indices for later collection
         ds[self.store_key] = fidx
 
         # count how often this loop has been executed (including loops!).
-        # make sure forkstore is unlocked, then lock
-        #fs.wait_until_unlocked()
-        with fs.lock:
-            self.logger.info('Fork {} is locked.'.format(fidx))
-            fs['n_'+self.name+'_executed'] += 1
-        self.logger.info('Fork {} is unlocked.'.format(fidx))
-
-        # fs['exec_index'] += 1 is not stable for some reason?
-        # https://stackoverflow.com/questions/38703907/modify-a-list-in-multiprocessing-pools-manager-dict
+        # the count is kept in the local namespace of the fork index, which is
+        # committed to the forkstore when the fork index is done: no lock needed.
+        n_key = 'n_' + self.name + '_executed'
+        fs.local[n_key] = fs.local.get(n_key, 0) + len(fidx)
 
         self.logger.debug('Done executing link: {link}. Fork index: {fidx}', link=self.name, fidx=fidx)
 
@@ -95,6 +90,8 @@ class ForkExample(Link):
         :rtype: StatusCode
         """
         fs = process_manager.service(ForkStore)
-        self.logger.info('Link {link} has been executed {loop} times.', link=self.name, loop=fs['n_'+self.name+'_executed'])
+        n_key = 'n_' + self.name + '_executed'
+        n_executed = fs[n_key] + sum(fs.collect(n_key))
+        self.logger.info('Link {link} has been executed {loop} times.', link=self.name, loop=n_executed)
 
         return StatusCode.Success
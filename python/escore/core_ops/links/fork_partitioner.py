@@ -0,0 +1,186 @@
+"""Project: Eskapade - A python-based package for data analysis.
+
+Class: ForkPartitioner
+
+Created: 2026-10-18
+
+Description:
+    Algorithm to split a data set into shards, one per fork index, and to
+    gather the processed shards of the forked processes.
+
+Authors:
+    KPMG Advanced Analytics & Big Data team, Amstelveen, The Netherlands
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted according to the terms listed in the file
+LICENSE.
+"""
+
+from escore import process_manager, ConfigObject, DataStore, Link, StatusCode
+
+
+class ForkPartitioner(Link):
+    """Split a data set into shards for the forked processes of a chain.
+
+    The partitioner is the first link of a forked chain.  Before forking, it
+    determines which part of the data set in the data store goes to which
+    fork index.  In a forked process, it replaces the data set in the data
+    store by the shard of that process, so the following links of the chain
+    only see the shard, under the original key.  After forking, the
+    (processed) shards stored under the gather keys are joined in order of
+    fork index and put back in the data store of the parent process.
+
+    Lists, tuples, dicts, NumPy arrays and pandas objects can be split:
+
+        - range: consecutive, equally sized parts of the data set
+        - hash: items are assigned by hash value; for a dict the hash of the
+          key is used, for a data frame or a 2-D array the hash of the row
+          values, or of the value in the hash-key column.  Joined shards are
+          ordered by fork index, not in the original order.
+
+    >>> chain = Chain('fork')
+    >>> chain.n_fork = 8
+    >>> chain.add(ForkPartitioner(read_key='records', gather_keys=['records', 'scores']))
+    >>> chain.add(ScoreRecords(read_key='records', store_key='scores'))
+    """
+
+    def __init__(self, **kwargs):
+        """Initialize an instance.
+
+        :param str name: name of link
+        :param str read_key: key of data set to split in data store
+        :param str method: method to split data set, 'range' or 'hash'. Default is 'range'.
+        :param hash_func: function of item (or key for a dict) to compute the hash value. Default is hash.
+        :param hash_key: column of a data frame, field of a structured array, or column index of a 2-D array,
+                         of which the value is hashed instead of the row
+        :param list gather_keys: data-store keys of objects to gather after forking. Default is [read_key].
+        :param reducer: name of built-in reducer or function to join the gathered objects,
+                        see escore.core.reducers. Default is 'join'.
+        """
+        # initialize Link, pass name from kwargs
+        Link.__init__(self, kwargs.pop('name', 'ForkPartitioner'))
+
+        # Process and register keyword arguments. If the arguments are not given, all arguments are popped from
+        # kwargs and added as attributes of the link. Otherwise, only the provided arguments are processed.
+        self._process_kwargs(kwargs, read_key='', method='range', hash_func=hash, hash_key=None,
+                             gather_keys=None, reducer='join')
+
+        # check residual kwargs; exit if any present
+        self.check_extra_kwargs(kwargs)
+
+        self._data = None
+        self._shards = []
+
+    def initialize(self):
+        """Initialize the link.
+
+        The data set is split in the parent process, before forking.
+
+        :returns: status code of initialization
+        :rtype: StatusCode
+        """
+        if not self.read_key:
+            raise AssertionError('read_key has not been set.')
+        if self.method not in ('range', 'hash'):
+            raise AssertionError('unknown split method "{}"; expected "range" or "hash".'.format(self.method))
+        if self.gather_keys is None:
+            self.gather_keys = [self.read_key]
+
+        n_fork = (self.parent.n_fork or self.parent.n_thread) if self.parent is not None else 0
+        if n_fork <= 0:
+            self.logger.warning('Chain is not forked; data set "{key}" is not split.', key=self.read_key)
+            return StatusCode.Success
+
+        ds = process_manager.service(DataStore)
+        self._data = ds.get(self.read_key, assert_in=True)
+        self._shards = self._split(self._data, n_fork)
+        self.logger.debug('Split data set "{key}" of size {size:d} into {n:d} shards by {method}.',
+                          key=self.read_key, size=len(self._data), n=n_fork, method=self.method)
+
+        # register the keys to gather with the chain
+        for key in self.gather_keys:
+            self.parent.fork_gather[key] = self.reducer
+
+        return StatusCode.Success
+
+    def _split(self, data, n_fork) -> list:
+        """Determine the selection of items in each shard.
+
+        :return: slice (range method) or list of indices or keys (hash method) for each shard
+        :rtype: list
+        """
+        size = len(data)
+        if self.method == 'range':
+            return [slice(idx * size // n_fork, (idx + 1) * size // n_fork) for idx in range(n_fork)]
+        shards = [[] for _ in range(n_fork)]
+        items = ((key, key) for key in data) if isinstance(data, dict) else enumerate(self._hash_values(data))
+        for item, value in items:
+            shards[self.hash_func(value) % n_fork].append(item)
+        return shards
+
+    def _hash_values(self, data):
+        """Get a hashable value for each row of a data set.
+
+        Rows of data frames and multi-dimensional or structured arrays are
+        not hashable; the tuple of the values of a data-frame row and the
+        bytes of an array row are hashed instead.
+        """
+        if self.hash_key is not None:
+            if hasattr(data, 'iloc') or getattr(getattr(data, 'dtype', None), 'names', None):
+                data = data[self.hash_key]
+            elif hasattr(data, 'shape'):
+                data = data[:, self.hash_key]
+            else:
+                data = [row[self.hash_key] for row in data]
+        if hasattr(data, 'itertuples'):
+            return data.itertuples(index=False, name=None)
+        if hasattr(data, 'shape') and not hasattr(data, 'iloc') and (data.ndim > 1 or data.dtype.names):
+            return (row.tobytes() for row in data)
+        return iter(data)
+
+    @staticmethod
+    def _take(data, selection):
+        """Get the items of a data set in a selection."""
+        if isinstance(data, dict):
+            keys = list(data.keys())[selection] if isinstance(selection, slice) else selection
+            return {key: data[key] for key in keys}
+        if hasattr(data, 'iloc'):
+            return data.iloc[selection]
+        if isinstance(selection, slice) or hasattr(data, 'shape'):
+            return data[selection]
+        return type(data)(data[pos] for pos in selection)
+
+    def execute(self):
+        """Execute the link.
+
+        In a forked process, the data set is replaced by the shard of the
+        assigned fork indices.
+
+        :returns: status code of execution
+        :rtype: StatusCode
+        """
+        settings = process_manager.service(ConfigObject)
+        if 'fork' not in settings or not self._shards:
+            return StatusCode.Success
+
+        indices = list(self.fork_indices())
+        if self.method == 'range':
+            selection = slice(self._shards[indices[0]].start, self._shards[indices[-1]].stop)
+        else:
+            selection = [item for fidx in indices for item in self._shards[fidx]]
+
+        ds = process_manager.service(DataStore)
+        ds[self.read_key] = self._take(self._data, selection)
+
+        return StatusCode.Success
+
+    def finalize(self):
+        """Finalize the link.
+
+        :returns: status code of finalization
+        :rtype: StatusCode
+        """
+        self._data = None
+        self._shards = []
+
+        return StatusCode.Success
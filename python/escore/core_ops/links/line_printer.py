@@ -19,6 +19,7 @@ from escore import DataStore
 from escore import Link
 from escore import StatusCode
 from escore import process_manager
+from escore.core.lines import LineArray
 
 
 class LinePrinter(Link):
@@ -28,7 +29,7 @@ class LinePrinter(Link):
         """Set up the configuration of link LinePrinter.
 
         :param str name: name of link
-        :param str read_key: key of input data to read from data store
+        :param str read_key: key of input data to read from data store; a list of lines or a LineArray
         """
         # initialize Link, pass name from kwargs
         Link.__init__(self, kwargs.pop('name', 'LinePrinter'))
@@ -56,7 +57,7 @@ class LinePrinter(Link):
 
         # just print the lines!
         lines = ds[self.read_key]
-        assert isinstance(lines, list) and len(lines), 'lines is not a (filled) list.'
+        assert isinstance(lines, (list, LineArray)) and len(lines), 'lines is not a (filled) list.'
 
         for line in lines:
             print(line)
@@ -16,6 +16,7 @@ LICENSE.
 """
 
 from escore import DataStore
+from escore import DeferredValue
 from escore import Link
 from escore import StatusCode
 from escore import process_manager
@@ -34,6 +35,8 @@ class ToDsDict(Link):
         :param bool at_initialize: store at initialize of link. Default is false.
         :param bool at_execute: store at execute of link. Default is true.
         :param bool copydict: if true and obj is a dict, copy all key value pairs into datastore. Default is false.
+        :param bool deferred: if true, obj (or each value of a copied dict) is a function that is called
+                              to compute the object when it is first accessed in the datastore. Default is false.
         """
         Link.__init__(self, kwargs.pop('name', 'ToDsDict'))
 
@@ -44,7 +47,8 @@ class ToDsDict(Link):
                              at_initialize=False,
                              at_execute=True,
                              force=False,
-                             copydict=False)
+                             copydict=False,
+                             deferred=False)
         self.check_extra_kwargs(kwargs)
 
     def initialize(self):
@@ -52,6 +56,10 @@ class ToDsDict(Link):
         # perform basic checks.
         if self.obj is None:
             raise RuntimeError('object "{}" to store is of type None'.format(self.store_key))
+        if self.deferred:
+            funcs = self.obj.values() if self.copydict and isinstance(self.obj, dict) else [self.obj]
+            if not all(callable(func) for func in funcs):
+                raise TypeError('deferred object "{}" to store is not callable'.format(self.store_key))
         # storage key needs to be set in nearly all cases
         if not (self.copydict and isinstance(self.obj, dict)):
             if not (isinstance(self.store_key, str) and self.store_key):
@@ -73,8 +81,12 @@ class ToDsDict(Link):
         """
         # if dict and copydict==true, store all individual items
         if self.copydict and isinstance(self.obj, dict):
-            stats = [(self.store(ds, v, k, force=self.force)).value for k, v in self.obj.items()]
+            stats = [(self.store(ds, self._value(v), k, force=self.force)).value for k, v in self.obj.items()]
             return StatusCode(max(stats))
 
         # default: store obj under store_key
-        return self.store(ds, self.obj, force=self.force)
+        return self.store(ds, self._value(self.obj), force=self.force)
+
+    def _value(self, obj):
+        """Get the value to store for an object, deferred if requested."""
+        return DeferredValue(obj) if self.deferred else obj
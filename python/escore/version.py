@@ -0,0 +1,6 @@
+"""THIS FILE IS AUTO-GENERATED BY ESKAPADE SETUP.PY."""
+
+name = 'eskapade-core'
+version = '1.0.0'
+full_version = '1.0.0'
+release = True
@@ -1,8 +1,10 @@
+import threading
 import unittest
 
 from escore.core import execution
 from escore.core.definitions import StatusCode
 from escore.core.element import Chain, Link
+from escore.core.process_manager import process_manager
 
 
 class ChainTest(unittest.TestCase):
@@ -329,3 +331,123 @@ class ChainTest(unittest.TestCase):
         self.assertEqual(self.dummy_chain.fin,
                          expected,
                          msg='Finalization order and number mismatch!')
+
+    def test_execute_parallel_links(self):
+        barrier = threading.Barrier(2, timeout=10)
+        failed = threading.Event()
+
+        class Produce(Link):
+            def execute(self):
+                barrier.wait()
+                self.parent.exec.append(self.name + 'Exec')
+                return StatusCode.Success
+
+        class Consume(Link):
+            def __init__(self, name, status, wait_for_failure=False):
+                super().__init__(name)
+                self.status = status
+                self.wait_for_failure = wait_for_failure
+
+            def execute(self):
+                if self.wait_for_failure:
+                    failed.wait(10)
+                self.parent.exec.append(self.name + 'Exec')
+                if self.status == StatusCode.Failure:
+                    failed.set()
+                return self.status
+
+        chain = type(self.dummy_chain)('ParallelChain')
+        chain.parallel_links = True
+        process_manager.num_cpu = 2
+
+        produce_a, produce_b = Produce('ProduceA'), Produce('ProduceB')
+        produce_a.store_key, produce_b.store_key = 'a', 'b'
+        break_a = Consume('BreakA', StatusCode.BreakChain, wait_for_failure=True)
+        break_a.read_key = 'a'
+        fail_b = Consume('FailB', StatusCode.Failure)
+        fail_b.read_key = 'b'
+        for link in (produce_a, produce_b, break_a, fail_b):
+            chain.add(link)
+
+        status = chain.execute()
+
+        # independent links only pass the barrier if they run concurrently
+        self.assertEqual(sorted(chain.exec), ['BreakAExec', 'FailBExec', 'ProduceAExec', 'ProduceBExec'])
+        self.assertLess(chain.exec.index('ProduceAExec'), chain.exec.index('BreakAExec'),
+                        msg='Link executed before its input was produced!')
+        self.assertLess(chain.exec.index('ProduceBExec'), chain.exec.index('FailBExec'),
+                        msg='Link executed before its input was produced!')
+        # the failing link finished first, but the first link in chain order that did not succeed wins
+        self.assertLess(chain.exec.index('FailBExec'), chain.exec.index('BreakAExec'))
+        self.assertEqual(status,
+                         StatusCode.BreakChain,
+                         msg='Execution did not break off!')
+
+    def test_execute_parallel_links_before_failure(self):
+        failed = threading.Event()
+
+        class Run(Link):
+            def __init__(self, name, status=StatusCode.Success, wait_for_failure=False):
+                super().__init__(name)
+                self.status = status
+                self.wait_for_failure = wait_for_failure
+
+            def execute(self):
+                if self.wait_for_failure:
+                    failed.wait(10)
+                self.parent.exec.append(self.name + 'Exec')
+                if self.status == StatusCode.Failure:
+                    failed.set()
+                return self.status
+
+        chain = type(self.dummy_chain)('ParallelChain')
+        chain.parallel_links = True
+        process_manager.num_cpu = 2
+
+        produce = Run('Produce', wait_for_failure=True)
+        produce.store_key = 'a'
+        consume = Run('Consume')
+        consume.read_key = 'a'
+        fail = Run('Fail', StatusCode.Failure)
+        fail.read_key = 'b'
+        for link in (produce, consume, fail):
+            chain.add(link)
+
+        status = chain.execute()
+
+        # the consumer comes before the failing link, so it is executed after the failure
+        self.assertEqual(chain.exec, ['FailExec', 'ProduceExec', 'ConsumeExec'])
+        self.assertEqual(status,
+                         StatusCode.Failure,
+                         msg='Execution did not fail!')
+
+    def test_scratch(self):
+        class Produce(Link):
+            def execute(self):
+                self.scratch['tmp'] = self.name
+                return StatusCode.Success
+
+        class Consume(Link):
+            def execute(self):
+                self.parent.exec.append(self.scratch.get('tmp'))
+                return StatusCode.Success
+
+        chain = type(self.dummy_chain)('ScratchChain')
+        produce, consume = Produce('Produce'), Consume('Consume')
+        [chain.add(_) for _ in (produce, consume)]
+
+        chain.initialize()
+        chain.execute()
+        self.assertEqual(chain.exec, ['Produce'], msg='Scratch object not shared by links!')
+        self.assertIs(produce.scratch, consume.scratch)
+
+        # scratch store of a thread is on top of the shared one
+        chain.open_thread_scratch()
+        chain.scratch['own'] = 1
+        self.assertEqual(chain.scratch['tmp'], 'Produce')
+        chain.close_thread_scratch()
+        self.assertNotIn('own', chain.scratch)
+
+        # scratch store is cleared after finalize
+        chain.finalize()
+        self.assertDictEqual(produce.scratch, {}, msg='Scratch store not cleared!')
@@ -0,0 +1,752 @@
+import gc
+import multiprocessing
+import os
+import tempfile
+import time
+import unittest
+import unittest.mock as mock
+
+from escore import process_manager, ConfigObject, DataStore, Link, StatusCode, core_ops
+from escore.core import execution
+from escore.core.element import Chain
+from escore.core.forking import (AdaptiveChunks, ForkResult, ForkThrottle, ForkWorkerPool, cgroup_cpu_limit,
+                                  cgroup_memory_available)
+
+
+class FailingForkLink(Link):
+    """Link that raises an exception for one fork index"""
+
+    def __init__(self, fail_index):
+        super().__init__('FailingForkLink')
+        self.fail_index = fail_index
+
+    def execute(self):
+        if self.fail_index in self.fork_indices():
+            raise RuntimeError('failure in fork index {:d}'.format(self.fail_index))
+        return StatusCode.Success
+
+
+class ForkWorkerPoolTest(unittest.TestCase):
+    """Tests for pool of forked worker processes"""
+
+    def test_map(self):
+        """Test execution of tasks on worker processes"""
+
+        pool = ForkWorkerPool(3, target=lambda task: (task ** 2, os.getpid()))
+        pool.start()
+        pids = set(pool.pids)
+        try:
+            results = pool.map(range(50))
+            results_again = pool.map(range(50, 60))
+        finally:
+            pool.close()
+
+        self.assertEqual(sorted(results), list(range(50)))
+        self.assertEqual([results[i][0] for i in range(50)], [i ** 2 for i in range(50)])
+        self.assertTrue(set(r[1] for r in results.values()) <= pids, 'tasks not executed by pool workers')
+        self.assertEqual(results_again[55][0], 55 ** 2)
+        self.assertEqual(pool.pids, [])
+
+    def test_map_failed_task(self):
+        """Test result of task that raises an exception"""
+
+        def target(task):
+            if task == 3:
+                raise RuntimeError('task failed')
+            return task
+
+        pool = ForkWorkerPool(2, target=target)
+        pool.start()
+        try:
+            results = pool.map(range(6))
+        finally:
+            pool.close()
+
+        self.assertIsNone(results[3])
+        self.assertEqual([results[i] for i in (0, 1, 2, 4, 5)], [0, 1, 2, 4, 5])
+
+    def test_map_worker_exit(self):
+        """Test re-assigning tasks of a worker that exits before starting them"""
+
+        exited = multiprocessing.Value('i', 0)
+
+        class ExitingPool(ForkWorkerPool):
+            def _send(self, message):
+                # first worker to receive task 3 exits before it reports the start
+                if message[0] == 'start' and message[2] == 3:
+                    with exited.get_lock():
+                        exited.value += 1
+                        first = exited.value == 1
+                    if first:
+                        os._exit(1)
+                super()._send(message)
+
+        pool = ExitingPool(2, target=lambda task: task ** 2)
+        pool.start()
+        try:
+            results = pool.map(range(8))
+        finally:
+            pool.close()
+
+        self.assertEqual(results, {task: task ** 2 for task in range(8)})
+        self.assertEqual(exited.value, 2)
+
+
+class AdaptiveChunksTest(unittest.TestCase):
+    """Tests for chunks of fork indices with adaptive size"""
+
+    def test_chunks(self):
+        """Test adaptation of chunk size to measured latency"""
+
+        chunks = AdaptiveChunks(1000, 2)
+        self.assertEqual(next(chunks), (0, 1))
+        self.assertEqual(next(chunks), (1, 2))
+
+        # 10 ms per index: target latency of 0.5 s gives 50 indices per chunk
+        chunks.update((0, 1), 0.01)
+        self.assertEqual(next(chunks), (2, 52))
+
+        # chunks shrink towards the end, to balance the workers
+        chunks.next_index = 980
+        self.assertEqual(next(chunks), (980, 985))
+
+        # all indices are covered
+        remaining = list(chunks)
+        self.assertEqual(remaining[-1][1], 1000)
+        self.assertEqual(sum(stop - start for start, stop in remaining), 15)
+
+
+class OverwriteLink(Link):
+    """Link that overwrites an object in the data store"""
+
+    def __init__(self, key):
+        super().__init__('OverwriteLink')
+        self.key = key
+
+    def execute(self):
+        process_manager.service(DataStore)[self.key] = None
+        return StatusCode.Success
+
+
+class ShardLink(Link):
+    """Link that records the size of a shard and doubles its values"""
+
+    def __init__(self, read_key, store_key):
+        super().__init__('ShardLink')
+        self.read_key = read_key
+        self.store_key = store_key
+
+    def execute(self):
+        ds = process_manager.service(DataStore)
+        shard = ds[self.read_key]
+        if isinstance(shard, dict):
+            ds[self.store_key] = {key: 2 * value for key, value in shard.items()}
+        else:
+            ds[self.store_key] = [2 * value for value in shard]
+        ds['shard_sizes'] = [len(shard)]
+        return StatusCode.Success
+
+
+class WriterLink(Link):
+    """Link that is not aware of forking and writes objects to the data store"""
+
+    def __init__(self):
+        super().__init__('WriterLink')
+
+    def execute(self):
+        ds = process_manager.service(DataStore)
+        ds['items'] = [process_manager.service(ConfigObject)['fork_index']]
+        ds['count'] = 1
+        return StatusCode.Success
+
+
+class AccumulatorLink(Link):
+    """Link that adds its fork indices to objects in the data store"""
+
+    def __init__(self):
+        super().__init__('AccumulatorLink')
+
+    def execute(self):
+        ds = process_manager.service(DataStore)
+        for fidx in self.fork_indices():
+            ds['items'] = ds.get('items', []) + [fidx]
+            ds['count'] = ds.get('count', 0) + 1
+        return StatusCode.Success
+
+
+class EvenIndexLink(Link):
+    """Link that only writes to the data store for even fork indices"""
+
+    def __init__(self):
+        super().__init__('EvenIndexLink')
+
+    def execute(self):
+        ds = process_manager.service(DataStore)
+        for fidx in self.fork_indices():
+            if fidx % 2 == 0:
+                ds['even'] = ds.get('even', []) + [fidx]
+        return StatusCode.Success
+
+
+class SlowForkLink(Link):
+    """Link that breaks off the chain for fork index 0 and is slow for other indices"""
+
+    def __init__(self, poll):
+        super().__init__('SlowForkLink')
+        self.poll = poll
+
+    def execute(self):
+        if 0 in self.fork_indices():
+            return StatusCode.BreakChain
+        start = time.time()
+        while time.time() - start < 30:
+            if self.poll and self.cancelled:
+                return StatusCode.Failure
+            time.sleep(0.01)
+        return StatusCode.Success
+
+
+class StragglerLink(Link):
+    """Link that is slow for the first execution of the last fork index"""
+
+    def __init__(self, marker, straggler):
+        super().__init__('StragglerLink')
+        self.marker = marker
+        self.straggler = straggler
+
+    def execute(self):
+        if self.straggler in self.fork_indices() and not os.path.exists(self.marker):
+            open(self.marker, 'w').close()
+            time.sleep(30)
+        return StatusCode.Success
+
+
+class ForkResultTest(unittest.TestCase):
+    """Tests for results of forked executions"""
+
+    def test_measure(self):
+        """Test measuring status and resource usage of an execution"""
+
+        result = ForkResult.measure(range(2, 4), lambda: StatusCode.Success)
+        self.assertEqual(result.status, StatusCode.Success)
+        self.assertEqual(result.fork_index, 2)
+        self.assertIsNone(result.traceback)
+        self.assertGreaterEqual(result.wall_time, 0.)
+        self.assertGreater(result.max_rss, 0)
+        if os.path.exists('/proc/self/smaps_rollup'):
+            self.assertGreater(result.private_dirty, 0)
+
+        def fail():
+            raise ValueError('bad input')
+
+        result = ForkResult.measure(range(1), fail)
+        self.assertEqual(result.status, StatusCode.Failure)
+        self.assertIn('ValueError: bad input', result.traceback)
+
+
+class ForkThrottleTest(unittest.TestCase):
+    """Tests for limiting the number of running forked processes"""
+
+    @staticmethod
+    def write_files(root, contents):
+        """Write files with given contents in root directory"""
+        for name, content in contents.items():
+            path = os.path.join(root, *name.split('/'))
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'w') as file_:
+                file_.write(content + '\n')
+
+    def test_cgroup_v2(self):
+        """Test reading cgroup v2 limits"""
+
+        with tempfile.TemporaryDirectory() as root:
+            self.assertIsNone(cgroup_cpu_limit(root))
+            self.assertIsNone(cgroup_memory_available(root))
+            self.write_files(root, {'cpu.max': '150000 100000', 'memory.max': '4096', 'memory.current': '1024'})
+            self.assertAlmostEqual(cgroup_cpu_limit(root), 1.5)
+            self.assertEqual(cgroup_memory_available(root), 3072)
+            self.write_files(root, {'cpu.max': 'max 100000', 'memory.max': 'max'})
+            self.assertIsNone(cgroup_cpu_limit(root))
+            self.assertIsNone(cgroup_memory_available(root))
+
+    def test_cgroup_v1(self):
+        """Test reading cgroup v1 limits"""
+
+        with tempfile.TemporaryDirectory() as root:
+            self.write_files(root, {'cpu/cpu.cfs_quota_us': '-1', 'cpu/cpu.cfs_period_us': '100000',
+                                    'memory/memory.limit_in_bytes': str(2 ** 63 - 4096),
+                                    'memory/memory.usage_in_bytes': '1024'})
+            self.assertIsNone(cgroup_cpu_limit(root))
+            self.assertIsNone(cgroup_memory_available(root))
+            self.write_files(root, {'cpu/cpu.cfs_quota_us': '200000', 'memory/memory.limit_in_bytes': '2048'})
+            self.assertAlmostEqual(cgroup_cpu_limit(root), 2.)
+            self.assertEqual(cgroup_memory_available(root), 1024)
+
+    def test_cgroup_of_process(self):
+        """Test reading limits of the control group of the process, not of the root"""
+
+        with tempfile.TemporaryDirectory() as root:
+            proc_cgroup = os.path.join(root, 'proc_cgroup')
+            self.write_files(root, {'proc_cgroup': '0::/batch/job',
+                                    'cpu.max': 'max 100000', 'memory.max': 'max', 'memory.current': '8192',
+                                    'batch/cpu.max': '300000 100000',
+                                    'batch/memory.max': '16384', 'batch/memory.current': '8192',
+                                    'batch/job/cpu.max': 'max 100000',
+                                    'batch/job/memory.max': '4096', 'batch/job/memory.current': '1024'})
+            self.assertAlmostEqual(cgroup_cpu_limit(root, proc_cgroup), 3.)
+            self.assertEqual(cgroup_memory_available(root, proc_cgroup), 3072)
+            self.write_files(root, {'batch/memory.current': '15360'})
+            self.assertEqual(cgroup_memory_available(root, proc_cgroup), 1024)
+
+        with tempfile.TemporaryDirectory() as root:
+            proc_cgroup = os.path.join(root, 'proc_cgroup')
+            self.write_files(root, {'proc_cgroup': '5:memory:/docker/abc\n4:cpu,cpuacct:/docker/abc',
+                                    'cpu/cpu.cfs_quota_us': '-1', 'cpu/cpu.cfs_period_us': '100000',
+                                    'cpu/docker/abc/cpu.cfs_quota_us': '50000',
+                                    'cpu/docker/abc/cpu.cfs_period_us': '100000',
+                                    'memory/memory.limit_in_bytes': str(2 ** 63 - 4096),
+                                    'memory/memory.usage_in_bytes': '8192',
+                                    'memory/docker/abc/memory.limit_in_bytes': '2048',
+                                    'memory/docker/abc/memory.usage_in_bytes': '1024'})
+            self.assertAlmostEqual(cgroup_cpu_limit(root, proc_cgroup), .5)
+            self.assertEqual(cgroup_memory_available(root, proc_cgroup), 1024)
+
+    @mock.patch('escore.core.forking.available_memory')
+    def test_may_start(self, mock_available_memory):
+        """Test throttling of forked processes on CPUs and memory"""
+
+        mock_available_memory.return_value = 1000
+        throttle = ForkThrottle(n_jobs=4)
+        self.assertTrue(throttle.may_start(3))
+        self.assertFalse(throttle.may_start(4))
+
+        # memory usage measured in a finished process
+        throttle.update(ForkResult(range(1), private_dirty=1))
+        self.assertEqual(throttle.memory_per_child, 1024)
+        self.assertTrue(throttle.may_start(0))
+        self.assertFalse(throttle.may_start(1))
+        mock_available_memory.return_value = 2000
+        self.assertTrue(throttle.may_start(1))
+        self.assertEqual(throttle.max_workers(10), 1)
+        self.assertEqual(ForkThrottle(n_jobs=4, memory_per_child=400).max_workers(10), 4)
+
+
+class ForkPoolChainTest(unittest.TestCase):
+    """Tests for execution of forked chains on a worker pool"""
+
+    def setUp(self):
+        execution.reset_eskapade()
+        settings = process_manager.service(ConfigObject)
+        settings['analysisName'] = 'ForkPoolChainTest'
+        settings['doNotStoreResults'] = True
+
+        self.num_cpu = process_manager.num_cpu
+
+    def tearDown(self):
+        process_manager.num_cpu = self.num_cpu
+        execution.reset_eskapade()
+
+    def test_fork_pool(self):
+        """Test collecting data from forked chain executed on worker pool"""
+
+        chain = Chain('fork')
+        chain.n_fork = 8
+        chain.fork_pool = True
+        chain.add(core_ops.ForkExample(store_key='fidx'))
+        chain.add(core_ops.ForkDataCollector(keys=['fidx']))
+
+        status = process_manager.execute()
+
+        self.assertEqual(status, StatusCode.Success)
+        self.assertEqual(sorted(process_manager.service(DataStore)['fidx']), list(range(8)))
+
+    def test_fork_dynamic(self):
+        """Test collecting data from chunks of fork indices pulled by workers"""
+
+        chain = Chain('fork')
+        chain.n_fork = 40
+        chain.fork_dynamic = True
+        chain.add(core_ops.ForkExample(store_key='fidx'))
+        chain.add(core_ops.ForkDataCollector(keys=['fidx']))
+
+        status = process_manager.execute()
+
+        self.assertEqual(status, StatusCode.Success)
+        self.assertEqual(process_manager.service(DataStore)['fidx'], list(range(40)))
+
+    def test_fork_modes_same_output(self):
+        """Test that fork indices on worker pools start from the data store before forking"""
+
+        process_manager.num_cpu = 2
+        for mode in ('fork', 'fork_pool', 'fork_dynamic'):
+            with self.subTest(mode=mode):
+                execution.reset_eskapade()
+                settings = process_manager.service(ConfigObject)
+                settings['analysisName'] = 'ForkPoolChainTest'
+                settings['doNotStoreResults'] = True
+                chain = Chain('fork')
+                chain.n_fork = 6
+                if mode != 'fork':
+                    setattr(chain, mode, True)
+                chain.fork_gather = dict(even='concat')
+                chain.add(EvenIndexLink())
+
+                status = process_manager.execute()
+
+                self.assertEqual(status, StatusCode.Success)
+                self.assertListEqual(process_manager.service(DataStore)['even'], [0, 2, 4])
+
+    def test_fork_reducer(self):
+        """Test reducing data of forked chain with a built-in reducer"""
+
+        chain = Chain('fork')
+        chain.n_fork = 6
+        chain.add(core_ops.ForkExample(store_key='fidx'))
+        chain.add(core_ops.ForkDataCollector(keys=[dict(key_ds='fidx', reducer='max')]))
+
+        status = process_manager.execute()
+
+        self.assertEqual(status, StatusCode.Success)
+        self.assertEqual(process_manager.service(DataStore)['fidx'], [5])
+
+    def test_fork_results(self):
+        """Test results sent by forked processes"""
+
+        chain = Chain('fork')
+        chain.n_fork = 4
+        chain.add(core_ops.ForkExample(store_key='fidx'))
+
+        status = process_manager.execute()
+
+        self.assertEqual(status, StatusCode.Success)
+        self.assertListEqual([res.fork_index for res in chain.fork_results], list(range(4)))
+        for res in chain.fork_results:
+            self.assertEqual(res.status, StatusCode.Success)
+            self.assertGreater(res.max_rss, 0)
+
+    def test_fork_failure(self):
+        """Test failing fast on an exception in a forked process"""
+
+        process_manager.num_cpu = 1
+        chain = Chain('fork')
+        chain.n_fork = 6
+        chain.add(FailingForkLink(fail_index=1))
+
+        status = process_manager.execute()
+
+        self.assertEqual(status, StatusCode.Failure)
+        self.assertListEqual([res.status for res in chain.fork_results], [StatusCode.Success, StatusCode.Failure])
+        self.assertIn('RuntimeError: failure in fork index 1', chain.fork_results[1].traceback)
+
+    def test_fork_warm(self):
+        """Test copy-on-write friendly forking with read-only data-store keys"""
+
+        ds = process_manager.service(DataStore)
+        ds['data'] = list(range(10000))
+        chain = Chain('fork')
+        chain.n_fork = 2
+        chain.fork_warm = True
+        chain.fork_read_only = ['data']
+        chain.add(core_ops.ForkExample(store_key='fidx'))
+        chain.add(OverwriteLink('data'))
+
+        status = process_manager.execute()
+
+        self.assertEqual(status, StatusCode.Failure)
+        self.assertIn('ReadOnlyKey', chain.fork_results[0].traceback)
+        self.assertEqual(gc.get_freeze_count(), 0, 'objects still frozen after forking')
+        ds['data'] = None
+
+    def test_fork_partitioner_range(self):
+        """Test splitting a list into consecutive shards for forked processes"""
+
+        ds = process_manager.service(DataStore)
+        ds['data'] = list(range(10))
+        chain = Chain('fork')
+        chain.n_fork = 4
+        chain.add(core_ops.ForkPartitioner(read_key='data', gather_keys=['doubled', 'shard_sizes']))
+        chain.add(ShardLink(read_key='data', store_key='doubled'))
+
+        status = process_manager.execute()
+
+        self.assertEqual(status, StatusCode.Success)
+        self.assertListEqual(ds['data'], list(range(10)), 'data set in parent process modified')
+        self.assertListEqual(ds['doubled'], [2 * value for value in range(10)])
+        self.assertListEqual(ds['shard_sizes'], [2, 3, 2, 3])
+
+    def test_fork_partitioner_hash(self):
+        """Test splitting a dict by hash of the keys for pool worker processes"""
+
+        ds = process_manager.service(DataStore)
+        ds['data'] = {key: key for key in range(20)}
+        chain = Chain('fork')
+        chain.n_fork = 3
+        chain.fork_pool = True
+        chain.add(core_ops.ForkPartitioner(read_key='data', method='hash', gather_keys=['data', 'shard_sizes']))
+        chain.add(ShardLink(read_key='data', store_key='data'))
+
+        status = process_manager.execute()
+
+        self.assertEqual(status, StatusCode.Success)
+        self.assertDictEqual(ds['data'], {key: 2 * key for key in range(20)})
+        self.assertListEqual(ds['shard_sizes'], [7, 7, 6])
+
+    def test_fork_partitioner_hash_rows(self):
+        """Test splitting arrays and data frames by hash of the rows"""
+
+        try:
+            import numpy as np
+        except ImportError:
+            self.skipTest('NumPy not available')
+
+        data = np.arange(40).reshape(20, 2) % 6
+        partitioner = core_ops.ForkPartitioner(read_key='data', method='hash')
+        shards = partitioner._split(data, 3)
+        self.assertListEqual(sorted(pos for shard in shards for pos in shard), list(range(20)))
+        # identical rows go to the same shard
+        self.assertTrue(any({0, 3, 6, 9, 12, 15, 18} <= set(shard) for shard in shards))
+
+        partitioner.hash_key = 1
+        shards = partitioner._split(data, 3)
+        for value in (1, 3, 5):
+            rows = set(np.flatnonzero(data[:, 1] == value).tolist())
+            self.assertTrue(any(rows <= set(shard) for shard in shards))
+
+        records = np.zeros(4, dtype=[('id', 'i8'), ('x', 'f8')])
+        records['id'] = [5, 6, 5, 6]
+        partitioner.hash_key = 'id'
+        self.assertListEqual(partitioner._split(records, 2), [[1, 3], [0, 2]])
+
+        try:
+            import pandas as pd
+        except ImportError:
+            self.skipTest('pandas not available')
+
+        df = pd.DataFrame(dict(id=[5, 6, 5, 6], x=[0.5, 1., 0.5, 2.]))
+        partitioner.hash_key = None
+        shards = partitioner._split(df, 2)
+        self.assertTrue(any({0, 2} <= set(shard) for shard in shards))
+        partitioner.hash_key = 'id'
+        self.assertListEqual(partitioner._split(df, 2), [[1, 3], [0, 2]])
+
+    def test_fork_merge(self):
+        """Test merging data-store objects written by forked processes"""
+
+        ds = process_manager.service(DataStore)
+        static = ds['static'] = ['not modified']
+        chain = Chain('fork')
+        chain.n_fork = 4
+        chain.fork_merge = True
+        chain.fork_reducers = dict(count='sum')
+        chain.add(WriterLink())
+
+        status = process_manager.execute()
+
+        self.assertEqual(status, StatusCode.Success)
+        self.assertListEqual(ds['items'], [0, 1, 2, 3])
+        self.assertEqual(ds['count'], 4)
+        self.assertIs(ds['static'], static, 'unchanged object shipped back to parent process')
+
+    def test_fork_merge_workers(self):
+        """Test merging data-store objects written on a worker pool and in dynamic chunks"""
+
+        process_manager.num_cpu = 2
+        for mode in ('fork_pool', 'fork_dynamic'):
+            with self.subTest(mode=mode):
+                execution.reset_eskapade()
+                settings = process_manager.service(ConfigObject)
+                settings['analysisName'] = 'ForkPoolChainTest'
+                settings['doNotStoreResults'] = True
+                ds = process_manager.service(DataStore)
+                chain = Chain('fork')
+                chain.n_fork = 6
+                chain.fork_merge = True
+                chain.fork_reducers = dict(count='sum')
+                setattr(chain, mode, True)
+                chain.add(AccumulatorLink())
+
+                status = process_manager.execute()
+
+                self.assertEqual(status, StatusCode.Success)
+                self.assertListEqual(ds['items'], list(range(6)))
+                self.assertEqual(ds['count'], 6)
+
+    def test_fork_gather_written(self):
+        """Test gathering only the objects that a fork index wrote"""
+
+        ds = process_manager.service(DataStore)
+        ds['even'] = ['before forking']
+        chain = Chain('fork')
+        chain.n_fork = 4
+        chain.fork_gather = dict(even='concat')
+        chain.add(EvenIndexLink())
+
+        status = process_manager.execute()
+
+        self.assertEqual(status, StatusCode.Success)
+        self.assertListEqual(ds['even'], ['before forking', 0, 'before forking', 2])
+
+    def test_fork_merge_no_reducer(self):
+        """Test failure of merging objects that the configured reducer cannot combine"""
+
+        chain = Chain('fork')
+        chain.n_fork = 2
+        chain.fork_merge = True
+        chain.fork_reducers = dict(count='dict_merge')
+        chain.add(WriterLink())
+
+        status = process_manager.execute()
+
+        self.assertEqual(status, StatusCode.Failure)
+
+    def test_fork_merge_scalar(self):
+        """Test gathering numbers that cannot be joined in a list per fork index"""
+
+        ds = process_manager.service(DataStore)
+        chain = Chain('fork')
+        chain.n_fork = 3
+        chain.fork_merge = True
+        chain.fork_gather = dict(items='join')
+        chain.add(WriterLink())
+
+        status = process_manager.execute()
+
+        self.assertEqual(status, StatusCode.Success)
+        self.assertListEqual(ds['items'], [0, 1, 2])
+        self.assertListEqual(ds['count'], [1, 1, 1])
+
+        # gathered while the forks are running
+        chain.fork_merge = False
+        chain.fork_gather = dict(count='join')
+        del ds['count']
+
+        status = process_manager.execute()
+
+        self.assertEqual(status, StatusCode.Success)
+        self.assertListEqual(ds['count'], [1, 1, 1])
+
+    def test_fork_cancel(self):
+        """Test cooperative cancellation of forked processes"""
+
+        process_manager.num_cpu = 3
+        chain = Chain('fork')
+        chain.n_fork = 10
+        chain.add(SlowForkLink(poll=True))
+
+        start = time.time()
+        status = process_manager.execute()
+
+        self.assertLess(time.time() - start, 10)
+        self.assertEqual(status, StatusCode.Success)
+        self.assertEqual(chain.fork_results[0].status, StatusCode.BreakChain)
+        self.assertLess(len(chain.fork_results), 10)
+        self.assertFalse(chain.fork_results[0].cancelled)
+        self.assertTrue(all(res.cancelled for res in chain.fork_results[1:]))
+
+    def test_fork_cancel_kill(self):
+        """Test killing forked processes that do not finish after cancellation"""
+
+        process_manager.num_cpu = 3
+        chain = Chain('fork')
+        chain.n_fork = 10
+        chain.fork_grace_period = 0.2
+        chain.add(SlowForkLink(poll=False))
+
+        start = time.time()
+        status = process_manager.execute()
+
+        self.assertLess(time.time() - start, 10)
+        self.assertEqual(status, StatusCode.Success)
+        self.assertEqual(chain.fork_results[0].status, StatusCode.BreakChain)
+        self.assertTrue(all(res.cancelled for res in chain.fork_results[1:]))
+
+    def test_fork_pool_cancel(self):
+        """Test cancellation of fork indices queued for pool workers"""
+
+        process_manager.num_cpu = 2
+        chain = Chain('fork')
+        chain.n_fork = 20
+        chain.fork_pool = True
+        chain.add(SlowForkLink(poll=True))
+
+        start = time.time()
+        status = process_manager.execute()
+
+        self.assertLess(time.time() - start, 10)
+        self.assertEqual(status, StatusCode.Success)
+        self.assertEqual(chain.fork_results[0].status, StatusCode.BreakChain)
+        self.assertLess(len(chain.fork_results), 20)
+
+    def test_fork_threads(self):
+        """Test collecting data from a chain executed on a pool of threads"""
+
+        process_manager.num_cpu = 4
+        chain = Chain('threads')
+        chain.n_thread = 8
+        chain.add(core_ops.ForkExample(store_key='fidx'))
+        chain.add(core_ops.ForkDataCollector(keys=['fidx']))
+
+        status = process_manager.execute()
+
+        self.assertEqual(status, StatusCode.Success)
+        self.assertListEqual(process_manager.service(DataStore)['fidx'], list(range(8)))
+        self.assertListEqual([res.fork_index for res in chain.fork_results], list(range(8)))
+        self.assertNotIn('fork_index', process_manager.service(ConfigObject))
+
+    def test_fork_threads_merge(self):
+        """Test merging data-store objects written by threads"""
+
+        process_manager.num_cpu = 4
+        ds = process_manager.service(DataStore)
+        ds['data'] = list(range(10))
+        chain = Chain('threads')
+        chain.n_thread = 4
+        chain.fork_merge = True
+        chain.fork_reducers = dict(count='sum')
+        chain.add(core_ops.ForkPartitioner(read_key='data', gather_keys=['doubled', 'shard_sizes']))
+        chain.add(ShardLink(read_key='data', store_key='doubled'))
+        chain.add(WriterLink())
+
+        status = process_manager.execute()
+
+        self.assertEqual(status, StatusCode.Success)
+        self.assertListEqual(ds['data'], list(range(10)), 'data set of parent replaced by thread')
+        self.assertListEqual(ds['doubled'], [2 * value for value in range(10)])
+        self.assertListEqual(ds['shard_sizes'], [2, 3, 2, 3])
+        self.assertListEqual(ds['items'], [0, 1, 2, 3])
+        self.assertEqual(ds['count'], 4)
+
+    def test_fork_threads_cancel(self):
+        """Test cooperative cancellation of threads"""
+
+        process_manager.num_cpu = 2
+        chain = Chain('threads')
+        chain.n_thread = 10
+        chain.add(SlowForkLink(poll=True))
+
+        status = process_manager.execute()
+
+        self.assertEqual(status, StatusCode.Success)
+        self.assertEqual(chain.fork_results[0].status, StatusCode.BreakChain)
+        self.assertTrue(all(res.cancelled for res in chain.fork_results[1:]))
+
+    def test_fork_speculative(self):
+        """Test speculative re-execution of a straggling fork index"""
+
+        process_manager.num_cpu = 5
+        chain = Chain('fork')
+        chain.n_fork = 4
+        chain.fork_speculative = True
+        chain.add(core_ops.ForkExample(store_key='fidx'))
+        chain.add(core_ops.ForkDataCollector(keys=['fidx']))
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            chain.add(StragglerLink(marker=os.path.join(tmp_dir, 'started'), straggler=3))
+
+            start = time.time()
+            status = process_manager.execute()
+
+        self.assertLess(time.time() - start, 10)
+        self.assertEqual(status, StatusCode.Success)
+        self.assertListEqual([res.fork_index for res in chain.fork_results], list(range(4)))
+        self.assertListEqual([res.speculative for res in chain.fork_results], [False, False, False, True])
+        self.assertListEqual(process_manager.service(DataStore)['fidx'], list(range(4)))
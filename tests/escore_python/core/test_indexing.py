@@ -0,0 +1,55 @@
+import unittest
+
+from escore.core.indexing import KeyIndex
+
+
+class KeyIndexTest(unittest.TestCase):
+    """Tests for secondary indexes of keys"""
+
+    def test_types(self):
+        """Test looking up keys by type"""
+
+        index = KeyIndex()
+        index.add('a', dict)
+        index.add('b', bool)
+        index.add('c', int)
+        self.assertListEqual(index.of_type(dict), ['a'])
+        self.assertSetEqual(set(index.of_type(int)), {'b', 'c'}, 'subclass not found')
+
+        # replaced object of another type
+        index.add('a', int)
+        self.assertListEqual(index.of_type(dict), [])
+        self.assertDictEqual(index.types, {bool: {'b'}, int: {'a', 'c'}})
+        index.remove('c')
+        self.assertSetEqual(set(index.of_type(int)), {'a', 'b'})
+        self.assertEqual(len(index), 2)
+
+    def test_prefix(self):
+        """Test looking up keys by prefix"""
+
+        index = KeyIndex()
+        for key in ('hist_b', 'hist_a', 'h', 'other', 'hist'):
+            index.add(key, int)
+        index.add(('tuple', 'key'), int)
+        self.assertListEqual(index.with_prefix('hist_'), ['hist_a', 'hist_b'])
+        self.assertListEqual(index.with_prefix('h'), ['h', 'hist', 'hist_a', 'hist_b'])
+        index.remove('hist_a')
+        self.assertListEqual(index.with_prefix('hist'), ['hist', 'hist_b'])
+        self.assertListEqual(index.with_prefix('x'), [])
+
+    def test_tags(self):
+        """Test looking up keys by tag"""
+
+        index = KeyIndex()
+        index.add('a', int)
+        index.add('b', int)
+        with self.assertRaises(KeyError):
+            index.tag('c', 'final')
+        index.tag('a', 'final', 'plot')
+        index.tag('b', 'final')
+        self.assertSetEqual(set(index.with_tag('final')), {'a', 'b'})
+        index.untag('a', 'final')
+        self.assertListEqual(index.with_tag('final'), ['b'])
+        index.remove('a')
+        self.assertListEqual(index.with_tag('plot'), [])
+        self.assertDictEqual(index.key_tags, {'b': {'final'}})
@@ -0,0 +1,42 @@
+import pickle
+import unittest
+
+from escore.core.lines import LineArray
+from escore.core.reducers import join
+
+
+class LineArrayTest(unittest.TestCase):
+    """Tests for compact line storage"""
+
+    def test_lines(self):
+        """Test storing and accessing lines"""
+
+        lines = LineArray(['b', 'été', 'a'])
+        self.assertEqual(len(lines), 3)
+        self.assertEqual(lines[1], 'été')
+        self.assertEqual(lines[-1], 'a')
+        self.assertListEqual(list(lines), ['b', 'été', 'a'])
+        self.assertListEqual([bytes(line) for line in lines.iter_bytes()], [b'b', 'été'.encode('utf-8'), b'a'])
+        self.assertEqual(lines[1:], ['été', 'a'])
+        self.assertEqual(pickle.loads(pickle.dumps(lines)), lines)
+        self.assertEqual(join(lines, LineArray(['c'])), ['b', 'été', 'a', 'c'])
+
+    def test_sort_unique(self):
+        """Test sorting lines and selecting unique lines"""
+
+        for intern in (False, True):
+            lines = LineArray(['b', 'c', 'a', 'b', 'été'], intern=intern)
+            self.assertListEqual(lines.argsort(), [2, 0, 3, 1, 4])
+            self.assertEqual(lines.sorted(), sorted(lines))
+            self.assertEqual(lines.unique(), ['b', 'c', 'a', 'été'])
+            self.assertEqual(lines.sorted().unique(), ['a', 'b', 'c', 'été'])
+
+    def test_intern(self):
+        """Test storing identical lines once"""
+
+        lines = LineArray(['line'] * 3, intern=True)
+        self.assertEqual(len(lines._buffer), 4)
+        self.assertEqual(lines, ['line'] * 3)
+        restored = pickle.loads(pickle.dumps(lines))
+        restored.append('line')
+        self.assertEqual(len(restored._buffer), 4)
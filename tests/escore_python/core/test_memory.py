@@ -0,0 +1,64 @@
+import os
+import pickle
+import sys
+import tempfile
+import unittest
+
+from escore.core.memory import MemoryAccount, SpilledObject, deep_size
+
+
+class MemoryTest(unittest.TestCase):
+    """Tests for memory estimates and spilling of objects"""
+
+    def test_deep_size(self):
+        """Test estimating the deep size of objects"""
+
+        items = [str(idx) * 100 for idx in range(10)]
+        self.assertEqual(deep_size(items), sys.getsizeof(items) + sum(sys.getsizeof(item) for item in items))
+        self.assertEqual(deep_size([items, items]), sys.getsizeof([items, items]) + deep_size(items),
+                         'shared object counted twice')
+        self.assertGreater(deep_size(dict(items=items)), deep_size(items))
+        try:
+            import numpy as np
+        except ImportError:
+            return
+        self.assertGreaterEqual(deep_size(np.zeros(1000)), 8000)
+
+    def test_deep_size_sample(self):
+        """Test estimating the deep size of a large container from a sample"""
+
+        items = [str(idx) * (idx % 7) for idx in range(20000)]
+        exact = deep_size(items, max_items=None)
+        self.assertAlmostEqual(deep_size(items, max_items=100) / exact, 1., delta=0.05)
+
+    def test_account(self):
+        """Test accounting for stored objects"""
+
+        account = MemoryAccount(soft_limit=100, hard_limit=200)
+        account.start_period('first')
+        self.assertIsNone(account.store('a', 60))
+        self.assertEqual(account.store('b', 60), 'soft')
+        self.assertIsNone(account.store('c', 10), 'soft limit reported twice')
+        account.remove('b')
+        account.start_period('second')
+        self.assertEqual(account.store('a', 250), 'hard')
+        self.assertTrue(account.exceeded)
+        self.assertListEqual(account.largest(1), [('a', 250)])
+
+        report = account.report()
+        self.assertEqual(report['total_bytes'], 260)
+        self.assertDictEqual(report['high_water_bytes'], dict(first=130, second=260))
+        self.assertDictEqual(report['keys']['a'], dict(bytes=250, stored_in='second'))
+        self.assertDictEqual(report['keys']['c'], dict(bytes=10, stored_in='first'))
+
+    def test_spill(self):
+        """Test spilling an object to disk and loading it again"""
+
+        obj = dict(a=[1, 2], b='c')
+        with tempfile.TemporaryDirectory() as spill_dir:
+            placeholder = SpilledObject.spill(obj, os.path.join(spill_dir, 'obj'), deep_size(obj))
+            self.assertEqual(placeholder.fmt, 'pickle')
+            self.assertDictEqual(placeholder.load(), obj)
+            self.assertDictEqual(pickle.loads(pickle.dumps(placeholder)), obj, 'placeholder not pickled as object')
+            placeholder.remove()
+            self.assertFalse(os.path.exists(placeholder.path))
@@ -1,9 +1,13 @@
+import json
+import os
+import tempfile
+import threading
 import unittest
 import unittest.mock as mock
 
 from escore.core.definitions import StatusCode
 from escore.core.process_manager import process_manager
-from escore.core.process_services import ConfigObject
+from escore.core.process_services import ConfigObject, DataStore
 from escore.core.process_services import ProcessService
 from escore.core.element import Chain, Link
 
@@ -144,6 +148,133 @@ class ProcessManagerTest(unittest.TestCase):
         self.assertEqual(status, StatusCode.Success)
         self.assertEqual(Success.chains, ['1', '2', '4'])
 
+    def test_execute_parallel_chains(self):
+        pm = process_manager
+        settings = pm.service(ConfigObject)
+        settings['analysisName'] = 'test_execute_parallel_chains'
+        settings['parallelChains'] = True
+        settings['doNotStoreResults'] = True
+        pm.num_cpu = 2
+
+        # independent chains only pass the barrier if they run concurrently
+        barrier = threading.Barrier(2, timeout=10)
+        order = []
+
+        class Produce(Link):
+            def execute(self):
+                barrier.wait()
+                order.append(self.store_key)
+                return StatusCode.Success
+
+        class Consume(Link):
+            def execute(self):
+                order.append(self.read_key)
+                return StatusCode.Success
+
+        for key in ('a', 'b'):
+            link = Produce('produce_' + key)
+            link.store_key = key
+            Chain('produce_' + key, pm).add(link)
+        link = Consume('consume')
+        link.read_key = ['a', 'b']
+        Chain('consume', pm).add(link)
+
+        status = pm.execute()
+
+        self.assertEqual(status, StatusCode.Success)
+        self.assertEqual(set(order[:2]), {'a', 'b'})
+        self.assertEqual(order[2], ['a', 'b'])
+
+    def test_execute_parallel_chains_failure(self):
+        pm = process_manager
+        settings = pm.service(ConfigObject)
+        settings['analysisName'] = 'test_execute_parallel_chains_failure'
+        settings['parallelChains'] = True
+        settings['doNotStoreResults'] = True
+
+        executed = []
+
+        class Fail(Link):
+            def execute(self):
+                return StatusCode.Failure
+
+        class Success(Link):
+            def execute(self):
+                executed.append(self.name)
+                return StatusCode.Success
+
+        Chain('fail', pm).add(Fail('fail'))
+        # a link without declared keys is a barrier
+        Chain('after', pm).add(Success('after'))
+
+        status = pm.execute()
+
+        self.assertEqual(status, StatusCode.Failure)
+        self.assertEqual(executed, [])
+
+    def test_execute_release_dead_keys(self):
+        pm = process_manager
+        settings = pm.service(ConfigObject)
+        settings['analysisName'] = 'test_execute_release_dead_keys'
+        settings['doNotStoreResults'] = True
+        settings['dsReleaseDeadKeys'] = True
+        settings['dsFinalKeys'] = ['c']
+        ds = pm.service(DataStore)
+
+        present = []
+
+        class Transform(Link):
+            def execute(self):
+                present.append(sorted(ds.keys()))
+                for key in self.store_key:
+                    ds[key] = [ds[self.read_key] if self.read_key else 0]
+                return StatusCode.Success
+
+        for name, read_key, store_key in (('produce', None, ['a', 'b']), ('transform', 'a', ['c']),
+                                          ('consume', 'c', [])):
+            link = Transform(name)
+            link.read_key = read_key
+            link.store_key = store_key
+            Chain(name, pm).add(link)
+
+        status = pm.execute()
+
+        self.assertEqual(status, StatusCode.Success)
+        # b is never read, a is last read by transform, c is final output
+        self.assertListEqual(present, [[], ['a'], ['c']])
+        self.assertListEqual(sorted(ds.keys()), ['c'])
+
+    def test_execute_memory_limit(self):
+        pm = process_manager
+        settings = pm.service(ConfigObject)
+        settings['analysisName'] = 'test_execute_memory_limit'
+        settings['doNotStoreResults'] = True
+        settings['dsHardLimit'] = 10 ** 6
+
+        class Store(Link):
+            def execute(self):
+                pm.service(DataStore)[self.store_key] = [str(idx) for idx in range(self.size)]
+                return StatusCode.Success
+
+        for name, size in (('small', 10), ('large', 10 ** 5), ('after', 10)):
+            link = Store('store_' + name)
+            link.store_key = name
+            link.size = size
+            Chain(name, pm).add(link)
+
+        with tempfile.TemporaryDirectory() as results_dir:
+            settings['resultsDir'] = results_dir
+            status = pm.execute()
+            with open(os.path.join(results_dir, 'test_execute_memory_limit', 'data', 'v0',
+                                   'memory_report.json')) as report_file:
+                report = json.load(report_file)
+
+        self.assertEqual(status, StatusCode.Failure)
+        self.assertNotIn('after', pm.service(DataStore))
+        self.assertListEqual(sorted(report['high_water_bytes']), ['large', 'small'])
+        self.assertGreater(report['high_water_bytes']['large'], 10 ** 6)
+        self.assertEqual(report['keys']['large']['stored_by'], ['store_large'])
+
     def tearDown(self):
         from escore.core import execution
         execution.reset_eskapade()
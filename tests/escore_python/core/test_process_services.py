@@ -1,3 +1,9 @@
+import multiprocessing
+import os
+import pickle
+import tempfile
+import threading
+import time
 import unittest
 import unittest.mock as mock
 
@@ -6,7 +12,11 @@ from escore.core.definitions import (CONFIG_VARS, CONFIG_TYPES, CONFIG_DEFAULTS,
                                        CONFIG_OPTS_SETTERS, RandomSeeds, set_opt_var, set_log_level_opt,
                                        set_begin_end_chain_opt,
                                        set_single_chain_opt, set_seeds, set_custom_user_vars)
-from escore.core.process_services import ProcessServiceMeta, ProcessService, ConfigObject, DataStore
+from escore.core.exceptions import ReadOnlyKey
+from escore.core.forking import after_fork
+from escore.core.memory import SpilledObject, deep_size
+from escore.core.process_services import (ProcessServiceMeta, ProcessService, BufferPool, CacheService, ConfigObject,
+                                         DataStore, DeferredValue, ForkStore, SharedSlots)
 from escore.logger import Logger
 
 
@@ -398,3 +408,492 @@ class DataStoreTest(unittest.TestCase):
         """Test value of data-store persist flag"""
 
         self.assertTrue(DataStore._persist, 'unexpected value for data-store persist flag')
+
+    def test_read_only(self):
+        """Test read-only data-store keys"""
+
+        ds = DataStore()
+        ds['a'] = 1
+        ds.set_read_only(['a'])
+        with self.assertRaises(ReadOnlyKey):
+            ds['a'] = 2
+        with self.assertRaises(ReadOnlyKey):
+            del ds['a']
+        ds['b'] = 2
+        ds.set_read_only()
+        ds['a'] = 3
+        self.assertDictEqual(dict(ds), dict(a=3, b=2))
+
+    def test_deferred(self):
+        """Test deferred data-store values"""
+
+        calls = []
+
+        def compute(x, y=0):
+            calls.append(x)
+            return x + y
+
+        ds = DataStore()
+        ds.defer('a', compute, 1, y=2)
+        ds.defer('b', compute, 10)
+        ds.set_read_only(['a'])
+        self.assertIn('a', ds)
+        self.assertListEqual(calls, [])
+
+        # evaluated once, on first access, and replaced by the result
+        self.assertEqual(ds['a'], 3)
+        self.assertEqual(ds.get('a'), 3)
+        self.assertListEqual(calls, [1])
+        self.assertEqual(dict.__getitem__(ds, 'a'), 3)
+        self.assertIsInstance(dict.__getitem__(ds, 'b'), DeferredValue)
+
+        # unevaluated values are skipped or evaluated when persisted
+        ds.deferred_policy = 'skip'
+        self.assertDictEqual(dict(pickle.loads(pickle.dumps(ds))), dict(a=3))
+        self.assertListEqual(calls, [1])
+        ds.deferred_policy = 'evaluate'
+        self.assertDictEqual(dict(pickle.loads(pickle.dumps(ds))), dict(a=3, b=10))
+        self.assertListEqual(calls, [1, 10])
+        self.assertEqual(dict.__getitem__(ds, 'b'), 10)
+
+    def test_snapshot(self):
+        """Test snapshots and rollback of the data store"""
+
+        ds = DataStore()
+        ds['a'] = [1]
+        ds['b'] = 2
+        first = ds.snapshot()
+        ds['a'] = [3]
+        ds['c'] = 4
+        second = ds.snapshot()
+        del ds['b']
+        ds['c'] = 5
+        ds.update(d=6)
+
+        # only the changed keys are kept, once per snapshot
+        self.assertSetEqual(set(ds._undo[0]), {'a', 'c'})
+        self.assertListEqual(ds._undo[0]['a'], [1])
+        self.assertSetEqual(set(ds._undo[1]), {'b', 'c', 'd'})
+
+        ds.rollback(second)
+        self.assertDictEqual(dict(ds), dict(a=[3], b=2, c=4))
+        ds['c'] = 7
+        ds.rollback()
+        self.assertDictEqual(dict(ds), dict(a=[1], b=2))
+        with self.assertRaises(ValueError):
+            ds.rollback(first)
+
+        # a dropped snapshot keeps its changes, also when an earlier snapshot is rolled back
+        ds.snapshot()
+        ds['a'] = 8
+        ds.snapshot()
+        ds['b'] = 9
+        ds.drop_snapshot()
+        self.assertDictEqual(dict(ds), dict(a=8, b=9))
+        ds.clear()
+        ds.rollback()
+        self.assertDictEqual(dict(ds), dict(a=[1], b=2))
+
+    def test_indexes(self):
+        """Test looking up data-store keys by type, prefix and tag"""
+
+        ds = DataStore()
+        ds['hist_a'] = dict(x=1)
+        ds['hist_b'] = list(range(1000))
+        ds['n'] = 1
+        self.assertListEqual(ds.keys_of_type(dict), ['hist_a'])
+        self.assertListEqual(ds.keys_with_prefix('hist_'), ['hist_a', 'hist_b'])
+
+        # spilled objects are indexed by the type of the original object
+        ds.set_memory_budget(1)
+        ds.enable_indexes()
+        self.assertListEqual(ds.keys_of_type(list), ['hist_b'])
+        ds.set_memory_budget()
+
+        # indexes are updated by all dict methods that modify the data store
+        ds.tag('hist_b', 'final')
+        ds.update(hist_c=[], m=2)
+        ds.setdefault('hist_d', {})
+        self.assertDictEqual(ds.pop('hist_a'), dict(x=1))
+        self.assertListEqual(ds.pop('hist_c'), [])
+        self.assertIsNone(ds.pop('hist_c', None))
+        self.assertListEqual(ds.keys_with_prefix('hist_'), ['hist_b', 'hist_d'])
+        self.assertSetEqual(set(ds.keys_of_type(int)), {'n', 'm'})
+        self.assertListEqual(ds.keys_with_tag('final'), ['hist_b'])
+
+        # tags are persisted, indexes are rebuilt
+        restored = pickle.loads(pickle.dumps(ds))
+        self.assertListEqual(restored.keys_with_tag('final'), ['hist_b'])
+        self.assertListEqual(restored.keys_of_type(dict), ['hist_d'])
+
+        del ds['hist_b']
+        self.assertListEqual(ds.keys_with_tag('final'), [])
+        # the last inserted key is popped
+        self.assertTupleEqual(ds.popitem(), ('hist_d', {}))
+        self.assertListEqual(ds.keys_with_prefix('hist_'), [])
+        ds.clear()
+        self.assertListEqual(ds.keys_of_type(object), [])
+
+    def test_memory_budget(self):
+        """Test spilling least-recently-used data-store objects to disk"""
+
+        ds = DataStore()
+        ds['a'] = list(range(1000))
+        ds['b'] = list(range(1000, 2000))
+        ds['c'] = list(range(2000, 3000))
+        ds.set_memory_budget(int(1.5 * deep_size(ds['a'])))
+        spill_dir = ds._spill_dir
+        self.assertEqual(ds.spill_stats()['spills'], 2)
+        self.assertIsInstance(dict.__getitem__(ds, 'a'), SpilledObject)
+        self.assertIsInstance(dict.__getitem__(ds, 'b'), SpilledObject)
+
+        # load spilled object, spilling the least recently used one
+        self.assertListEqual(ds['a'], list(range(1000)))
+        self.assertListEqual(ds.get('a'), list(range(1000)))
+        self.assertIsInstance(dict.__getitem__(ds, 'c'), SpilledObject)
+        stats = ds.spill_stats()
+        self.assertEqual((stats['hits'], stats['misses'], stats['spills']), (1, 1, 3))
+
+        # spilled objects are persisted as the original objects
+        restored = pickle.loads(pickle.dumps(ds))
+        self.assertListEqual(dict.__getitem__(restored, 'c'), list(range(2000, 3000)))
+        self.assertDictEqual(restored.spill_stats(), {})
+
+        del ds['c']
+        ds.set_memory_budget()
+        self.assertListEqual(dict.__getitem__(ds, 'b'), list(range(1000, 2000)))
+        self.assertFalse(os.path.exists(spill_dir))
+
+    def test_memory_budget_unpicklable(self):
+        """Test keeping data-store objects that cannot be spilled in memory"""
+
+        ds = DataStore()
+        ds['func'] = [list(range(1000)), lambda: 0]
+        ds.set_memory_budget(int(1.5 * deep_size(list(range(1000)))))
+        ds['a'] = list(range(1000))
+        ds['b'] = list(range(1000, 2000))
+        self.assertNotIsInstance(dict.__getitem__(ds, 'func'), SpilledObject)
+        self.assertIsInstance(dict.__getitem__(ds, 'a'), SpilledObject)
+        self.assertEqual(ds.spill_stats()['spills'], 1)
+        # no partial spill file is left, and the object is not tried again
+        self.assertEqual(len(os.listdir(ds._spill_dir)), 1)
+        ds['c'] = list(range(2000, 3000))
+        self.assertEqual(ds.spill_stats()['spills'], 2)
+        self.assertEqual(ds['func'][0], list(range(1000)))
+        ds.set_memory_budget()
+
+    def test_memory_budget_spill_dir(self):
+        """Test removing the spill files of forked processes from a spill directory"""
+
+        with tempfile.TemporaryDirectory() as spill_dir:
+            ds = DataStore()
+            ds['a'] = list(range(1000))
+            ds.set_memory_budget(int(1.5 * deep_size(ds['a'])), spill_dir=spill_dir)
+            self.assertEqual(os.path.dirname(ds._spill_dir), spill_dir)
+
+            # a forked process spills to its own subdirectory and removes it when it finishes
+            child_dir = multiprocessing.Array('c', 256)
+            pid = os.fork()
+            if pid == 0:
+                try:
+                    after_fork()
+                    ds['b'] = list(range(1000, 2000))
+                    ds['c'] = list(range(2000, 3000))
+                    child_dir.value = os.path.dirname(dict.__getitem__(ds, 'b').path).encode()
+                    ds.finish()
+                finally:
+                    os._exit(os.EX_OK)
+            os.waitpid(pid, 0)
+            self.assertEqual(os.path.dirname(child_dir.value.decode()), ds._spill_dir)
+            self.assertFalse(os.path.exists(child_dir.value.decode()))
+            self.assertListEqual(os.listdir(ds._spill_dir), [])
+            self.assertListEqual(ds['a'], list(range(1000)))
+
+            # the spill directory of the data store is removed, the given directory is kept
+            ds['b'] = list(range(1000, 2000))
+            self.assertEqual(len(os.listdir(ds._spill_dir)), 1)
+            ds.finish()
+            self.assertListEqual(os.listdir(spill_dir), [])
+
+    def test_memory_budget_threads(self):
+        """Test spilling data-store objects that are used by multiple threads"""
+
+        ds = DataStore()
+        ds.set_memory_budget(3 * deep_size(list(range(100))))
+        errors = []
+
+        def use(tid):
+            try:
+                for i in range(50):
+                    key = 'obj_{:d}_{:d}'.format(tid, i % 5)
+                    ds[key] = list(range(i, i + 100))
+                    self.assertListEqual(ds[key], list(range(i, i + 100)))
+                    ds.spill_stats()
+            except Exception as exc:
+                errors.append(exc)
+
+        threads = [threading.Thread(target=use, args=(tid,)) for tid in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertListEqual(errors, [])
+        self.assertLessEqual(ds.spill_stats()['in_memory_bytes'], 3 * deep_size(list(range(100))))
+        self.assertListEqual(ds['obj_3_4'], list(range(49, 149)))
+        ds.set_memory_budget()
+
+
+class SharedSlotsTest(unittest.TestCase):
+    """Tests for shared-memory slots of fork store"""
+
+    @staticmethod
+    def fork(func, n_fork):
+        """Execute function in forked processes"""
+        pids = []
+        for fidx in range(n_fork):
+            pid = os.fork()
+            if pid == 0:
+                try:
+                    after_fork()
+                    func(fidx)
+                finally:
+                    os._exit(os.EX_OK)
+            pids.append(pid)
+        for pid in pids:
+            os.waitpid(pid, 0)
+
+    def test_bytes(self):
+        """Test collecting bytes from forked processes"""
+
+        slots = SharedSlots(n_slots=4, slot_size=16)
+        self.fork(lambda fidx: slots.__setitem__(fidx, 'fork{:d}'.format(fidx).encode() * (fidx + 1)), 3)
+
+        self.assertEqual(slots.filled(), [0, 1, 2])
+        self.assertEqual(bytes(slots[2]), b'fork2fork2fork2')
+        self.assertIsNone(slots[3])
+        with self.assertRaises(ValueError):
+            slots[0] = b'x' * 17
+        with self.assertRaises(IndexError):
+            slots[4] = b'x'
+
+    def test_arrays(self):
+        """Test collecting arrays from forked processes"""
+
+        try:
+            import numpy as np
+        except ImportError:
+            self.skipTest('NumPy not available')
+
+        slots = SharedSlots(n_slots=3, shape=(2, 5), dtype='int64')
+        self.fork(lambda fidx: slots.__setitem__(fidx, np.full((2, 5), fidx)), 3)
+
+        arr = slots.array()
+        self.assertEqual(arr.shape, (3, 2, 5))
+        self.assertEqual(arr.sum(axis=(1, 2)).tolist(), [0, 10, 20])
+        # zero-copy view
+        arr[0, 0, 0] = 42
+        self.assertEqual(slots[0][0, 0], 42)
+
+
+class ForkStoreTest(unittest.TestCase):
+    """Tests for fork store"""
+
+    def test_namespaces(self):
+        """Test committing local namespaces from forked processes"""
+
+        fs = ForkStore()
+        fs['n'] = 1
+
+        def work(fidx):
+            fs.open_namespace(fidx)
+            fs.local['fidx'] = [fidx]
+            fs.local['n'] = fs.local.get('n', 0) + 1
+            if fidx != 1:
+                fs.commit()
+
+        SharedSlotsTest.fork(work, 3)
+
+        self.assertListEqual(list(fs.namespaces()), [0, 2])
+        self.assertListEqual(fs.collect('fidx'), [[0], [2]])
+        self.assertEqual(fs['n'] + sum(fs.collect('n')), 3)
+        self.assertDictEqual(fs.local, {}, 'local namespace of parent process modified')
+
+        # a namespace is committed once
+        fs.open_namespace(0)
+        fs.local['fidx'] = ['again']
+        fs.commit()
+        self.assertListEqual(fs.collect('fidx'), [[0], [2]])
+
+        fs.clear()
+        self.assertDictEqual(fs.namespaces(), {})
+
+    def test_lock_contention(self):
+        """Test counting of contended fork-store lock acquisitions"""
+
+        fs = ForkStore()
+        with fs.lock:
+            self.assertFalse(fs.lock.acquire(False))
+            SharedSlotsTest.fork(lambda fidx: fs.lock.acquire(True, 0.01), 2)
+        self.assertEqual(fs.lock_contention, 2)
+        fs.wait_until_unlocked()
+
+    def test_lock_held_by_other_process(self):
+        """Test waiting for fork-store lock held by another process"""
+
+        fs = ForkStore()
+        locked, release = multiprocessing.Event(), multiprocessing.Event()
+        pid = os.fork()
+        if pid == 0:
+            try:
+                after_fork()
+                with fs.lock:
+                    locked.set()
+                    release.wait(10)
+            finally:
+                os._exit(os.EX_OK)
+        try:
+            self.assertTrue(locked.wait(10))
+            start = time.time()
+            self.assertFalse(fs.lock.acquire(True, 0.1), 'lock acquired while held by other process')
+            self.assertGreaterEqual(time.time() - start, 0.09, 'acquire did not wait for timeout')
+            release.set()
+            with fs.lock:
+                self.assertFalse(fs.lock.acquire(False))
+        finally:
+            release.set()
+            os.waitpid(pid, 0)
+        self.assertGreaterEqual(fs.lock_contention, 1)
+
+
+class BufferPoolTest(unittest.TestCase):
+    """Tests for pool of reusable buffers"""
+
+    def test_reuse(self):
+        """Test reusing buffers of the same size class"""
+
+        try:
+            import numpy
+        except ImportError:
+            self.skipTest('NumPy not available')
+        pool = BufferPool()
+        arr = pool.borrow((10, 10), dtype='float64', zero=True)
+        self.assertTupleEqual(arr.shape, (10, 10))
+        self.assertEqual(arr.sum(), 0)
+        arr[...] = 1
+        pool.give_back(arr)
+
+        # same size class, other shape and type
+        other = pool.borrow(700, dtype='uint8')
+        self.assertEqual(other.shape, (700,))
+        pool.give_back(other)
+        with pool.borrowed((5, 20), dtype='float64') as same:
+            self.assertEqual(same.sum(), 100, 'buffer not reused')
+        data = pool.borrow_bytes(100, zero=True)
+        self.assertEqual(bytes(data), bytes(100))
+        with self.assertRaises(ValueError):
+            pool.give_back(bytearray(100))
+
+        stats = pool.stats()
+        self.assertEqual((stats['borrows'], stats['reuses'], stats['allocations']), (4, 2, 2))
+        self.assertEqual((stats['idle_bytes'], stats['borrowed_bytes']), (1024, 128))
+
+        # idle buffers are capped
+        pool.max_bytes = 1024
+        pool.give_back(data)
+        self.assertEqual(pool.stats()['drops'], 1)
+        pool.finish()
+        self.assertEqual(pool.stats()['idle_bytes'], 0)
+
+
+class CacheServiceTest(unittest.TestCase):
+    """Tests for cache service"""
+
+    def test_memory_tier(self):
+        """Test caching function results in memory"""
+
+        calls = []
+
+        def square(x):
+            calls.append(x)
+            return [x * x] * 100
+
+        cache = CacheService()
+        cached_square = cache.cached(square)
+        self.assertListEqual(cached_square(3), [9] * 100)
+        self.assertListEqual(cached_square(3), [9] * 100)
+        self.assertListEqual(calls, [3])
+        self.assertEqual(cache.cached(len)([lambda: 0]), 1)
+
+        # least-recently-used values are evicted beyond the budget
+        cache.memory_budget = int(1.5 * deep_size([9] * 100))
+        cached_square(4)
+        self.assertListEqual(cached_square(3), [9] * 100)
+        self.assertListEqual(calls, [3, 4, 3])
+        stats = cache.stats()
+        self.assertEqual((stats['hits'], stats['misses'], stats['evictions'], stats['uncacheable']), (1, 3, 2, 1))
+        self.assertAlmostEqual(stats['hit_rate'], 0.25)
+
+        cache.put('key', 1)
+        self.assertEqual(cache.get('key'), 1)
+        cache.invalidate('key')
+        self.assertIsNone(cache.get('key'))
+
+    def test_disk_tier(self):
+        """Test caching values on disk, across cache instances"""
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            cache = CacheService()
+            cache.enable_disk_tier(tmp_dir)
+            key = CacheService.make_key(os.path.join, ('a', 'b'))
+            cache.put(key, 'a/b')
+            cache.put('features:v1', [1, 2])
+
+            # new run
+            cache = CacheService()
+            cache.enable_disk_tier(tmp_dir, ttl=3600)
+            self.assertEqual(cache.get(key), 'a/b')
+            self.assertEqual(cache.get(key), 'a/b')
+            self.assertEqual((cache.stats()['disk_hits'], cache.stats()['hits']), (1, 1))
+            cache.invalidate(os.path.join)
+            self.assertIsNone(cache.get(key))
+
+            # expired value
+            path = cache._disk_path('features:v1')
+            os.utime(path, (0, 0))
+            self.assertIsNone(cache.get('features:v1'))
+            self.assertFalse(os.path.exists(path))
+
+    def test_closures(self):
+        """Test caching results of closures of the same function"""
+
+        def make_scaler(factor):
+            def scale(x):
+                return factor * x
+            return scale
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            cache = CacheService()
+            cache.enable_disk_tier(tmp_dir)
+            scale2, scale3 = cache.cached(make_scaler(2)), cache.cached(make_scaler(3))
+            self.assertEqual((scale2(5), scale3(5)), (10, 15))
+            self.assertEqual((scale2(5), scale3(5)), (10, 15))
+            self.assertEqual(cache.stats()['hits'], 2)
+            self.assertNotEqual(scale2.cache_namespace, scale3.cache_namespace)
+            self.assertEqual(cache.cached(make_scaler(2)).cache_namespace, scale2.cache_namespace)
+
+            # local functions are not identified across runs, so not cached on disk
+            self.assertListEqual(os.listdir(tmp_dir), [])
+            named = cache.cached(make_scaler(4), namespace='scale4')
+            self.assertEqual(named(5), 20)
+            self.assertListEqual(os.listdir(tmp_dir), ['scale4'])
+            cache.invalidate(named)
+            self.assertListEqual(os.listdir(tmp_dir), [])
+
+    def test_fork(self):
+        """Test reading the memory tier of the parent process in forked processes"""
+
+        cache = CacheService()
+        cache.put('parent', 'warm')
+        slots = SharedSlots(n_slots=2, slot_size=16)
+        SharedSlotsTest.fork(lambda fidx: slots.__setitem__(fidx, cache.get('parent').encode()), 2)
+        self.assertEqual(bytes(slots[1]), b'warm')
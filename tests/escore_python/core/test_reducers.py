@@ -0,0 +1,72 @@
+import itertools
+import unittest
+
+from escore.core.reducers import TreeReducer, get_reducer, join, merge_dicts
+
+
+class ReducersTest(unittest.TestCase):
+    """Tests for reducers of partial fork results"""
+
+    def test_get_reducer(self):
+        """Test getting built-in and user-defined reducers"""
+
+        self.assertIs(get_reducer('dict_merge'), merge_dicts)
+        self.assertEqual(get_reducer('sum')(1, 2), 3)
+        self.assertEqual(get_reducer('concat')([1], (2,)), [1, 2])
+        func = lambda left, right: left * right  # noqa: E731
+        self.assertIs(get_reducer(func), func)
+        with self.assertRaises(ValueError):
+            get_reducer('unknown')
+
+    def test_join(self):
+        """Test joining shards of data sets"""
+
+        self.assertEqual(join([1], [2, 3]), [1, 2, 3])
+        self.assertEqual(join((1,), (2,)), (1, 2))
+        self.assertDictEqual(join(dict(a=1), dict(b=2)), dict(a=1, b=2))
+        with self.assertRaises(TypeError):
+            join(1, 2)
+        try:
+            import numpy as np
+        except ImportError:
+            return
+        self.assertListEqual(join(np.arange(2), np.arange(2, 4)).tolist(), [0, 1, 2, 3])
+
+    def test_tree_reducer_order(self):
+        """Test that results are combined in order of fork index, independent of completion order"""
+
+        for order in itertools.permutations(range(5)):
+            tree = TreeReducer('concat')
+            for fidx in order:
+                tree.add(fidx, fidx + 1, [fidx])
+            self.assertEqual(tree.result(), [0, 1, 2, 3, 4], 'wrong result for completion order {}'.format(order))
+
+    def test_tree_reducer_balanced(self):
+        """Test that results are combined in a balanced tree if forks finish in order"""
+
+        copied = []
+
+        def concat(left, right):
+            copied.append(len(left) + len(right))
+            return left + right
+
+        for order in (range(1024), reversed(range(1024))):
+            copied.clear()
+            tree = TreeReducer(concat)
+            for fidx in order:
+                tree.add(fidx, fidx + 1, [fidx])
+            self.assertLess(len(tree), 10)
+            self.assertListEqual(tree.result(), list(range(1024)))
+            # each item copied of order log(n_fork) times, instead of n_fork times
+            self.assertLess(sum(copied), 1024 * 15)
+
+    def test_tree_reducer_gaps(self):
+        """Test reduction of ranges of fork indices with missing indices"""
+
+        tree = TreeReducer(lambda left, right: left + right)
+        self.assertEqual(tree.result(default='none'), 'none')
+        tree.add(6, 8, 'c')
+        tree.add(0, 3, 'a')
+        tree.add(4, 6, 'b')
+        self.assertEqual(len(tree), 2)
+        self.assertEqual(tree.result(), 'abc')
@@ -0,0 +1,41 @@
+import unittest
+
+from escore_python.observers import MockDataStoreObserver, TestCaseObservable
+
+
+class ApplyFuncTest(unittest.TestCase, TestCaseObservable):
+
+    def setUp(self):
+        observers = [MockDataStoreObserver()]
+        super(ApplyFuncTest, self).set_up_observers(observers)
+
+    def test_deferred(self):
+        from escore import process_manager, DataStore, DeferredValue
+        from escore.core_ops.links import ApplyFunc
+
+        calls = []
+
+        def total(obj, offset=0):
+            calls.append(obj)
+            return sum(obj) + offset
+
+        ds = process_manager.service(DataStore)
+        ds['numbers'] = [1, 2, 3]
+        link = ApplyFunc(read_key='numbers', store_key='total', func=total, offset=10, deferred=True)
+        link.initialize()
+        link.execute()
+
+        # the function is not applied at execution
+        self.assertIsInstance(dict(ds.items())['total'], DeferredValue)
+        self.assertListEqual(calls, [])
+
+        # the function is applied on first access and the result is stored
+        self.assertEqual(ds['total'], 16)
+        self.assertEqual(dict(ds.items())['total'], 16)
+        self.assertEqual(ds['total'], 16)
+        self.assertListEqual(calls, [[1, 2, 3]])
+
+    def tearDown(self):
+        super(ApplyFuncTest, self).tear_down_observers()
+        from escore.core import execution
+        execution.reset_eskapade()
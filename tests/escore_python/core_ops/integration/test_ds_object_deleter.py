@@ -0,0 +1,37 @@
+import unittest
+from collections import OrderedDict
+
+from escore_python.observers import MockDataStoreObserver, TestCaseObservable
+
+
+class DsObjectDeleterTest(unittest.TestCase, TestCaseObservable):
+
+    def setUp(self):
+        observers = [MockDataStoreObserver()]
+        super(DsObjectDeleterTest, self).set_up_observers(observers)
+
+    def test_delete_by_class(self):
+        from escore import process_manager, DataStore
+        from escore.core_ops.links import DsObjectDeleter
+
+        for index in (False, True):
+            ds = process_manager.service(DataStore)
+            ds.clear()
+            if index:
+                ds.enable_indexes()
+            ds['plain'] = {'a': 1}
+            ds['ordered'] = OrderedDict(b=2)
+            ds['other'] = [1, 2]
+            deleter = DsObjectDeleter(deletion_classes=[dict])
+            deleter.initialize()
+            deleter.execute()
+
+            self.assertFalse(deleter.clear_all, 'all objects deleted')
+            self.assertNotIn('plain', ds, 'object of class not deleted')
+            self.assertNotIn('ordered', ds, 'object of subclass not deleted')
+            self.assertListEqual(ds['other'], [1, 2], 'object of other class deleted')
+
+    def tearDown(self):
+        super(DsObjectDeleterTest, self).tear_down_observers()
+        from escore.core import execution
+        execution.reset_eskapade()
@@ -0,0 +1,69 @@
+import io
+import os
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+
+from escore_python.observers import MockDataStoreObserver, TestCaseObservable
+
+
+class EventLooperTest(unittest.TestCase, TestCaseObservable):
+
+    def setUp(self):
+        observers = [MockDataStoreObserver()]
+        super(EventLooperTest, self).set_up_observers(observers)
+        fd, self.filename = tempfile.mkstemp(suffix='.txt')
+        with os.fdopen(fd, 'w') as f:
+            f.write('# comment\nb\na\n\nc\na\nb\n')
+
+    def run_looper(self, **kwargs):
+        from escore import process_manager, DataStore
+        from escore.core_ops.links import EventLooper
+
+        looper = EventLooper(filename=self.filename, store_key='lines', **kwargs)
+        looper.initialize()
+        looper.execute()
+        looper.finalize()
+        return process_manager.service(DataStore)
+
+    def test_compact(self):
+        from escore.core.lines import LineArray
+
+        for intern in (False, True):
+            with self.subTest(intern=intern):
+                ds = self.run_looper(compact=True, intern=intern)
+                self.assertIsInstance(ds['lines'], LineArray)
+                self.assertListEqual(list(ds['lines']), ['b', 'a', 'c', 'a', 'b'])
+                self.assertEqual(ds['n_lines'], 5)
+
+                ds = self.run_looper(compact=True, intern=intern, sort=True, unique=True)
+                self.assertIsInstance(ds['lines'], LineArray)
+                self.assertListEqual(list(ds['lines']), ['a', 'b', 'c'])
+                self.assertEqual(ds['n_lines'], 3)
+
+    def test_compact_non_str(self):
+        ds = self.run_looper(compact=True, line_processor_set=[lambda line: ord(line)], sort=True)
+        self.assertListEqual(ds['lines'], [97, 97, 98, 98, 99])
+
+        ds = self.run_looper(compact=True, line_processor_set=[lambda line: None if line == 'c' else line])
+        self.assertListEqual(ds['lines'], ['b', 'a', None, 'a', 'b'])
+
+    def test_print_line_array(self):
+        from escore import process_manager, DataStore
+        from escore.core.lines import LineArray
+        from escore.core_ops.links import LinePrinter
+
+        ds = process_manager.service(DataStore)
+        ds['lines'] = LineArray(['b', 'a'], intern=True)
+        printer = LinePrinter(read_key='lines')
+        printer.initialize()
+        out = io.StringIO()
+        with redirect_stdout(out):
+            printer.execute()
+        self.assertEqual(out.getvalue(), 'b\na\n')
+
+    def tearDown(self):
+        super(EventLooperTest, self).tear_down_observers()
+        os.remove(self.filename)
+        from escore.core import execution
+        execution.reset_eskapade()
@@ -0,0 +1,54 @@
+import unittest
+
+from escore_python.observers import MockDataStoreObserver, TestCaseObservable
+
+
+class ToDsDictTest(unittest.TestCase, TestCaseObservable):
+
+    def setUp(self):
+        observers = [MockDataStoreObserver()]
+        super(ToDsDictTest, self).set_up_observers(observers)
+
+    def test_deferred(self):
+        from escore import process_manager, DataStore, DeferredValue
+        from escore.core_ops.links import ToDsDict
+
+        calls = []
+
+        def make(name):
+            def func():
+                calls.append(name)
+                return name.upper()
+            return func
+
+        ds = process_manager.service(DataStore)
+        link = ToDsDict(store_key='single', obj=make('single'), deferred=True)
+        link.initialize()
+        link.execute()
+        link = ToDsDict(obj={'a': make('a'), 'b': make('b')}, copydict=True, deferred=True)
+        link.initialize()
+        link.execute()
+
+        # the objects are not computed at execution
+        for key in ('single', 'a', 'b'):
+            self.assertIsInstance(dict(ds.items())[key], DeferredValue)
+        self.assertListEqual(calls, [])
+
+        # an object is computed on its first access only and the result is stored
+        self.assertEqual(ds['a'], 'A')
+        self.assertEqual(ds['a'], 'A')
+        self.assertEqual(dict(ds.items())['a'], 'A')
+        self.assertIsInstance(dict(ds.items())['b'], DeferredValue)
+        self.assertEqual(ds['single'], 'SINGLE')
+        self.assertListEqual(calls, ['a', 'single'])
+
+    def test_deferred_not_callable(self):
+        from escore.core_ops.links import ToDsDict
+
+        link = ToDsDict(store_key='value', obj=1, deferred=True)
+        self.assertRaises(TypeError, link.initialize)
+
+    def tearDown(self):
+        super(ToDsDictTest, self).tear_down_observers()
+        from escore.core import execution
+        execution.reset_eskapade()